@@ -2,10 +2,11 @@ import os
 from datetime import datetime, timezone
 
 from dotenv import load_dotenv
-from flask import Flask, send_from_directory, session
+from flask import Flask, abort, session
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import safe_join
 
 from app.extensions import mail
 from core.configuration.configuration import get_app_version
@@ -106,8 +107,13 @@ def create_app(config_name="development"):
 
     @app.route("/uploads/<path:filename>")
     def uploads(filename):
+        from core.helpers.file_delivery import deliver_file
+
         upload_folder = os.path.join(app.root_path, "uploads")
-        return send_from_directory(upload_folder, filename)
+        path = safe_join(upload_folder, filename)
+        if path is None:
+            abort(404)
+        return deliver_file(path, as_attachment=False)
 
     return app
 
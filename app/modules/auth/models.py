@@ -58,3 +58,8 @@ class User(db.Model, UserMixin):
         from app.modules.auth.services import AuthenticationService
 
         return AuthenticationService().temp_folder_by_user(self)
+
+    def resumable_uploads_folder(self) -> str:
+        from app.modules.auth.services import AuthenticationService
+
+        return AuthenticationService().resumable_uploads_folder_by_user(self)
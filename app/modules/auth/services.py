@@ -18,7 +18,7 @@ from app.modules.auth.repositories import UserRepository
 from app.modules.profile.models import UserProfile
 from app.modules.profile.repositories import UserProfileRepository
 from app.modules.shopping_cart.repositories import ShoppingCartRepository
-from core.configuration.configuration import uploads_folder_name
+from core.configuration.configuration import uploads_root
 from core.services.BaseService import BaseService
 
 
@@ -169,7 +169,11 @@ class AuthenticationService(BaseService):
         return None
 
     def temp_folder_by_user(self, user: User) -> str:
-        return os.path.join(uploads_folder_name(), "temp", str(user.id))
+        return os.path.join(uploads_root(), "temp", str(user.id))
+
+    def resumable_uploads_folder_by_user(self, user: User) -> str:
+        # Not inside the temp folder: that is deleted when a dataset is published, uploads in progress are not
+        return os.path.join(uploads_root(), "resumable", str(user.id))
 
     def generate_2fa_secret(self):
         return pyotp.random_base32()
@@ -2,6 +2,7 @@ import pytest
 
 from app import create_app, db
 from app.modules.auth.models import User
+from app.modules.public.cache import invalidate_home_lists
 
 
 @pytest.fixture(scope="session")
@@ -31,6 +32,8 @@ def test_client(test_app):
             user_test = User(email="test@example.com", password="test1234")
             db.session.add(user_test)
             db.session.commit()
+            # Cached home page lists hold ids of the previous module's datasets
+            invalidate_home_lists()
 
             print("Rutas registradas:")
             for rule in test_app.url_map.iter_rules():
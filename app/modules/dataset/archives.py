@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+
+from core.configuration.configuration import uploads_root
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+DEFAULT_ARCHIVES_DIR = os.path.join(uploads_root(), "cache", "archives")
+DEFAULT_ARCHIVE_CACHE_SIZE = int(os.getenv("DATASET_ARCHIVE_CACHE_MB", "512")) * 1024 * 1024
+# Every member gets the same timestamp (the earliest ZIP allows) and mode, so rebuilding an archive is byte-exact
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ARCHIVE_FILE_MODE = 0o644
+# Part of every archive key: archives cached before members had fixed headers get new keys (and ETags)
+ARCHIVE_FORMAT = b"deterministic-v1\n"
+
+
+class _ChunkSink:
+    """Write-only file object for ZipFile that keeps what it receives until the generator hands it out."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def _member_info(arcname: str, path: str) -> ZipInfo:
+    """Header of a member that depends only on its name and size, not on the mtime or mode of the file."""
+    zinfo = ZipInfo(arcname, date_time=ARCHIVE_DATE_TIME)
+    zinfo.external_attr = ARCHIVE_FILE_MODE << 16
+    zinfo.file_size = os.path.getsize(path)
+    return zinfo
+
+
+def iter_zip(entries, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """
+    Yields a ZIP archive of `entries` ((name in the archive, path on disk) pairs) chunk by chunk. The output is
+    never seeked, so sizes and CRCs go in data descriptors after each member and nothing touches the disk.
+
+    Members are written in name order with fixed timestamps and modes, so the same names and contents always
+    give the same bytes, whenever and from whichever copy the archive is built.
+    """
+    sink = _ChunkSink()
+    with ZipFile(sink, "w", compression=ZIP_STORED) as zf:
+        for arcname, path in sorted(entries):
+            zinfo = _member_info(arcname, path)
+            with open(path, "rb") as src, zf.open(zinfo, "w") as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def archive_key(entries) -> str:
+    """
+    Content hash of an archive: its (name in the archive, checksum) pairs, sorted. Two downloads with the same
+    key produce the same bytes, so the key is also a strong validator for the archive.
+    """
+    digest = hashlib.sha256(ARCHIVE_FORMAT)
+    for arcname, checksum in sorted(entries):
+        digest.update(f"{arcname}\0{checksum}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ArchiveCache:
+    """
+    Finished archives on disk, one file per archive key, evicted least-recently-used first once their total
+    size goes over `max_size`. Hits refresh the file mtime, which is what the eviction order uses.
+
+    The root is made absolute: cached paths go to send_file, which resolves relative paths against the app's
+    root_path instead of the cwd they were written to.
+    """
+
+    def __init__(self, root: str, max_size: int):
+        self.root = os.path.abspath(root)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.zip")
+
+    def get(self, key: str) -> str | None:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def stream(self, key: str, entries, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+        """
+        Yields the archive of `entries` while writing it to the cache. It is only published under its key
+        once it has been generated entirely, so an interrupted download never leaves a truncated archive.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}.tmp")
+        completed = False
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter_zip(entries, chunk_size=chunk_size):
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, self.path(key))
+            completed = True
+            self.evict(keep=self.path(key))
+        finally:
+            if not completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def store(self, key: str, chunks) -> str:
+        """
+        Caches an archive that comes as a stream of chunks (e.g. a download) and returns its path. As with
+        `stream`, nothing is published under the key if the chunks stop with an error.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, self.path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=self.path(key))
+        return self.path(key)
+
+    def build(self, key: str, entries) -> str:
+        """Path of the cached archive, generating it first when it isn't cached yet."""
+        path = self.get(key)
+        if path is None:
+            for _ in self.stream(key, entries):
+                pass
+            path = self.path(key)
+        return path
+
+    def evict(self, keep: str | None = None):
+        """`keep` is never evicted, so an archive larger than the whole cache can still be sent once."""
+        with self._lock:
+            archives = []
+            for entry in os.scandir(self.root):
+                if entry.is_file() and entry.name.endswith(".zip"):
+                    stat = entry.stat()
+                    archives.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in archives)
+            for _, size, path in sorted(archives):
+                if total <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as exc:
+                    logger.warning(f"Could not evict cached archive {path}: {exc}")
+
+
+archive_cache = ArchiveCache(os.getenv("DATASET_ARCHIVES_DIR", DEFAULT_ARCHIVES_DIR), DEFAULT_ARCHIVE_CACHE_SIZE)
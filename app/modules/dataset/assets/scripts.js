@@ -322,6 +322,208 @@ function appendUploadedModel(filename) {
   fileList.appendChild(listItem);
 }
 
+// Chunked ZIP upload: the archive goes in ZIP_CHUNK_SIZE pieces, so a dropped connection
+// only repeats the chunk in flight (the server tells the offset to resume from)
+const ZIP_CHUNK_SIZE = 8 * 1024 * 1024;
+const ZIP_CHUNK_RETRIES = 5;
+
+function zipUploadOffset(location) {
+  return fetch(location, { method: "HEAD" }).then((r) => {
+    if (!r.ok) {
+      const err = new Error("Upload lost (" + r.status + ")");
+      err.fatal = true;
+      throw err;
+    }
+    return parseInt(r.headers.get("Upload-Offset"), 10);
+  });
+}
+
+// Sends the chunk at `offset` and resolves to the offset the server reached
+function sendZipChunk(file, location, offset, retriesLeft) {
+  const chunk = file.slice(offset, offset + ZIP_CHUNK_SIZE);
+  return fetch(location, {
+    method: "PATCH",
+    headers: {
+      "Content-Type": "application/offset+octet-stream",
+      "Upload-Offset": String(offset),
+    },
+    body: chunk,
+  })
+    .then((r) => {
+      if (r.ok) return parseInt(r.headers.get("Upload-Offset"), 10);
+      if (r.status < 500 && r.status !== 409) {
+        return r.json().then((j) => {
+          const err = new Error(j.message || "ZIP error (" + r.status + ")");
+          err.fatal = true;
+          throw err;
+        });
+      }
+      throw new Error("ZIP error (" + r.status + ")");
+    })
+    .catch((err) => {
+      if (err.fatal || retriesLeft <= 0) throw err;
+      // Ask where the server got to and carry on from there
+      return new Promise((resolve) => setTimeout(resolve, 1000))
+        .then(() => zipUploadOffset(location))
+        .then((current) =>
+          current >= file.size
+            ? current
+            : sendZipChunk(file, location, current, retriesLeft - 1)
+        );
+    });
+}
+
+function sendZipChunks(file, location, offset) {
+  if (offset >= file.size) return Promise.resolve();
+  return sendZipChunk(file, location, offset, ZIP_CHUNK_RETRIES).then((next) =>
+    sendZipChunks(file, location, next)
+  );
+}
+
+function uploadZipResumable(file) {
+  return fetch("/dataset/zip/uploads", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: file.name, length: file.size }),
+  })
+    .then((r) =>
+      r.json().then((j) => {
+        if (!r.ok) throw new Error(j.message || "ZIP error (" + r.status + ")");
+        return j.location;
+      })
+    )
+    .then((location) =>
+      sendZipChunks(file, location, 0).then(() =>
+        fetch(location + "/finalize", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: "{}",
+        })
+      )
+    )
+    .then((r) =>
+      r.json().then((j) => ({ ok: r.ok, status: r.status, body: j }))
+    );
+}
+
+// MD5 of an ArrayBuffer as lowercase hex. SubtleCrypto has no MD5, and MD5 is the checksum the hub
+// stores for every file, so it is computed here (files are at most a few MB)
+const MD5_SHIFTS = [7, 12, 17, 22, 5, 9, 14, 20, 4, 11, 16, 23, 6, 10, 15, 21];
+const MD5_CONSTANTS = Array.from(
+  { length: 64 },
+  (_, i) => Math.floor(Math.abs(Math.sin(i + 1)) * 2 ** 32) | 0
+);
+
+function md5Hex(buffer) {
+  const length = buffer.byteLength;
+  const padded = new Uint8Array((((length + 8) >> 6) + 1) * 64);
+  padded.set(new Uint8Array(buffer));
+  padded[length] = 0x80;
+  const view = new DataView(padded.buffer);
+  view.setUint32(padded.length - 8, (length * 8) >>> 0, true);
+  view.setUint32(padded.length - 4, Math.floor(length / 0x20000000), true);
+
+  const state = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476];
+  const words = new Int32Array(16);
+  for (let block = 0; block < padded.length; block += 64) {
+    for (let i = 0; i < 16; i++) words[i] = view.getInt32(block + i * 4, true);
+    let [a, b, c, d] = state;
+    for (let i = 0; i < 64; i++) {
+      let f, g;
+      if (i < 16) {
+        f = (b & c) | (~b & d);
+        g = i;
+      } else if (i < 32) {
+        f = (d & b) | (~d & c);
+        g = (5 * i + 1) % 16;
+      } else if (i < 48) {
+        f = b ^ c ^ d;
+        g = (3 * i + 5) % 16;
+      } else {
+        f = c ^ (b | ~d);
+        g = (7 * i) % 16;
+      }
+      const shift = MD5_SHIFTS[(i >> 4) * 4 + (i % 4)];
+      const sum = (a + f + MD5_CONSTANTS[i] + words[g]) | 0;
+      a = d;
+      d = c;
+      c = b;
+      b = (b + ((sum << shift) | (sum >>> (32 - shift)))) | 0;
+    }
+    state[0] = (state[0] + a) | 0;
+    state[1] = (state[1] + b) | 0;
+    state[2] = (state[2] + c) | 0;
+    state[3] = (state[3] + d) | 0;
+  }
+
+  let hex = "";
+  for (const word of state) {
+    for (let k = 0; k < 4; k++) {
+      hex += ((word >>> (8 * k)) & 0xff).toString(16).padStart(2, "0");
+    }
+  }
+  return hex;
+}
+
+// Files dropped together are hashed and checked against the hub in one request; the ones it already
+// stores are linked on the server instead of uploaded again. Anything that fails falls back to uploading
+const DEDUPE_BATCH_DELAY_MS = 100;
+let dedupeQueue = [];
+let dedupeTimer = null;
+
+function dedupeBeforeUpload(dropzone, file, done) {
+  dedupeQueue.push({ dropzone: dropzone, file: file, done: done });
+  if (!dedupeTimer) dedupeTimer = setTimeout(flushDedupeQueue, DEDUPE_BATCH_DELAY_MS);
+}
+
+function flushDedupeQueue() {
+  const batch = dedupeQueue;
+  dedupeQueue = [];
+  dedupeTimer = null;
+
+  Promise.all(
+    batch.map((item) =>
+      item.file.arrayBuffer().then((buffer) => (item.checksum = md5Hex(buffer)))
+    )
+  )
+    .then(() =>
+      fetch("/dataset/file/checksums", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ checksums: batch.map((item) => item.checksum) }),
+      })
+    )
+    .then((r) => (r.ok ? r.json() : { known: [] }))
+    .catch(() => ({ known: [] }))
+    .then((result) => {
+      const known = new Set(result.known || []);
+      batch.forEach((item) =>
+        known.has(item.checksum) ? linkKnownFile(item) : item.done()
+      );
+    });
+}
+
+function linkKnownFile(item) {
+  fetch("/dataset/file/link", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ checksum: item.checksum, filename: item.file.name }),
+  })
+    .then((r) =>
+      r.ok ? r.json() : Promise.reject(new Error("Link error (" + r.status + ")"))
+    )
+    .then(
+      (response) => {
+        // Finish the file the way Dropzone does after an upload; `done` is never called, so nothing is sent
+        item.file.accepted = true;
+        item.file.status = Dropzone.SUCCESS;
+        item.dropzone.emit("success", item.file, response);
+        item.dropzone.emit("complete", item.file);
+      },
+      () => item.done()
+    );
+}
+
 // handlers ZIP / GitHub
 function onZipSelected(e) {
   e.preventDefault();
@@ -357,13 +559,7 @@ function onZipSelected(e) {
     return;
   }
 
-  const fd = new FormData();
-  fd.append("file", zipInput.files[0]);
-
-  fetch("/dataset/zip/upload", { method: "POST", body: fd })
-    .then((r) =>
-      r.json().then((j) => ({ ok: r.ok, status: r.status, body: j }))
-    )
+  uploadZipResumable(zipInput.files[0])
     .then(({ ok, status, body }) => {
       if (!ok) throw new Error(body.message || "ZIP error (" + status + ")");
 
@@ -382,10 +578,23 @@ function onZipSelected(e) {
           ignoredList.appendChild(li);
         }
       });
+      // .poke files that failed validation are not saved; show why
+      (body.report || [])
+        .filter((entry) => !entry.valid)
+        .forEach((entry) => {
+          if (ignoredList) {
+            const li = document.createElement("li");
+            li.textContent = `${entry.file}: ${(entry.errors || []).join(" ")}`;
+            ignoredList.appendChild(li);
+          }
+        });
 
       if (savedBox && (body.saved || []).length)
         savedBox.style.display = "block";
-      if (ignoredBox && (body.ignored || []).length)
+      if (
+        ignoredBox &&
+        ((body.ignored || []).length || (body.invalid || []).length)
+      )
         ignoredBox.style.display = "block";
 
       showToast(
@@ -443,7 +652,13 @@ function onGithubImport(e) {
   fetch("/dataset/github/import", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ repo_url: url, branch: branch, subdir: subdir }),
+    // Re-importing a repository only brings in the files that are new or changed since the last import
+    body: JSON.stringify({
+      repo_url: url,
+      branch: branch,
+      subdir: subdir,
+      mode: "incremental",
+    }),
   })
     .then((r) =>
       r.json().then((j) => ({ ok: r.ok, status: r.status, body: j }))
@@ -452,13 +667,15 @@ function onGithubImport(e) {
       if (!ok)
         throw new Error(body.message || "GitHub import error (" + status + ")");
 
+      // Modified files replace a file already in the list, so only added ones get a new entry
+      const added = new Set(body.added || body.saved || []);
       (body.saved || []).forEach((fn) => {
         if (savedList) {
           const li = document.createElement("li");
-          li.textContent = fn;
+          li.textContent = added.has(fn) ? fn : `${fn} (actualizado)`;
           savedList.appendChild(li);
         }
-        appendUploadedModel(fn);
+        if (added.has(fn)) appendUploadedModel(fn);
       });
       (body.ignored || []).forEach((fn) => {
         if (ignoredList) {
@@ -467,15 +684,30 @@ function onGithubImport(e) {
           ignoredList.appendChild(li);
         }
       });
+      // .poke files that failed validation are not saved; show why
+      (body.report || [])
+        .filter((entry) => !entry.valid)
+        .forEach((entry) => {
+          if (ignoredList) {
+            const li = document.createElement("li");
+            li.textContent = `${entry.file}: ${(entry.errors || []).join(" ")}`;
+            ignoredList.appendChild(li);
+          }
+        });
 
       if (savedBox && (body.saved || []).length)
         savedBox.style.display = "block";
-      if (ignoredBox && (body.ignored || []).length)
+      if (
+        ignoredBox &&
+        ((body.ignored || []).length || (body.invalid || []).length)
+      )
         ignoredBox.style.display = "block";
 
       showToast(
         "success",
-        `GitHub import: ${(body.saved || []).length} archivos .poke añadidos`
+        `GitHub import: ${added.size} archivos .poke añadidos, ` +
+          `${(body.modified || []).length} actualizados, ` +
+          `${(body.unchanged || []).length} sin cambios`
       );
     })
     .catch((err) => {
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+from urllib.parse import urlparse
+
+import requests
+
+from app.modules.dataset.archives import ArchiveCache
+from core.configuration.configuration import uploads_root
+
+logger = logging.getLogger(__name__)
+
+CODELOAD_URL = "https://codeload.github.com"
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_TIMEOUT = 60
+DEFAULT_GITHUB_ARCHIVES_DIR = os.path.join(uploads_root(), "cache", "github")
+GITHUB_ARCHIVE_MAX_SIZE = int(os.getenv("GITHUB_ARCHIVE_MAX_MB", "500")) * 1024 * 1024
+GITHUB_ARCHIVE_CACHE_SIZE = int(os.getenv("GITHUB_ARCHIVE_CACHE_MB", "1024")) * 1024 * 1024
+
+
+class GithubArchiveError(Exception):
+    """The archive could not be downloaded: GitHub answered with an error or it is over the size ceiling."""
+
+
+def parse_repo_url(repo_url: str) -> tuple:
+    """(owner, repo) of a GitHub repository URL; ValueError when it isn't one."""
+    if not repo_url:
+        raise ValueError("repo_url is required")
+
+    parsed = urlparse(repo_url)
+    if "github.com" not in parsed.netloc.lower():
+        raise ValueError("Only GitHub URLs are supported")
+
+    parts = [p for p in parsed.path.split("/") if p]
+    if len(parts) < 2:
+        raise ValueError("Invalid GitHub repo URL")
+
+    owner, repo = parts[0], parts[1]
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return owner, repo
+
+
+class GithubArchiveFetcher:
+    """
+    Downloads branch archives from codeload and keeps them on disk, so importing the same repository and
+    branch again costs a conditional request: the last ETag goes in If-None-Match and a 304 reuses the copy.
+
+    Archives are streamed straight to the cache in fixed-size chunks and refused past `max_size`, so a large
+    team repository never sits in worker memory. Each (owner, repo, branch) has a small JSON record with its
+    current ETag; the archive itself is cached under a key made of both, so a record never points at the
+    bytes of another version, and old versions go away with the cache's LRU eviction.
+    """
+
+    def __init__(self, cache: ArchiveCache, base_url: str = CODELOAD_URL, max_size: int = GITHUB_ARCHIVE_MAX_SIZE):
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.max_size = max_size
+
+    def archive_url(self, owner: str, repo: str, branch: str) -> str:
+        return f"{self.base_url}/{owner}/{repo}/zip/refs/heads/{branch}"
+
+    @staticmethod
+    def _repo_key(owner: str, repo: str, branch: str) -> str:
+        return hashlib.sha256(f"{owner.lower()}/{repo.lower()}/{branch}".encode("utf-8")).hexdigest()
+
+    def _record_path(self, repo_key: str) -> str:
+        return os.path.join(self.cache.root, f"{repo_key}.json")
+
+    def _read_record(self, repo_key: str) -> dict:
+        try:
+            with open(self._record_path(repo_key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_record(self, repo_key: str, record: dict):
+        path = self._record_path(repo_key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def _chunks(self, resp):
+        received = 0
+        for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            received += len(chunk)
+            if received > self.max_size:
+                raise GithubArchiveError(f"Archive exceeds the maximum size of {self.max_size} bytes")
+            yield chunk
+
+    def fetch(self, owner: str, repo: str, branch: str) -> str:
+        """Path of the branch archive on disk, revalidated with GitHub (or downloaded) first."""
+        url = self.archive_url(owner, repo, branch)
+        repo_key = self._repo_key(owner, repo, branch)
+        record = self._read_record(repo_key)
+
+        cached_path = None
+        headers = {}
+        if record.get("etag"):
+            cached_path = self.cache.get(record["archive_key"])
+            if cached_path:
+                headers["If-None-Match"] = record["etag"]
+
+        resp = requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        try:
+            if resp.status_code == 304 and cached_path:
+                logger.info(f"GitHub archive {owner}/{repo}@{branch} not modified, using the cached copy")
+                return cached_path
+            if resp.status_code != 200:
+                raise GithubArchiveError(f"GitHub returned {resp.status_code}")
+
+            content_length = resp.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > self.max_size:
+                raise GithubArchiveError(f"Archive exceeds the maximum size of {self.max_size} bytes")
+
+            etag = resp.headers.get("ETag")
+            archive_key = hashlib.sha256(f"{repo_key}\0{etag or ''}".encode("utf-8")).hexdigest()
+            path = self.cache.store(archive_key, self._chunks(resp))
+        finally:
+            resp.close()
+
+        # Without an ETag there is nothing to revalidate with, so the next import downloads again
+        self._write_record(repo_key, {"url": url, "etag": etag, "archive_key": archive_key} if etag else {})
+        return path
+
+
+github_archives = GithubArchiveFetcher(
+    ArchiveCache(os.getenv("GITHUB_ARCHIVES_DIR", DEFAULT_GITHUB_ARCHIVES_DIR), GITHUB_ARCHIVE_CACHE_SIZE)
+)
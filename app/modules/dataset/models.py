@@ -28,6 +28,38 @@ class Author(db.Model):
         return {"name": self.name, "affiliation": self.affiliation, "orcid": self.orcid}
 
 
+ds_meta_data_tags = db.Table(
+    "ds_meta_data_tag",
+    db.Column("ds_meta_data_id", db.Integer, db.ForeignKey("ds_meta_data.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), primary_key=True, index=True),
+)
+
+
+class Tag(db.Model):
+    """
+    One row per distinct tag. The comma-separated `tags` strings of DSMetaData and FMMetaData stay what users
+    edit; TagRepository.sync_tags() mirrors them into the association tables. `dataset_count` is how many
+    datasets carry the tag (in their own metadata or in any of their models), kept by TagRepository.refresh_counts.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+    dataset_count = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    @staticmethod
+    def names_from(raw: str | None) -> list:
+        """Tag names in a comma-separated string, stripped and without repeats (ignoring case), in order."""
+        names = {}
+        for name in (raw or "").split(","):
+            name = name.strip()
+            if name:
+                names.setdefault(name.lower(), name)
+        return list(names.values())
+
+    def __repr__(self):
+        return f"Tag<{self.name}>"
+
+
 class DSMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     number_of_models = db.Column(db.String(120))
@@ -49,6 +81,7 @@ class DSMetaData(db.Model):
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
     authors = db.relationship("Author", backref="ds_meta_data", lazy=True, cascade="all, delete")
+    tag_list = db.relationship("Tag", secondary=ds_meta_data_tags, lazy=True)
 
     def get_all_tags(self):
         res, aux = set(), set()
@@ -108,8 +141,24 @@ class DataSet(db.Model):
         return [file for fm in self.poke_models for file in fm.files]
 
     def delete(self):
+        from app.modules.dataset.repositories import TagRepository
+        from app.modules.hubfile.blobs import blob_store
+        from app.modules.hubfile.repositories import HubfileBlobRepository
+        from app.modules.public.repositories import SiteCountersRepository
+
+        tag_ids = {tag.id for tag in self.ds_meta_data.tag_list}
+        tag_ids.update(tag.id for fm in self.poke_models if fm.fm_meta_data for tag in fm.fm_meta_data.tag_list)
+        blob_repository = HubfileBlobRepository()
+        orphan_checksums = [file.checksum for file in self.files() if blob_repository.release(file.checksum) == 0]
+        SiteCountersRepository().add(
+            poke_models=-len(self.poke_models), synchronized_datasets=-1 if self.ds_meta_data.dataset_doi else 0
+        )
         db.session.delete(self)
+        TagRepository().refresh_counts(tag_ids)
         db.session.commit()
+        # Blobs no Hubfile uses any more are removed once the deletion is committed
+        for checksum in orphan_checksums:
+            blob_store.delete(checksum)
 
     def get_cleaned_publication_type(self):
         return self.ds_meta_data.publication_type.name.replace("_", " ").title()
@@ -155,17 +204,19 @@ class DataSet(db.Model):
         }
 
     def to_indexed(self):
+        # Every poke model has its sets stored (`rosemary pokesets:backfill` for the ones that predate PokeSet)
+        pokemons = [poke_set.to_pokemon() for pm in self.poke_models for poke_set in pm.poke_sets]
         return {
             "title": self.ds_meta_data.title,
             "description": self.ds_meta_data.description,
             "tags": list(self.ds_meta_data.get_all_tags()),
             "authors": [author.name for author in self.ds_meta_data.get_all_authors()],
             "created_at": self.created_at.isoformat(),
-            "pokemons": [pm.get_pokemon().name for pm in self.poke_models],
-            "abilities": [pm.get_pokemon().ability for pm in self.poke_models],
-            "moves": [move for pm in self.poke_models for move in pm.get_pokemon().moves],
-            "max_ev_count": max(pm.get_total_evs() for pm in self.poke_models) if self.poke_models else 0,
-            "max_iv_count": max(pm.get_total_ivs() for pm in self.poke_models) if self.poke_models else 0,
+            "pokemons": [pokemon.name for pokemon in pokemons],
+            "abilities": [pokemon.ability for pokemon in pokemons],
+            "moves": [move for pokemon in pokemons for move in pokemon.moves],
+            "max_ev_count": max(sum(pokemon.evs.values()) for pokemon in pokemons) if pokemons else 0,
+            "max_iv_count": max(sum(pokemon.ivs.values()) for pokemon in pokemons) if pokemons else 0,
             "doi": self.ds_meta_data.dataset_doi,
         }
 
@@ -3,9 +3,22 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from flask_login import current_user
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, select, union, update
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.modules.dataset.models import Author, DataSet, DOIMapping, DSDownloadRecord, DSMetaData, DSViewRecord
+from app.modules.dataset.models import (
+    Author,
+    DataSet,
+    DOIMapping,
+    DSComment,
+    DSDownloadRecord,
+    DSMetaData,
+    DSViewRecord,
+    Tag,
+    ds_meta_data_tags,
+)
+from app.modules.public.cache import invalidate_home_lists
+from app.modules.public.repositories import SiteCountersRepository
 from core.repositories.BaseRepository import BaseRepository
 
 logger = logging.getLogger(__name__)
@@ -20,9 +33,12 @@ class DSDownloadRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSDownloadRecord)
 
+    def create(self, commit: bool = True, **kwargs) -> DSDownloadRecord:
+        SiteCountersRepository().add(dataset_downloads=1)
+        return super().create(commit=commit, **kwargs)
+
     def total_dataset_downloads(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
-        return max_id if max_id is not None else 0
+        return self.count()
 
 
 class DSMetaDataRepository(BaseRepository):
@@ -32,14 +48,87 @@ class DSMetaDataRepository(BaseRepository):
     def filter_by_doi(self, doi: str) -> Optional[DSMetaData]:
         return self.model.query.filter_by(dataset_doi=doi).first()
 
+    def update(self, id: int, **kwargs) -> Optional[DSMetaData]:
+        instance = self.get_by_id(id)
+        if instance is not None and "tags" in kwargs:
+            instance.tags = kwargs["tags"]
+            tag_repository = TagRepository()
+            tag_repository.refresh_counts(tag_repository.sync_tags(instance))
+        if instance is not None and instance.data_set is not None and "dataset_doi" in kwargs:
+            # Getting or losing a DOI is what (un)publishes the dataset
+            published = kwargs["dataset_doi"] is not None
+            if published != (instance.dataset_doi is not None):
+                SiteCountersRepository().add(synchronized_datasets=1 if published else -1)
+                invalidate_home_lists()
+        return super().update(id, **kwargs)
+
+
+class TagRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(Tag)
+
+    def get_or_create(self, names: list) -> list:
+        """The Tag of each name, in order, adding the missing ones. Names that only differ in case share a tag."""
+        if not names:
+            return []
+        keys = [name.lower() for name in names]
+        existing = {tag.name.lower(): tag for tag in self.model.query.filter(func.lower(self.model.name).in_(keys))}
+        tags = []
+        for name, key in zip(names, keys):
+            tag = existing.get(key)
+            if tag is None:
+                tag = existing[key] = self.create(commit=False, name=name, dataset_count=0)
+            tags.append(tag)
+        return tags
+
+    def sync_tags(self, metadata) -> set:
+        """
+        Links a DSMetaData or FMMetaData to the tags in its `tags` string. Returns the ids of the tags it gained
+        or lost, which refresh_counts() has to recount once the rest of the change is in the session.
+        Committed by the caller.
+        """
+        before = {tag.id for tag in metadata.tag_list}
+        metadata.tag_list = self.get_or_create(Tag.names_from(metadata.tags))
+        return before ^ {tag.id for tag in metadata.tag_list}
+
+    @staticmethod
+    def _tagged_datasets(tag_ids):
+        """(tag_id, data_set_id) pairs, without repeats, for the datasets carrying any of `tag_ids`."""
+        from app.modules.pokemodel.models import PokeModel, fm_meta_data_tags
+
+        return union(
+            select(ds_meta_data_tags.c.tag_id, DataSet.id.label("data_set_id"))
+            .join_from(ds_meta_data_tags, DataSet, DataSet.ds_meta_data_id == ds_meta_data_tags.c.ds_meta_data_id)
+            .where(ds_meta_data_tags.c.tag_id.in_(tag_ids)),
+            select(fm_meta_data_tags.c.tag_id, PokeModel.data_set_id)
+            .join_from(fm_meta_data_tags, PokeModel, PokeModel.fm_meta_data_id == fm_meta_data_tags.c.fm_meta_data_id)
+            .where(fm_meta_data_tags.c.tag_id.in_(tag_ids)),
+        ).subquery()
+
+    def refresh_counts(self, tag_ids):
+        """Recounts the datasets carrying each of the tags, in one aggregate query. Committed by the caller."""
+        tag_ids = sorted(tag_ids)
+        if not tag_ids:
+            return
+        self.session.flush()
+        tagged = self._tagged_datasets(tag_ids)
+        counts = dict(self.session.execute(select(tagged.c.tag_id, func.count()).group_by(tagged.c.tag_id)).all())
+        self.session.execute(
+            update(Tag), [{"id": tag_id, "dataset_count": counts.get(tag_id, 0)} for tag_id in tag_ids]
+        )
+
+    def dataset_ids_with(self, name: str):
+        """Select of the ids of the datasets carrying the tag `name` (in any case), for use in an IN filter."""
+        tagged = self._tagged_datasets(select(self.model.id).where(func.lower(self.model.name) == name.lower()))
+        return select(tagged.c.data_set_id)
+
 
 class DSViewRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(DSViewRecord)
 
     def total_dataset_views(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
-        return max_id if max_id is not None else 0
+        return self.count()
 
     def the_record_exists(self, dataset: DataSet, user_cookie: str):
         return self.model.query.filter_by(
@@ -49,6 +138,7 @@ class DSViewRecordRepository(BaseRepository):
         ).first()
 
     def create_new_record(self, dataset: DataSet, user_cookie: str) -> DSViewRecord:
+        SiteCountersRepository().add(dataset_views=1)
         return self.create(
             user_id=current_user.id if current_user.is_authenticated else None,
             dataset_id=dataset.id,
@@ -60,13 +150,68 @@ class DSViewRecordRepository(BaseRepository):
         return self.model.query.filter_by(dataset_id=dataset_id).count()
 
 
+def _load_profiles() -> dict:
+    """
+    What each kind of page reads of a dataset, as loader options. Collections go through selectinload (one
+    extra query per relationship, whatever the number of rows) and many-to-one links through joinedload, so a
+    page costs the same few queries for a dataset with one model or with hundreds.
+    """
+    from app.modules.auth.models import User
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    models = selectinload(DataSet.poke_models)
+    return {
+        # view_dataset.html: metadata, owner, every file and the comments with their authors
+        "dataset_detail": (
+            joinedload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+            joinedload(DataSet.user).joinedload(User.profile),
+            models.selectinload(PokeModel.files),
+            selectinload(DataSet.comments).joinedload(DSComment.user).joinedload(User.profile),
+        ),
+        # Dataset cards in lists and on the home page: metadata, owner and the total size of the files. Only
+        # selectin loads, which keep the columns of the main query (the trending ones GROUP BY the dataset) as
+        # they are
+        "dataset_card": (
+            selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+            selectinload(DataSet.user).selectinload(User.profile),
+            models.selectinload(PokeModel.files),
+        ),
+        # Edit form of a draft, which lists every model with its title and files, and publishing it, which
+        # moves those files
+        "dataset_edit": (
+            joinedload(DataSet.ds_meta_data),
+            models.selectinload(PokeModel.files),
+            models.joinedload(PokeModel.fm_meta_data),
+        ),
+        # Ownership and draft checks before changing a dataset: nothing but its own row
+        "dataset_minimal": (),
+        # DataSet.to_dict() and the REST API, including the metadata and authors of every model
+        "dataset_api": (
+            selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+            models.selectinload(PokeModel.files),
+            models.selectinload(PokeModel.fm_meta_data).selectinload(FMMetaData.authors),
+        ),
+    }
+
+
 class DataSetRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
 
+    def with_profile(self, profile: str, query=None):
+        """`query` (all datasets by default) with the relationships of a named loading profile eagerly loaded."""
+        profiles = _load_profiles()
+        if profile not in profiles:
+            raise ValueError(f"Unknown loading profile: {profile}")
+        return (query if query is not None else self.model.query).options(*profiles[profile])
+
+    def get_by_doi(self, doi: str, profile: str = "dataset_detail") -> Optional[DataSet]:
+        return self.with_profile(profile).join(DSMetaData).filter(DSMetaData.dataset_doi == doi).first()
+
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return (
-            self.model.query.join(DSMetaData)
+            self.with_profile("dataset_card")
+            .join(DSMetaData)
             .filter(DataSet.user_id == current_user_id, DSMetaData.dataset_doi.isnot(None))
             .order_by(self.model.created_at.desc())
             .all()
@@ -74,15 +219,19 @@ class DataSetRepository(BaseRepository):
 
     def get_unsynchronized(self, current_user_id: int) -> DataSet:
         return (
-            self.model.query.join(DSMetaData)
+            self.with_profile("dataset_card")
+            .join(DSMetaData)
             .filter(DataSet.user_id == current_user_id, DSMetaData.dataset_doi.is_(None))
             .order_by(self.model.created_at.desc())
             .all()
         )
 
-    def get_unsynchronized_dataset(self, current_user_id: int, dataset_id: int) -> DataSet:
+    def get_unsynchronized_dataset(
+        self, current_user_id: int, dataset_id: int, profile: str = "dataset_minimal"
+    ) -> DataSet:
         return (
-            self.model.query.join(DSMetaData)
+            self.with_profile(profile)
+            .join(DSMetaData)
             .filter(DataSet.user_id == current_user_id, DataSet.id == dataset_id, DSMetaData.dataset_doi.is_(None))
             .first()
         )
@@ -93,9 +242,16 @@ class DataSetRepository(BaseRepository):
     def count_unsynchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.is_(None)).count()
 
+    def get_cards_by_ids(self, ids) -> list:
+        """The datasets with these ids, loaded for their cards, in no particular order."""
+        if not ids:
+            return []
+        return self.with_profile("dataset_card").filter(self.model.id.in_(ids)).all()
+
     def latest_synchronized(self):
         return (
-            self.model.query.join(DSMetaData)
+            self.with_profile("dataset_card")
+            .join(DSMetaData)
             .filter(DSMetaData.dataset_doi.isnot(None))
             .order_by(desc(self.model.id))
             .limit(5)
@@ -105,7 +261,8 @@ class DataSetRepository(BaseRepository):
     def trending_by_views(self, limit: int = 5, days: int = 30):
         cutoff = datetime.utcnow() - timedelta(days=days)
         return (
-            self.model.query.join(DSViewRecord)
+            self.with_profile("dataset_card")
+            .join(DSViewRecord)
             .filter(DSViewRecord.view_date >= cutoff)
             .group_by(self.model.id)
             .with_entities(self.model, func.count(DSViewRecord.id))
@@ -117,7 +274,8 @@ class DataSetRepository(BaseRepository):
     def trending_by_downloads(self, limit: int = 5, days: int = 30):
         cutoff = datetime.utcnow() - timedelta(days=days)
         return (
-            self.model.query.join(DSDownloadRecord)
+            self.with_profile("dataset_card")
+            .join(DSDownloadRecord)
             .filter(DSDownloadRecord.download_date >= cutoff)
             .group_by(self.model.id)
             .with_entities(self.model, func.count(DSDownloadRecord.id))
@@ -1,43 +1,85 @@
-import io
 import json
 import logging
 import os
+import re
 import shutil
-import tempfile
 import uuid
+import zlib
 from datetime import datetime, timezone
-from urllib.parse import urlparse
 from zipfile import ZipFile
 
-import requests
-from flask import abort, flash, jsonify, make_response, redirect, render_template, request, send_from_directory, url_for
+from flask import (
+    Response,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
-from werkzeug.datastructures import FileStorage
 
 from app import db
 from app.modules.dataset import dataset_bp
+from app.modules.dataset.archives import archive_cache, archive_key
 from app.modules.dataset.forms import DataSetCommentForm, DataSetForm
+from app.modules.dataset.github_archives import GithubArchiveError, github_archives, parse_repo_url
 from app.modules.dataset.models import DSComment, DSDownloadRecord
 from app.modules.dataset.services import (
     AuthorService,
     DataSetService,
     DOIMappingService,
     DSDownloadRecordService,
-    DSMetaDataService,
     DSViewRecordService,
 )
+from app.modules.dataset.uploads import (
+    UPLOAD_MULTIPART_OVERHEAD,
+    FileDigest,
+    ImportSources,
+    ResumableUpload,
+    UniqueNameAllocator,
+    UploadRejected,
+    delete_file_metadata,
+    digest_file,
+    map_bounded,
+    receive_poke_upload,
+    replacing,
+    write_file_metadata,
+)
+from app.modules.hubfile.blobs import blob_store
+from app.modules.hubfile.repositories import HubfileBlobRepository, HubfileRepository
+from app.modules.pokemodel.cache import invalidate_pokemon
+from app.modules.pokemodel.inverted_index import poke_index
 from app.modules.pokemodel.models import PokeModel
 from app.modules.pokemodel.repositories import PokeModelRepository
-from app.modules.pokemon_check.check_poke import PokemonSetChecker
+from app.modules.pokemodel.similarity import similar_sets
+from app.modules.pokemodel.stats import poke_stats
+from app.modules.pokemon_check.bulk import validate_members
 from app.modules.shopping_cart.services import ShoppingCartService
 from app.modules.zenodo.services import ZenodoService
+from core.configuration.configuration import uploads_root
+from core.helpers.file_delivery import (
+    REVALIDATE_PRIVATE,
+    REVALIDATE_PUBLIC,
+    deliver_file,
+    is_first_request_of_download,
+    is_not_modified,
+    last_modified_of,
+    not_modified_response,
+)
 
 logger = logging.getLogger(__name__)
 
+CHECKSUM_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+MAX_CHECKSUMS_PER_REQUEST = 1000
+
 
 dataset_service = DataSetService()
 author_service = AuthorService()
-dsmetadata_service = DSMetaDataService()
 zenodo_service = ZenodoService()
 doi_mapping_service = DOIMappingService()
 ds_view_record_service = DSViewRecordService()
@@ -131,7 +173,7 @@ def create_dataset():
 @dataset_bp.route("/dataset/<int:dataset_id>/edit", methods=["GET", "POST"])
 @login_required
 def edit_dataset(dataset_id):
-    dataset = dataset_service.get_unsynchronized_dataset(current_user.id, dataset_id)
+    dataset = dataset_service.get_unsynchronized_dataset(current_user.id, dataset_id, profile="dataset_edit")
     if not dataset:
         abort(404)
 
@@ -256,15 +298,14 @@ def delete_existing_feature_model(dataset_id, fm_id):
 
     # 3) Borrar ficheros físicos en uploads/user_{uid}/dataset_{did}/
 
-    working_dir = os.getenv("WORKING_DIR", "")
-    uploads_dir = os.path.join(
-        working_dir,
-        "uploads",
-        f"user_{dataset.user_id}",
-        f"dataset_{dataset.id}",
-    )
+    uploads_dir = os.path.join(uploads_root(), f"user_{dataset.user_id}", f"dataset_{dataset.id}")
     try:
+        blob_repo = HubfileBlobRepository()
+        orphan_checksums = []
         for file in list(fm.files):  # Hubfile
+            invalidate_pokemon(checksum=file.checksum)
+            if blob_repo.release(file.checksum) == 0:
+                orphan_checksums.append(file.checksum)
             file_path = os.path.join(uploads_dir, file.name)
             if os.path.exists(file_path):
                 try:
@@ -273,7 +314,18 @@ def delete_existing_feature_model(dataset_id, fm_id):
                     # si falla el remove físico, seguimos (el cascade borrará en DB)
                     pass
 
-        fm_repo.delete(fm_id)
+        # Los datasets que solo llevaban un tag por este modelo dejan de contar para él
+        tag_ids = {tag.id for tag in fm.fm_meta_data.tag_list} if fm.fm_meta_data else set()
+        fm_repo.session.delete(fm)
+        dataset_service.tag_repository.refresh_counts(tag_ids)
+        dataset_service.site_counters_repository.add(poke_models=-1)
+        fm_repo.session.commit()
+        # Los blobs sin ningún hubfile que los use se borran una vez confirmado el borrado en BD
+        for checksum in orphan_checksums:
+            blob_store.delete(checksum)
+        poke_stats.remove_models([fm_id])
+        similar_sets.remove_models([fm_id])
+        poke_index.remove_models([fm_id])
         return jsonify({"ok": True, "message": "Feature model deleted"}), 200
     except Exception as exc:
         logger.exception(f"Error deleting feature model {fm_id} from dataset {dataset_id}: {exc}")
@@ -293,41 +345,31 @@ def list_dataset():
 @dataset_bp.route("/dataset/file/upload", methods=["POST"])
 @login_required
 def upload():
-    file: FileStorage = request.files["file"]
     temp_folder = current_user.temp_folder()
+    max_size = current_app.config["POKE_UPLOAD_MAX_SIZE"]
 
-    if not file or not file.filename.endswith(".poke"):
-        return jsonify({"message": "No valid file"}), 400
-
-    # Read content and validate format before saving
-    try:
-        file_content = file.read().decode("utf-8")
-        file.seek(0)  # IMPORTANT: Reset stream so file.save() can read it later
-        checker = PokemonSetChecker(file_content)
-        if not checker.is_valid():
-            return jsonify({"message": "Invalid .poke file format", "errors": checker.get_errors()}), 400
-    except Exception as e:
-        return jsonify({"message": f"Error reading or validating file: {e}"}), 500
+    # The multipart body is parsed by hand (request.files would buffer it first), so oversized
+    # requests can be refused from their headers and invalid files as soon as a broken set arrives
+    if request.content_length and request.content_length > max_size + UPLOAD_MULTIPART_OVERHEAD:
+        return jsonify({"message": f"File exceeds the maximum size of {max_size} bytes"}), 413
 
     # create temp folder
     if not os.path.exists(temp_folder):
         os.makedirs(temp_folder)
 
-    file_path = os.path.join(temp_folder, file.filename)
+    try:
+        received = receive_poke_upload(request.stream, request.content_type, temp_folder, max_size)
+    except UploadRejected as e:
+        return jsonify(e.to_dict()), e.status_code
+    except Exception as e:
+        return jsonify({"message": f"Error reading or validating file: {e}"}), 500
 
-    if os.path.exists(file_path):
-        # Generate unique filename (by recursion)
-        base_name, extension = os.path.splitext(file.filename)
-        i = 1
-        while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
-            i += 1
-        new_filename = f"{base_name} ({i}){extension}"
-        file_path = os.path.join(temp_folder, new_filename)
-    else:
-        new_filename = file.filename
+    new_filename = UniqueNameAllocator(temp_folder).allocate(received["filename"])
+    file_path = os.path.join(temp_folder, new_filename)
 
     try:
-        file.save(file_path)
+        os.replace(received["staging_path"], file_path)
+        write_file_metadata(temp_folder, new_filename, received["metadata"])
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -336,6 +378,9 @@ def upload():
             {
                 "message": "Poke uploaded and validated successfully",
                 "filename": new_filename,
+                "sets": received["sets"],
+                "checksum": received["metadata"]["md5"],
+                "size": received["metadata"]["size"],
             }
         ),
         200,
@@ -351,11 +396,247 @@ def delete():
 
     if os.path.exists(filepath):
         os.remove(filepath)
+        delete_file_metadata(temp_folder, filename)
         return jsonify({"message": "File deleted successfully"})
 
     return jsonify({"error": "Error: File not found"})
 
 
+@dataset_bp.route("/dataset/file/checksums", methods=["POST"])
+@login_required
+def known_checksums():
+    """
+    Which of the given MD5 checksums the hub already stores in a file the user may reuse (any published
+    dataset or one of their own), so the browser can link those instead of uploading them again.
+    """
+    data = request.get_json(silent=True) or {}
+    checksums = data.get("checksums")
+    if not isinstance(checksums, list) or len(checksums) > MAX_CHECKSUMS_PER_REQUEST:
+        return (
+            jsonify({"message": f"checksums must be a list of at most {MAX_CHECKSUMS_PER_REQUEST} MD5 checksums"}),
+            400,
+        )
+
+    checksums = {c.lower() for c in checksums if isinstance(c, str) and CHECKSUM_PATTERN.match(c.lower())}
+    found = HubfileRepository().find_reusable(checksums, current_user.id)
+    return jsonify({"known": sorted(found)}), 200
+
+
+@dataset_bp.route("/dataset/file/link", methods=["POST"])
+@login_required
+def link_known_file():
+    """Adds a file the hub already stores to the temp folder, as if it had just been uploaded."""
+    data = request.get_json(silent=True) or {}
+    checksum = str(data.get("checksum") or "").lower()
+    filename = os.path.basename(str(data.get("filename") or ""))
+    if not CHECKSUM_PATTERN.match(checksum) or not filename.endswith(".poke"):
+        return jsonify({"message": "A checksum and a .poke filename are required"}), 400
+
+    found = HubfileRepository().find_reusable([checksum], current_user.id).get(checksum)
+    if found is None:
+        return jsonify({"message": "No file with that checksum can be reused"}), 404
+
+    name, owner_id, dataset_id = found
+    source_path = os.path.join(uploads_root(), f"user_{owner_id}", f"dataset_{dataset_id}", name)
+    temp_folder = current_user.temp_folder()
+    os.makedirs(temp_folder, exist_ok=True)
+    new_filename = UniqueNameAllocator(temp_folder).allocate(filename)
+    file_path = os.path.join(temp_folder, new_filename)
+
+    if not blob_store.materialize(checksum, file_path, source_path=source_path):
+        return jsonify({"message": "The stored file could not be found"}), 404
+
+    metadata = digest_file(file_path).to_metadata()
+    if metadata["md5"] != checksum:
+        # The stored copy doesn't match its recorded checksum; let the browser upload the file instead
+        os.remove(file_path)
+        return jsonify({"message": "The stored file does not match its checksum"}), 409
+    write_file_metadata(temp_folder, new_filename, metadata)
+
+    return (
+        jsonify(
+            {
+                "message": "Poke linked from an existing file",
+                "filename": new_filename,
+                "checksum": checksum,
+                "size": metadata["size"],
+                "linked": True,
+            }
+        ),
+        200,
+    )
+
+
+def _iter_zip_poke_members(zf: ZipFile, prefix: str, ignored: list, invalid: list, max_size: int, skip=None):
+    """
+    Yields (name, bytes) for the .poke members of the archive; unsafe paths and other files are ignored, and
+    so are the members `skip(member)` says need no extracting, without decompressing them. Members over
+    `max_size` (the single file upload limit) are invalid: their declared size is checked first, and at most
+    `max_size + 1` bytes are decompressed, so a forged header cannot make one expand further.
+    """
+    for member in zf.infolist():
+        name = member.filename
+
+        if member.is_dir():
+            continue
+
+        if prefix and not name.startswith(prefix):
+            continue
+
+        norm = os.path.normpath(name).replace("\\", "/")
+        if norm.startswith("../") or norm.startswith("/"):
+            ignored.append(name)
+            continue
+
+        if not norm.lower().endswith(".poke"):
+            ignored.append(name)
+            continue
+
+        if member.file_size > max_size:
+            invalid.append(name)
+            continue
+
+        if skip and skip(member):
+            continue
+
+        with zf.open(member) as f:
+            data = f.read(max_size + 1)
+        if len(data) > max_size:
+            invalid.append(name)
+            continue
+
+        yield name, data
+
+
+def _save_valid_members(members, temp_folder: str, saved: list, invalid: list, sources=None, changes=None):
+    """
+    Validates the members in parallel and writes only the ones that pass, on a bounded thread pool; yields one
+    report per member, in archive order.
+
+    With `sources` (ImportSources of the repository being imported) every file records where it came from,
+    and a member already imported from the same path replaces that file instead of getting a new name;
+    `changes` collects the added and modified files.
+    """
+    names = UniqueNameAllocator(temp_folder)
+
+    def allocated():
+        # Names are handed out here, in archive order, so duplicates are numbered the same way every time
+        for name, data, report in validate_members(members):
+            parsed_sets = report.pop("parsed_sets", None)
+            if not report["valid"]:
+                yield name, data, report, None, None, None
+                continue
+            base_filename = os.path.basename(os.path.normpath(name).replace("\\", "/"))
+            if sources is None:
+                yield name, data, report, (names.allocate(base_filename), base_filename), None, parsed_sets
+                continue
+
+            path = sources.path_of(name)
+            crc32 = zlib.crc32(data)
+            report["status"] = sources.status(path, crc32, len(data))
+            previous = sources.draft_filename(path)
+            if previous and report["status"] == ImportSources.MODIFIED:
+                yield name, data, report, (previous, None), (path, crc32), parsed_sets
+            else:
+                yield name, data, report, (names.allocate(base_filename), base_filename), (path, crc32), parsed_sets
+
+    def save(item):
+        name, data, report, allocation, source, parsed_sets = item
+        if allocation is None:
+            return name, report, None
+        candidate, base_filename = allocation
+        if base_filename is None:
+            dst = replacing(os.path.join(temp_folder, candidate))
+        else:
+            candidate, dst = names.open_new(candidate, base_filename)
+        with dst as f:
+            f.write(data)
+        digest = FileDigest()
+        digest.update(data)
+        metadata = {**digest.to_metadata(), "sets": parsed_sets}
+        if source:
+            metadata["source"] = sources.source_record(*source, metadata["md5"])
+        write_file_metadata(temp_folder, candidate, metadata)
+        return name, report, candidate
+
+    for name, report, candidate in map_bounded(save, allocated()):
+        if candidate is None:
+            invalid.append(name)
+        else:
+            saved.append(candidate)
+            report["saved_as"] = candidate
+            if changes is not None:
+                changes[report["status"]].append(candidate)
+        yield report
+
+
+def _wants_ndjson() -> bool:
+    return request.args.get("stream") in ("1", "true") or request.accept_mimetypes.best == "application/x-ndjson"
+
+
+def _bulk_zip_response(
+    source, temp_folder: str, message: str, error_message: str, prefix_for=None, cleanup=None, sources=None
+):
+    """
+    Validates and extracts the .poke members of a ZIP. The per-file report is returned in a single JSON
+    response, or streamed as NDJSON (one report per line, then a summary line) when the client asks for it.
+    `cleanup` runs once the archive has been read, whichever way the report is sent. With `sources` only new
+    and changed members are extracted, and the summary lists the added, modified and unchanged files.
+    """
+    saved, ignored, invalid = [], [], []
+    max_size = current_app.config["POKE_UPLOAD_MAX_SIZE"]
+    changes = {ImportSources.ADDED: [], ImportSources.MODIFIED: [], ImportSources.UNCHANGED: []}
+
+    def unchanged(member) -> bool:
+        path = sources.path_of(member.filename)
+        if sources.status(path, member.CRC, member.file_size) != ImportSources.UNCHANGED:
+            return False
+        changes[ImportSources.UNCHANGED].append(sources.previous_filename(path))
+        return True
+
+    def reports():
+        try:
+            with ZipFile(source) as zf:
+                prefix = prefix_for(zf) if prefix_for else ""
+                members = _iter_zip_poke_members(
+                    zf, prefix, ignored, invalid, max_size, skip=unchanged if sources else None
+                )
+                yield from _save_valid_members(
+                    members, temp_folder, saved, invalid, sources, changes if sources else None
+                )
+        finally:
+            if cleanup:
+                cleanup()
+
+    def summary():
+        body = {"message": message, "saved": saved, "ignored": ignored, "invalid": invalid}
+        if sources:
+            body.update(changes)
+        return body
+
+    if _wants_ndjson():
+
+        def stream():
+            try:
+                for report in reports():
+                    yield json.dumps(report) + "\n"
+            except Exception as e:
+                logger.exception(error_message)
+                yield json.dumps({"message": f"{error_message}: {e}"}) + "\n"
+                return
+            yield json.dumps(summary()) + "\n"
+
+        return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+    try:
+        report = list(reports())
+    except Exception as e:
+        logger.exception(error_message)
+        return jsonify({"message": f"{error_message}: {e}"}), 400
+
+    return jsonify({**summary(), "report": report}), 200
+
+
 # Upload zip
 @dataset_bp.route("/dataset/zip/upload", methods=["POST"])
 @login_required
@@ -370,47 +651,114 @@ def upload_zip():
     if not os.path.exists(temp_folder):
         os.makedirs(temp_folder)
 
-    saved, ignored = [], []
+    return _bulk_zip_response(file.stream, temp_folder, "ZIP processed", "Error processing ZIP")
+
+
+def _resumable_upload_or_error(upload_id: str):
+    upload = ResumableUpload(current_user.resumable_uploads_folder(), upload_id)
+    if not upload.exists():
+        raise UploadRejected("Unknown upload", status_code=404)
+    return upload
+
+
+def _upload_offset_headers(upload: ResumableUpload, offset: int | None = None) -> dict:
+    return {
+        "Upload-Offset": str(upload.offset if offset is None else offset),
+        "Upload-Length": str(upload.length),
+        "Cache-Control": "no-store",
+    }
+
+
+# Chunked, resumable ZIP upload: create, PATCH the chunks at the reported offset, then finalize
+@dataset_bp.route("/dataset/zip/uploads", methods=["POST"])
+@login_required
+def create_zip_upload():
+    payload = request.get_json(silent=True) or {}
+    filename = (payload.get("filename") or "").strip()
+    length = payload.get("length", request.headers.get("Upload-Length"))
+
+    if not filename.lower().endswith(".zip"):
+        return jsonify({"message": "No valid zip"}), 400
 
+    # Starting an upload clears the ones this user abandoned
+    ResumableUpload.expire_stale(current_user.resumable_uploads_folder(), current_app.config["ZIP_UPLOAD_EXPIRY"])
     try:
-        with ZipFile(file.stream) as zf:
-            for member in zf.infolist():
-                name = member.filename
+        length = int(length)
+        upload = ResumableUpload.create(
+            current_user.resumable_uploads_folder(), filename, length, current_app.config["ZIP_UPLOAD_MAX_SIZE"]
+        )
+    except (TypeError, ValueError):
+        return jsonify({"message": "The upload length is required"}), 400
+    except UploadRejected as e:
+        return jsonify(e.to_dict()), e.status_code
 
-                if member.is_dir():
-                    continue
+    location = url_for("dataset.zip_upload_status", upload_id=upload.upload_id)
+    headers = {**_upload_offset_headers(upload, 0), "Location": location}
+    return jsonify({"upload_id": upload.upload_id, "location": location, "offset": 0}), 201, headers
 
-                norm = os.path.normpath(name).replace("\\", "/")
 
-                if norm.startswith("../") or norm.startswith("/"):
-                    ignored.append(name)
-                    continue
+@dataset_bp.route("/dataset/zip/uploads/<upload_id>", methods=["HEAD"])
+@login_required
+def zip_upload_status(upload_id):
+    try:
+        upload = _resumable_upload_or_error(upload_id)
+    except UploadRejected as e:
+        return "", e.status_code
+    return "", 200, _upload_offset_headers(upload)
 
-                if not norm.lower().endswith(".poke"):
-                    ignored.append(name)
-                    continue
 
-                base_filename = os.path.basename(norm)
+@dataset_bp.route("/dataset/zip/uploads/<upload_id>", methods=["PATCH"])
+@login_required
+def append_zip_upload(upload_id):
+    if request.mimetype != "application/offset+octet-stream":
+        return jsonify({"message": "Chunks must be sent as application/offset+octet-stream"}), 415
+    try:
+        upload = _resumable_upload_or_error(upload_id)
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except UploadRejected as e:
+        return jsonify(e.to_dict()), e.status_code
+    except ValueError:
+        return jsonify({"message": "Upload-Offset header is required"}), 400
 
-                base, ext = os.path.splitext(base_filename)
-                candidate = base_filename
-                dest_path = os.path.join(temp_folder, candidate)
-                i = 1
-                while os.path.exists(dest_path):
-                    candidate = f"{base} ({i}){ext}"
-                    dest_path = os.path.join(temp_folder, candidate)
-                    i += 1
+    try:
+        new_offset = upload.append(request.stream, offset)
+    except UploadRejected as e:
+        return jsonify(e.to_dict()), e.status_code, _upload_offset_headers(upload)
+    return "", 204, _upload_offset_headers(upload, new_offset)
 
-                with zf.open(member, "r") as src, open(dest_path, "wb") as dst:
-                    shutil.copyfileobj(src, dst)
 
-                saved.append(candidate)
+@dataset_bp.route("/dataset/zip/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def delete_zip_upload(upload_id):
+    try:
+        upload = _resumable_upload_or_error(upload_id)
+    except UploadRejected as e:
+        return jsonify(e.to_dict()), e.status_code
+    upload.discard()
+    return "", 204
 
-    except Exception as e:
-        logger.exception("Error while processing ZIP")
-        return jsonify({"message": f"Error processing ZIP: {e}"}), 400
 
-    return jsonify({"message": "ZIP processed", "saved": saved, "ignored": ignored}), 200
+@dataset_bp.route("/dataset/zip/uploads/<upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize_zip_upload(upload_id):
+    payload = request.get_json(silent=True) or {}
+    try:
+        upload = _resumable_upload_or_error(upload_id)
+        metadata = upload.finalize(expected_md5=payload.get("md5"))
+    except UploadRejected as e:
+        return jsonify(e.to_dict()), e.status_code
+
+    logger.info(f"Resumable upload {upload_id} complete: {metadata['size']} bytes, md5 {metadata['md5']}")
+    # The temp folder may have been published (and deleted) while the chunks were arriving
+    temp_folder = current_user.temp_folder()
+    os.makedirs(temp_folder, exist_ok=True)
+    return _bulk_zip_response(
+        upload.data_path,
+        temp_folder,
+        "ZIP processed",
+        "Error processing ZIP",
+        cleanup=upload.discard,
+    )
 
 
 # Import from GitHub
@@ -422,31 +770,22 @@ def import_from_github():
     repo_url = (payload.get("repo_url") or "").strip()
     branch = (payload.get("branch") or "main").strip()
     subdir = (payload.get("subdir") or "").strip().strip("/")
+    # "incremental" only extracts files that are new or changed since this repository was last imported;
+    # "full" extracts everything again, next to the files already imported
+    mode = (payload.get("mode") or "full").strip().lower()
+    if mode not in ("full", "incremental"):
+        return jsonify({"message": f"Unknown import mode: {mode}"}), 400
 
-    if not repo_url:
-        return jsonify({"message": "repo_url is required"}), 400
-
+    # ZIP download: streamed to the GitHub archive cache, or just revalidated when it is already there
     try:
-        parsed = urlparse(repo_url)
-        if "github.com" not in parsed.netloc.lower():
-            return jsonify({"message": "Only GitHub URLs are supported"}), 400
-        parts = [p for p in parsed.path.split("/") if p]
-        if len(parts) < 2:
-            return jsonify({"message": "Invalid GitHub repo URL"}), 400
-        owner, repo = parts[0], parts[1]
-        if repo.endswith(".git"):
-            repo = repo[:-4]
-    except Exception:
-        return jsonify({"message": "Invalid GitHub repo URL"}), 400
-
-    archive_url = f"https://codeload.github.com/{owner}/{repo}/zip/refs/heads/{branch}"
-
-    # ZIP Download
+        owner, repo = parse_repo_url(repo_url)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
     try:
-        resp = requests.get(archive_url, timeout=60)
-        if resp.status_code != 200:
-            return jsonify({"message": f"GitHub returned {resp.status_code}"}), 400
-        zip_bytes = io.BytesIO(resp.content)
+        archive_path = github_archives.fetch(owner, repo, branch)
+    except GithubArchiveError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         logger.exception("Error downloading GitHub archive")
         return jsonify({"message": f"Error downloading archive: {e}"}), 400
@@ -455,103 +794,73 @@ def import_from_github():
     if not os.path.exists(temp_folder):
         os.makedirs(temp_folder)
 
-    saved, ignored = [], []
-
-    try:
-        with ZipFile(zip_bytes) as zf:
-            prefix = ""
-            try:
-                first = zf.namelist()[0]
-                root = first.split("/")[0] if "/" in first else ""
-                if subdir:
-                    prefix = f"{root}/{subdir}/"
-                else:
-                    prefix = f"{root}/" if root else ""
-            except Exception:
-                prefix = f"{subdir}/" if subdir else ""
-
-            for member in zf.infolist():
-                name = member.filename
-
-                if member.is_dir():
-                    continue
-
-                if prefix and not name.startswith(prefix):
-                    continue
-
-                norm = os.path.normpath(name).replace("\\", "/")
-                if norm.startswith("../") or norm.startswith("/"):
-                    ignored.append(name)
-                    continue
-
-                if not norm.lower().endswith(".poke"):
-                    ignored.append(name)
-                    continue
-
-                base_filename = os.path.basename(norm)
-
-                base, ext = os.path.splitext(base_filename)
-                candidate = base_filename
-                dest_path = os.path.join(temp_folder, candidate)
-                i = 1
-                while os.path.exists(dest_path):
-                    candidate = f"{base} ({i}){ext}"
-                    dest_path = os.path.join(temp_folder, candidate)
-                    i += 1
-
-                with zf.open(member, "r") as src, open(dest_path, "wb") as dst:
-                    shutil.copyfileobj(src, dst)
-
-                saved.append(candidate)
-
-    except Exception as e:
-        logger.exception("Error processing GitHub ZIP")
-        return jsonify({"message": f"Error processing GitHub ZIP: {e}"}), 400
-
-    return jsonify({"message": "GitHub import completed", "saved": saved, "ignored": ignored}), 200
+    def github_prefix(zf):
+        try:
+            first = zf.namelist()[0]
+            root = first.split("/")[0] if "/" in first else ""
+            if subdir:
+                return f"{root}/{subdir}/"
+            return f"{root}/" if root else ""
+        except Exception:
+            return f"{subdir}/" if subdir else ""
+
+    # Files always record where they came from, so a later incremental import can compare against them: the
+    # ones still in the temp folder by their metadata record, the ones saved in a dataset by their columns
+    repo_key = f"{owner}/{repo}".lower()
+    sources = ImportSources(
+        temp_folder, repo_key, branch, HubfileRepository().find_imported(current_user.id, repo_key, branch)
+    )
+    if mode == "full":
+        sources.forget_previous()
+
+    return _bulk_zip_response(
+        archive_path,
+        temp_folder,
+        "GitHub import completed",
+        "Error processing GitHub ZIP",
+        prefix_for=github_prefix,
+        sources=sources,
+    )
 
 
 @dataset_bp.route("/dataset/download/<int:dataset_id>", methods=["GET"])
 def download_dataset(dataset_id):
     dataset = dataset_service.get_or_404(dataset_id)
 
-    file_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, f"dataset_{dataset_id}.zip")
-
-    with ZipFile(zip_path, "w") as zipf:
-        for subdir, dirs, files in os.walk(file_path):
-            for file in files:
-                full_path = os.path.join(subdir, file)
-
-                relative_path = os.path.relpath(full_path, file_path)
-
-                zipf.write(
-                    full_path,
-                    arcname=os.path.join(os.path.basename(zip_path[:-4]), relative_path),
-                )
+    entries = dataset_service.get_archive_entries(dataset)
+    key = archive_key([(arcname, checksum) for arcname, _, checksum in entries])
+    download_name = f"dataset_{dataset_id}.zip"
+
+    # The archive key is a content hash, so it is a strong ETag; unchanged datasets get a 304 (not counted)
+    # A cached archive is sent with its mtime as Last-Modified, which If-Modified-Since is checked against
+    cache_control = REVALIDATE_PUBLIC if dataset.ds_meta_data.dataset_doi else REVALIDATE_PRIVATE
+    cached_path = archive_cache.get(key)
+    last_modified = last_modified_of(cached_path)
+    if is_not_modified(key, last_modified):
+        return not_modified_response(key, cache_control)
+
+    # Repeat downloads of the same content are a plain file send; the first one streams while it is cached.
+    # Range requests and nginx delivery need the whole file, so then the archive is built first.
+    if cached_path is None and (request.range or current_app.config.get("FILE_DELIVERY") == "x-accel"):
+        cached_path = archive_cache.build(key, [(arcname, path) for arcname, path, _ in entries])
+    if cached_path:
+        resp = deliver_file(
+            cached_path, download_name=download_name, mimetype="application/zip", etag=key, cache_control=cache_control
+        )
+    else:
+        # The generator only needs the paths collected above, so it runs without the request context
+        resp = Response(
+            archive_cache.stream(key, [(arcname, path) for arcname, path, _ in entries]),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={download_name}", "Cache-Control": cache_control},
+        )
+        resp.set_etag(key)
 
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())  # Generate a new unique identifier if it does not exist
         # Save the cookie to the user's browser
-        resp = make_response(
-            send_from_directory(
-                temp_dir,
-                f"dataset_{dataset_id}.zip",
-                as_attachment=True,
-                mimetype="application/zip",
-            )
-        )
         resp.set_cookie("download_cookie", user_cookie)
-    else:
-        resp = send_from_directory(
-            temp_dir,
-            f"dataset_{dataset_id}.zip",
-            as_attachment=True,
-            mimetype="application/zip",
-        )
 
     # Check if the download record already exists for this cookie
     existing_record = DSDownloadRecord.query.filter_by(
@@ -569,7 +878,8 @@ def download_dataset(dataset_id):
             download_cookie=user_cookie,
         )
 
-    dataset_service.increment_download_count(dataset_id)
+    if is_first_request_of_download(key, last_modified):
+        dataset_service.increment_download_count(dataset_id)
 
     return resp
 
@@ -583,21 +893,17 @@ def subdomain_index(doi):
         # Redirect to the same path with the new DOI
         return redirect(url_for("dataset.subdomain_index", doi=new_doi), code=302)
 
-    # Try to search the dataset by the provided DOI (which should already be the new one)
-    ds_meta_data = dsmetadata_service.filter_by_doi(doi)
+    # Try to search the dataset by the provided DOI (which should already be the new one), with everything
+    # the page shows loaded up front
+    dataset = dataset_service.get_by_doi(doi)
 
-    if not ds_meta_data:
+    if not dataset:
         abort(404)
 
-    # Get dataset
-    dataset = ds_meta_data.data_set
-
     # Preparar form y comentarios
     form = DataSetCommentForm()
     comments = dataset.comments
 
-    # Save the cookie to the user's browser
-    user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
     resp = make_response(
         render_template(
             "dataset/view_dataset.html",
@@ -606,6 +912,9 @@ def subdomain_index(doi):
             form=form,
         )
     )
+    # The view is recorded once the page is rendered: its commit expires the dataset loaded for the page
+    user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
+    # Save the cookie to the user's browser
     resp.set_cookie("view_cookie", user_cookie)
 
     return resp
@@ -616,7 +925,7 @@ def subdomain_index(doi):
 def get_unsynchronized_dataset(dataset_id):
 
     # Get dataset
-    dataset = dataset_service.get_unsynchronized_dataset(current_user.id, dataset_id)
+    dataset = dataset_service.get_unsynchronized_dataset(current_user.id, dataset_id, profile="dataset_detail")
 
     if not dataset:
         abort(404)
@@ -641,6 +950,7 @@ def dataset_stats(dataset_id):
     view_count = dataset_service.get_view_count(dataset_id)
     download_count = dataset.download_count
     created_at = dataset.created_at
+    species_counts = dataset_service.count_species(dataset_id)
 
     return render_template(
         "dataset/stats_dataset.html",
@@ -650,6 +960,7 @@ def dataset_stats(dataset_id):
         view_count=view_count,
         download_count=download_count,
         created_at=created_at,
+        species_counts=species_counts,
     )
 
 
@@ -6,8 +6,13 @@ from dotenv import load_dotenv
 
 from app.modules.auth.models import User
 from app.modules.dataset.models import Author, DataSet, DSMetaData, DSMetrics, PublicationType
-from app.modules.hubfile.models import Hubfile
+from app.modules.dataset.repositories import TagRepository
+from app.modules.dataset.services import DataSetService, calculate_checksum_and_size
+from app.modules.hubfile.blobs import blob_store
+from app.modules.hubfile.models import Hubfile, HubfileBlob
 from app.modules.pokemodel.models import FMMetaData, PokeModel
+from app.modules.public.repositories import SiteCountersRepository
+from core.configuration.configuration import uploads_root
 from core.seeders.BaseSeeder import BaseSeeder
 
 
@@ -99,26 +104,45 @@ class DataSetSeeder(BaseSeeder):
         ]
         seeded_poke_models = self.seed(poke_models)
 
+        # Link the metadata to their tags and count them
+        tag_repository = TagRepository()
+        tag_ids = set()
+        for metadata in seeded_ds_meta_data + seeded_fm_meta_data:
+            tag_ids |= tag_repository.sync_tags(metadata)
+        tag_repository.refresh_counts(tag_ids)
+        SiteCountersRepository().add(synchronized_datasets=len(seeded_datasets), poke_models=len(seeded_poke_models))
+        self.db.session.commit()
+
         # Create files, associate them with PokeModels and copy files
         load_dotenv()
         working_dir = os.getenv("WORKING_DIR", "")
         src_folder = os.path.join(working_dir, "app", "modules", "dataset", "poke_examples")
+        blobs = {}
+        dataset_service = DataSetService()
         for i in range(12):
             file_name = f"file{i+1}.poke"
             poke_model = seeded_poke_models[i]
             dataset = next(ds for ds in seeded_datasets if ds.id == poke_model.data_set_id)
             user_id = dataset.user_id
 
-            dest_folder = os.path.join(working_dir, "uploads", f"user_{user_id}", f"dataset_{dataset.id}")
+            dest_folder = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{dataset.id}")
             os.makedirs(dest_folder, exist_ok=True)
             shutil.copy(os.path.join(src_folder, file_name), dest_folder)
 
             file_path = os.path.join(dest_folder, file_name)
+            checksum, size = calculate_checksum_and_size(file_path)
+            blob_store.ingest(checksum, file_path)
 
             poke_file = Hubfile(
                 name=file_name,
-                checksum=f"checksum{i+1}",
-                size=os.path.getsize(file_path),
+                checksum=checksum,
+                size=size,
                 poke_model_id=poke_model.id,
+                storage_path=Hubfile.storage_path_for(user_id, dataset.id, file_name),
             )
             self.seed([poke_file])
+            # Indexing and statistics only read the stored sets
+            dataset_service.store_poke_sets(poke_model, file_path)
+            blobs.setdefault(checksum, HubfileBlob(checksum=checksum, size=size, ref_count=0)).ref_count += 1
+
+        self.seed(list(blobs.values()))
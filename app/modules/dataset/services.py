@@ -1,18 +1,16 @@
 import hashlib
-import io
 import logging
 import os
 import shutil
 import uuid
 from datetime import datetime
 from typing import List, Optional, Tuple
-from urllib.parse import urlparse
 from zipfile import BadZipFile, ZipFile
 
-import requests
 from flask import request
 
 from app.modules.auth.services import AuthenticationService
+from app.modules.dataset.github_archives import github_archives, parse_repo_url
 from app.modules.dataset.models import DataSet, DSMetaData, DSViewRecord, PublicationType
 from app.modules.dataset.repositories import (
     AuthorRepository,
@@ -21,26 +19,67 @@ from app.modules.dataset.repositories import (
     DSDownloadRecordRepository,
     DSMetaDataRepository,
     DSViewRecordRepository,
+    TagRepository,
 )
+from app.modules.dataset.uploads import (
+    HASH_CHUNK_SIZE,
+    UniqueNameAllocator,
+    digest_file,
+    map_bounded,
+    read_file_metadata,
+    write_file_metadata,
+)
+from app.modules.hubfile.blobs import blob_store
 from app.modules.hubfile.models import Hubfile
 from app.modules.hubfile.repositories import (
+    HubfileBlobRepository,
     HubfileDownloadRecordRepository,
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from app.modules.pokemodel.inverted_index import poke_index
 from app.modules.pokemodel.models import FMMetaData, PokeModel
-from app.modules.pokemodel.repositories import FMMetaDataRepository, PokeModelRepository
+from app.modules.pokemodel.repositories import FMMetaDataRepository, PokeModelRepository, PokeSetRepository
+from app.modules.pokemodel.similarity import similar_sets
+from app.modules.pokemodel.stats import poke_stats
+from app.modules.public.cache import home_lists_cache
+from app.modules.public.repositories import SiteCountersRepository
+from core.configuration.configuration import uploads_root
+from core.pokemon_check.parser import iter_sets
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
 
 
 def calculate_checksum_and_size(file_path):
-    file_size = os.path.getsize(file_path)
-    with open(file_path, "rb") as file:
-        content = file.read()
-        hash_md5 = hashlib.md5(content).hexdigest()
-        return hash_md5, file_size
+    hash_md5 = hashlib.md5()
+    file_size = 0
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as file:
+        while True:
+            read = file.readinto(buffer)
+            if not read:
+                break
+            hash_md5.update(view[:read])
+            file_size += read
+    return hash_md5.hexdigest(), file_size
+
+
+def uploaded_file_record(temp_folder: str, filename: str) -> dict:
+    """Upload-time record of a file in the temp folder (checksums, size, source), written now if missing or stale."""
+    metadata = read_file_metadata(temp_folder, filename)
+    if metadata is None:
+        # Files that reached the temp folder some other way are hashed once and recorded
+        metadata = digest_file(os.path.join(temp_folder, filename)).to_metadata()
+        write_file_metadata(temp_folder, filename, metadata)
+    return metadata
+
+
+def uploaded_checksum_and_size(temp_folder: str, filename: str):
+    """Checksum and size of a file in the temp folder, taken from its upload-time record when it is still valid."""
+    metadata = uploaded_file_record(temp_folder, filename)
+    return metadata["md5"], metadata["size"]
 
 
 def _normalize_publication_type(raw) -> str:
@@ -75,18 +114,6 @@ def _normalize_publication_type(raw) -> str:
     return PublicationType.NONE.name
 
 
-def _ensure_unique_filename(dest_dir: str, filename: str) -> str:
-    base, ext = os.path.splitext(filename)
-    candidate = filename
-    dest_path = os.path.join(dest_dir, candidate)
-    i = 1
-    while os.path.exists(dest_path):
-        candidate = f"{base} ({i}){ext}"
-        dest_path = os.path.join(dest_dir, candidate)
-        i += 1
-    return candidate
-
-
 def _safe_norm(path: str) -> str:
     norm = os.path.normpath(path).replace("\\", "/")
     return norm
@@ -102,15 +129,18 @@ class DataSetService(BaseService):
         self.dsdownloadrecord_repository = DSDownloadRecordRepository()
         self.hubfiledownloadrecord_repository = HubfileDownloadRecordRepository()
         self.hubfilerepository = HubfileRepository()
+        self.hubfile_blob_repository = HubfileBlobRepository()
         self.dsviewrecord_repostory = DSViewRecordRepository()
         self.hubfileviewrecord_repository = HubfileViewRecordRepository()
+        self.poke_set_repository = PokeSetRepository()
+        self.tag_repository = TagRepository()
+        self.site_counters_repository = SiteCountersRepository()
 
     def move_poke_models(self, dataset: DataSet):
         current_user = AuthenticationService().get_authenticated_user()
         source_dir = current_user.temp_folder()
 
-        working_dir = os.getenv("WORKING_DIR", "")
-        dest_dir = os.path.join(working_dir, "uploads", f"user_{current_user.id}", f"dataset_{dataset.id}")
+        dest_dir = os.path.join(uploads_root(), f"user_{current_user.id}", f"dataset_{dataset.id}")
 
         os.makedirs(dest_dir, exist_ok=True)
 
@@ -121,6 +151,54 @@ class DataSetService(BaseService):
 
             if os.path.exists(src):
                 shutil.move(src, dst)
+                # The dataset copy becomes the blob (or a link to it when the content was already stored)
+                for hubfile in poke_model.files:
+                    if hubfile.name == poke_filename:
+                        if not blob_store.share(hubfile.checksum, dst):
+                            logger.warning(f"{dst} differs from the stored blob with its checksum; kept apart")
+
+    def get_archive_entries(self, dataset: DataSet) -> list:
+        """(name in the dataset ZIP, path on disk, checksum) of every stored file of the dataset."""
+        dataset_dir = os.path.join(uploads_root(), f"user_{dataset.user_id}", f"dataset_{dataset.id}")
+        entries = []
+        for poke_model in dataset.poke_models:
+            for hubfile in poke_model.files:
+                path = os.path.join(dataset_dir, hubfile.name)
+                if os.path.exists(path):
+                    entries.append((f"dataset_{dataset.id}/{hubfile.name}", path, hubfile.checksum))
+                else:
+                    logger.warning(f"File {hubfile.id} of dataset {dataset.id} not found: {path}")
+        return sorted(entries)
+
+    def store_poke_sets(self, poke_model: PokeModel, file_path: str, parsed_sets=None):
+        """
+        Persists every set of the .poke file as PokeSet rows (in file order), so indexing and statistics can be
+        answered from the database. `parsed_sets` are the (position, parsed data) pairs the upload validation
+        kept in the file's record; the file is only read and parsed again without them.
+        """
+        if parsed_sets is not None:
+            return [
+                self.poke_set_repository.create_from_parsed_data(
+                    poke_model_id=poke_model.id, parsed_data=parsed_data, position=position, commit=False
+                )
+                for position, parsed_data in parsed_sets
+            ]
+
+        poke_sets = []
+        try:
+            # The file is read line by line, so large team exports are never loaded as a whole
+            with open(file_path, "r", encoding="utf-8") as f:
+                for position, parsed in enumerate(iter_sets(f, validate=False)):
+                    if not parsed.species:
+                        continue
+                    poke_sets.append(
+                        self.poke_set_repository.create_from_parsed_data(
+                            poke_model_id=poke_model.id, parsed_data=parsed.to_dict(), position=position, commit=False
+                        )
+                    )
+        except (OSError, UnicodeDecodeError) as exc:
+            logger.warning(f"Could not read {file_path} to store its sets: {exc}")
+        return poke_sets
 
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return self.repository.get_synchronized(current_user_id)
@@ -128,8 +206,15 @@ class DataSetService(BaseService):
     def get_unsynchronized(self, current_user_id: int) -> DataSet:
         return self.repository.get_unsynchronized(current_user_id)
 
-    def get_unsynchronized_dataset(self, current_user_id: int, dataset_id: int) -> DataSet:
-        return self.repository.get_unsynchronized_dataset(current_user_id, dataset_id)
+    def get_unsynchronized_dataset(
+        self, current_user_id: int, dataset_id: int, profile: str = "dataset_minimal"
+    ) -> DataSet:
+        """A draft of the user, loaded with the relationships of `profile` (see DataSetRepository.with_profile)."""
+        return self.repository.get_unsynchronized_dataset(current_user_id, dataset_id, profile=profile)
+
+    def get_by_doi(self, doi: str) -> Optional[DataSet]:
+        """The published dataset with this DOI, loaded for its detail page."""
+        return self.repository.get_by_doi(doi)
 
     def latest_synchronized(self):
         return self.repository.latest_synchronized()
@@ -140,6 +225,9 @@ class DataSetService(BaseService):
     def count_poke_models(self):
         return self.poke_model_repository.count_poke_models()
 
+    def count_species(self, dataset_id: int):
+        return self.poke_set_repository.count_species_by_dataset(dataset_id)
+
     def count_authors(self) -> int:
         return self.author_repository.count()
 
@@ -164,6 +252,7 @@ class DataSetService(BaseService):
             for author_data in [main_author] + form.get_authors():
                 author = self.author_repository.create(commit=False, ds_meta_data_id=dsmetadata.id, **author_data)
                 dsmetadata.authors.append(author)
+            tag_ids = self.tag_repository.sync_tags(dsmetadata)
 
             dataset = self.create(
                 commit=False, user_id=current_user.id, ds_meta_data_id=dsmetadata.id, draft_mode=draft_mode
@@ -186,6 +275,7 @@ class DataSetService(BaseService):
                 for author_data in poke_model.get_authors():
                     author = self.author_repository.create(commit=False, fm_meta_data_id=fmmetadata.id, **author_data)
                     fmmetadata.authors.append(author)
+                tag_ids |= self.tag_repository.sync_tags(fmmetadata)
 
                 fm = self.poke_model_repository.create(
                     commit=False, data_set_id=dataset.id, fm_meta_data_id=fmmetadata.id
@@ -193,12 +283,21 @@ class DataSetService(BaseService):
 
                 # associated files in poke model
                 file_path = os.path.join(current_user.temp_folder(), poke_filename)
-                checksum, size = calculate_checksum_and_size(file_path)
+                record = uploaded_file_record(current_user.temp_folder(), poke_filename)
+                checksum, size = record["md5"], record["size"]
 
                 file = self.hubfilerepository.create(
-                    commit=False, name=poke_filename, checksum=checksum, size=size, poke_model_id=fm.id
+                    commit=False,
+                    name=poke_filename,
+                    checksum=checksum,
+                    size=size,
+                    poke_model_id=fm.id,
+                    storage_path=Hubfile.storage_path_for(dataset.user_id, dataset.id, poke_filename),
+                    **Hubfile.source_columns(record.get("source")),
                 )
+                self.hubfile_blob_repository.acquire(checksum, size)
                 fm.files.append(file)
+                self.store_poke_sets(fm, file_path, record.get("sets"))
 
                 # --- NUEVO: marcamos que hemos persistido al menos un FM ---
                 any_fm_persisted = True
@@ -207,7 +306,11 @@ class DataSetService(BaseService):
             if not draft_mode and not any_fm_persisted:
                 raise ValueError("At least one feature model file is required.")
 
+            self.tag_repository.refresh_counts(tag_ids)
             self.repository.session.commit()
+            poke_stats.add_models(dataset.poke_models)
+            similar_sets.add_models(dataset.poke_models)
+            poke_index.add_models(dataset.poke_models)
         except Exception as exc:
             logger.info(f"Exception creating dataset from form...: {exc}")
             self.repository.session.rollback()
@@ -218,6 +321,7 @@ class DataSetService(BaseService):
 
         try:
             new_fms = []
+            tag_ids = set()
             for poke_model_form in getattr(form, "poke_models", []):
                 # WTForms: FileField/StringField -> usa .data
                 poke_filename = getattr(poke_model_form.poke_filename, "data", None)
@@ -231,6 +335,7 @@ class DataSetService(BaseService):
                 for author_data in poke_model_form.get_authors():
                     author = self.author_repository.create(commit=False, fm_meta_data_id=fmmetadata.id, **author_data)
                     fmmetadata.authors.append(author)
+                tag_ids |= self.tag_repository.sync_tags(fmmetadata)
 
                 # Crear FeatureModel asociado al dataset
                 fm = self.poke_model_repository.create(
@@ -241,15 +346,28 @@ class DataSetService(BaseService):
 
                 # Archivo asociado
                 file_path = os.path.join(current_user.temp_folder(), poke_filename)
-                checksum, size = calculate_checksum_and_size(file_path)
+                record = uploaded_file_record(current_user.temp_folder(), poke_filename)
+                checksum, size = record["md5"], record["size"]
 
                 file = self.hubfilerepository.create(
-                    commit=False, name=poke_filename, checksum=checksum, size=size, poke_model_id=fm.id
+                    commit=False,
+                    name=poke_filename,
+                    checksum=checksum,
+                    size=size,
+                    poke_model_id=fm.id,
+                    storage_path=Hubfile.storage_path_for(dataset.user_id, dataset.id, poke_filename),
+                    **Hubfile.source_columns(record.get("source")),
                 )
+                self.hubfile_blob_repository.acquire(checksum, size)
                 fm.files.append(file)
+                self.store_poke_sets(fm, file_path, record.get("sets"))
 
             # persistimos todo lo creado
+            self.tag_repository.refresh_counts(tag_ids)
             self.repository.session.commit()
+            poke_stats.add_models(new_fms)
+            similar_sets.add_models(new_fms)
+            poke_index.add_models(new_fms)
             return new_fms
 
         except Exception as exc:
@@ -289,6 +407,36 @@ class DataSetService(BaseService):
         """
         return self.repository.trending_by_downloads(limit=limit, days=days)
 
+    def home_lists(self, limit: int = 3, days: int = 30) -> dict:
+        """
+        The latest datasets and the (DataSet, count) trending by views and by downloads, for the home page.
+        Only the ids and counts are cached (see public.cache); the cards are loaded in one query per hit.
+        """
+
+        def load():
+            return {
+                "latest": [dataset.id for dataset in self.latest_synchronized()],
+                "trending_views": [(dataset.id, count) for dataset, count in self.trending_by_views(limit, days)],
+                "trending_downloads": [
+                    (dataset.id, count) for dataset, count in self.trending_by_downloads(limit, days)
+                ],
+            }
+
+        lists = home_lists_cache.get_or_load((limit, days), load)
+        ids = set(lists["latest"])
+        for key in ("trending_views", "trending_downloads"):
+            ids.update(dataset_id for dataset_id, _ in lists[key])
+        cards = {dataset.id: dataset for dataset in self.repository.get_cards_by_ids(ids)}
+
+        # Datasets deleted since the lists were cached just drop out
+        return {
+            "latest": [cards[dataset_id] for dataset_id in lists["latest"] if dataset_id in cards],
+            **{
+                key: [(cards[dataset_id], count) for dataset_id, count in lists[key] if dataset_id in cards]
+                for key in ("trending_views", "trending_downloads")
+            },
+        }
+
     def extract_pokes_from_zip(self, file_stream, dest_dir: str) -> List[str]:
         """
         Extrae SOLO .poke del stream ZIP (file-like), guarda en dest_dir
@@ -298,30 +446,11 @@ class DataSetService(BaseService):
         saved, _ignored = self._extract_pokes_from_zip(ZipFile(file_stream), dest_dir=dest_dir, subdir=None)
         return saved
 
-    def fetch_repo_zip(self, repo_url: str, branch: str | None) -> bytes:
-        if not repo_url:
-            raise ValueError("repo_url is required")
-
-        parsed = urlparse(repo_url)
-        if "github.com" not in parsed.netloc.lower():
-            raise ValueError("Only GitHub URLs are supported")
-
-        parts = [p for p in parsed.path.split("/") if p]
-        if len(parts) < 2:
-            raise ValueError("Invalid GitHub repo URL")
-
-        owner, repo = parts[0], parts[1]
-        if repo.endswith(".git"):
-            repo = repo[:-4]
-
-        branch = branch or "main"
-        archive_url = f"https://codeload.github.com/{owner}/{repo}/zip/refs/heads/{branch}"
-
+    def fetch_repo_zip(self, repo_url: str, branch: str | None) -> str:
+        """Path of the branch archive of a GitHub repository, from the local archive cache when unchanged."""
+        owner, repo = parse_repo_url(repo_url)
         try:
-            resp = requests.get(archive_url, timeout=60)
-            if resp.status_code != 200:
-                raise RuntimeError(f"GitHub returned {resp.status_code}")
-            return resp.content
+            return github_archives.fetch(owner, repo, branch or "main")
         except Exception as e:
             logger.exception("Error downloading GitHub archive")
             raise e
@@ -336,11 +465,11 @@ class DataSetService(BaseService):
         if not dest_dir:
             raise ValueError("dest_dir is required")
 
-        zip_bytes = self.fetch_repo_zip(repo_url=repo_url, branch=branch)
+        archive_path = self.fetch_repo_zip(repo_url=repo_url, branch=branch)
         os.makedirs(dest_dir, exist_ok=True)
 
         try:
-            with ZipFile(io.BytesIO(zip_bytes)) as zf:
+            with ZipFile(archive_path) as zf:
                 saved, _ignored = self._extract_pokes_from_zip(zf, dest_dir=dest_dir, subdir=subdir)
                 return saved
         except BadZipFile as e:
@@ -367,35 +496,41 @@ class DataSetService(BaseService):
                 prefixes.append(f"{possible_root}/{subdir}/")
             prefixes.append(f"{subdir}/")
 
-        for member in zf.infolist():
-            name = member.filename
+        names = UniqueNameAllocator(dest_dir)
 
-            if member.is_dir():
-                continue
+        def allocated():
+            for member in zf.infolist():
+                name = member.filename
 
-            if prefixes:
-                if not any(name.startswith(p) for p in prefixes):
+                if member.is_dir():
                     continue
 
-            norm = _safe_norm(name)
+                if prefixes:
+                    if not any(name.startswith(p) for p in prefixes):
+                        continue
 
-            if norm.startswith("../") or norm.startswith("/"):
-                ignored.append(name)
-                continue
+                norm = _safe_norm(name)
 
-            if not norm.lower().endswith(".poke"):
-                ignored.append(name)
-                continue
+                if norm.startswith("../") or norm.startswith("/"):
+                    ignored.append(name)
+                    continue
 
-            base_filename = os.path.basename(norm)
-            candidate = _ensure_unique_filename(dest_dir, base_filename)
-            dest_path = os.path.join(dest_dir, candidate)
+                if not norm.lower().endswith(".poke"):
+                    ignored.append(name)
+                    continue
 
-            with zf.open(member, "r") as src, open(dest_path, "wb") as dst:
-                shutil.copyfileobj(src, dst)
+                base_filename = os.path.basename(norm)
+                yield member, names.allocate(base_filename), base_filename
 
-            saved.append(candidate)
+        def extract(item):
+            # ZipFile serializes access to the archive, so members can be inflated and written concurrently
+            member, candidate, base_filename = item
+            candidate, dst = names.open_new(candidate, base_filename)
+            with zf.open(member, "r") as src, dst:
+                shutil.copyfileobj(src, dst)
+            return candidate
 
+        saved.extend(map_bounded(extract, allocated()))
         return saved, ignored
 
     def create_from_cart(self, user_id, form_data, shopping_cart) -> DataSet:
@@ -424,25 +559,28 @@ class DataSetService(BaseService):
 
             self.repository.session.add(new_dataset)
             self.repository.session.flush()
+            tag_ids = self.tag_repository.sync_tags(ds_metadata)
 
-            working_dir = os.getenv("WORKING_DIR", "")
-            dest_dir = os.path.join(working_dir, "uploads", f"user_{user_id}", f"dataset_{new_dataset.id}")
+            dest_dir = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{new_dataset.id}")
             os.makedirs(dest_dir, exist_ok=True)
 
             for cart_item in shopping_cart.items:
                 hubfile = cart_item.file
 
-                # Copiamos el hubfile al nuevo dataset para que asi el original no lo pierda
-                new_hubfile = Hubfile(name=hubfile.name, checksum=hubfile.checksum, size=hubfile.size)
-
-                source_path = hubfile.get_path()
+                # El nuevo hubfile apunta al mismo blob que el original
+                new_hubfile = Hubfile(
+                    name=hubfile.name,
+                    checksum=hubfile.checksum,
+                    size=hubfile.size,
+                    storage_path=Hubfile.storage_path_for(user_id, new_dataset.id, hubfile.name),
+                )
 
                 dest_path = os.path.join(dest_dir, new_hubfile.name)
 
-                if os.path.exists(source_path):
-                    shutil.copy2(source_path, dest_path)
-                else:
-                    logger.warning(f"Source file not found: {source_path}")
+                # Only a link to the stored blob is created, so the cost doesn't depend on the file size
+                if not blob_store.materialize(hubfile.checksum, dest_path, source_path=hubfile.get_path()):
+                    logger.warning(f"Content of file {hubfile.id} not found in the blob store or its dataset")
+                self.hubfile_blob_repository.acquire(hubfile.checksum, hubfile.size)
 
                 # FMMetaData, por defecto igual al dataset padre
                 fm_metadata = FMMetaData(
@@ -453,17 +591,32 @@ class DataSetService(BaseService):
                     publication_doi=form_data.get("publication_doi"),
                     tags=form_data.get("tags"),
                 )
+                tag_ids |= self.tag_repository.sync_tags(fm_metadata)
 
                 new_poke_model = PokeModel(fm_meta_data=fm_metadata)
 
                 new_poke_model.files.append(new_hubfile)
 
+                # Los sets ya parseados se copian desde la base de datos; solo se lee el fichero si faltan
+                source_sets = hubfile.poke_model.poke_sets if hubfile.poke_model else []
+                for poke_set in source_sets:
+                    new_poke_model.poke_sets.append(poke_set.copy())
+
                 new_dataset.poke_models.append(new_poke_model)
 
+                if not source_sets and os.path.exists(dest_path):
+                    self.repository.session.flush()
+                    self.store_poke_sets(new_poke_model, dest_path)
+
                 # Borramos el item del carrito
                 self.repository.session.delete(cart_item)
 
+            self.tag_repository.refresh_counts(tag_ids)
+            self.site_counters_repository.add(poke_models=len(new_dataset.poke_models))
             self.repository.session.commit()
+            poke_stats.add_models(new_dataset.poke_models)
+            similar_sets.add_models(new_dataset.poke_models)
+            poke_index.add_models(new_dataset.poke_models)
 
             logger.info(f"Dataset {new_dataset.id} created from cart by user {user_id}")
             return new_dataset
@@ -1,4 +1,6 @@
+import hashlib
 import io
+import json
 import os
 import shutil
 import zipfile
@@ -8,7 +10,10 @@ import pytest
 from app import db
 from app.modules.auth.models import User
 from app.modules.auth.services import AuthenticationService
+from app.modules.dataset.archives import ArchiveCache
+from app.modules.dataset.github_archives import GithubArchiveFetcher
 from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.dataset.uploads import read_file_metadata
 
 
 @pytest.fixture(scope="module")
@@ -91,6 +96,18 @@ def test_dataset_stats(test_client, dataset_seed):
     assert str(initial_download_count) in html, f"No aparece el contador de descargas {initial_download_count}"
 
 
+VALID_POKE = "Pikachu @ Light Ball\nAbility: Static\nEVs: 252 SpA / 4 SpD / 252 Spe\n- Thunderbolt\n- Volt Switch\n"
+
+
+@pytest.fixture
+def github_archives_in_tmp(monkeypatch, tmp_path):
+    """A GitHub archive fetcher caching under tmp_path, in place of the one writing to WORKING_DIR/uploads."""
+    fetcher = GithubArchiveFetcher(ArchiveCache(str(tmp_path / "github"), 10**7))
+    monkeypatch.setattr("app.modules.dataset.routes.github_archives", fetcher)
+    monkeypatch.setattr("app.modules.dataset.services.github_archives", fetcher)
+    return fetcher
+
+
 def _make_zip_bytes(files: dict, root_prefix: str = "") -> bytes:
     buf = io.BytesIO()
     with zipfile.ZipFile(buf, "w") as zf:
@@ -101,7 +118,7 @@ def _make_zip_bytes(files: dict, root_prefix: str = "") -> bytes:
     return buf.read()
 
 
-def test_integration_upload_zip_and_github(test_client, monkeypatch):
+def test_integration_upload_zip_and_github(test_client, monkeypatch, github_archives_in_tmp):
     # login with default test user created by conftest
     rv = test_client.post(
         "/login",
@@ -112,8 +129,8 @@ def test_integration_upload_zip_and_github(test_client, monkeypatch):
 
     # ZIP upload
     files = {
-        "a.poke": "content a",
-        "b.POKE": "content b",
+        "a.poke": VALID_POKE,
+        "b.POKE": VALID_POKE,
         "ignore.md": "no",
     }
 
@@ -126,16 +143,23 @@ def test_integration_upload_zip_and_github(test_client, monkeypatch):
     assert "saved" in body and len(body["saved"]) >= 1
 
     # GitHub import (mock requests.get to return a zip)
-    repo_files = {"rootdir/path/gh.poke": "ok", "rootdir/other/skip.txt": "no"}
+    repo_files = {"rootdir/path/gh.poke": VALID_POKE, "rootdir/other/skip.txt": "no"}
     gh_zip = _make_zip_bytes(repo_files)
 
     class DummyResp:
         status_code = 200
+        headers = {}
 
         def __init__(self, content):
             self.content = content
 
-    def fake_get(url, timeout=60):
+        def iter_content(self, chunk_size=1):
+            yield self.content
+
+        def close(self):
+            pass
+
+    def fake_get(url, **kwargs):
         return DummyResp(gh_zip)
 
     monkeypatch.setattr("requests.get", fake_get)
@@ -158,3 +182,567 @@ def test_integration_upload_zip_and_github(test_client, monkeypatch):
     finally:
         if os.path.exists(temp_folder):
             shutil.rmtree(temp_folder)
+
+
+def test_incremental_github_reimport_reports_changes(test_client, monkeypatch, github_archives_in_tmp):
+    test_client.post("/login", data={"email": "test@example.com", "password": "test1234"})
+    archives = [
+        _make_zip_bytes({"one.poke": VALID_POKE, "two.poke": VALID_POKE}, root_prefix="sync-main"),
+        _make_zip_bytes(
+            {"one.poke": VALID_POKE, "two.poke": VALID_POKE + "\n", "three.poke": VALID_POKE}, root_prefix="sync-main"
+        ),
+    ]
+
+    class DummyResp:
+        status_code = 200
+        headers = {}
+
+        def __init__(self, content):
+            self.content = content
+
+        def iter_content(self, chunk_size=1):
+            yield self.content
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr("requests.get", lambda url, **kwargs: DummyResp(archives[0]))
+    payload = {"repo_url": "https://github.com/owner/sync", "branch": "main", "mode": "incremental"}
+    first = test_client.post("/dataset/github/import", json=payload).get_json()
+    assert sorted(first["added"]) == sorted(first["saved"])
+    assert len(first["added"]) == 2
+
+    monkeypatch.setattr("requests.get", lambda url, **kwargs: DummyResp(archives[1]))
+    second = test_client.post("/dataset/github/import", json=payload).get_json()
+    assert len(second["added"]) == 1 and second["added"][0].startswith("three")
+    assert len(second["modified"]) == 1 and second["modified"][0].startswith("two")
+    assert len(second["unchanged"]) == 1 and second["unchanged"][0].startswith("one")
+
+    resp = test_client.post("/dataset/github/import", json={**payload, "mode": "sideways"})
+    assert resp.status_code == 400
+
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        shutil.rmtree(AuthenticationService().temp_folder_by_user(user), ignore_errors=True)
+
+
+def test_resumable_zip_upload_in_chunks(test_client):
+    test_client.post("/login", data={"email": "test@example.com", "password": "test1234"})
+    zip_bytes = _make_zip_bytes({"chunked.poke": VALID_POKE, "readme.md": "no"})
+    half = len(zip_bytes) // 2
+
+    resp = test_client.post("/dataset/zip/uploads", json={"filename": "big.zip", "length": len(zip_bytes)})
+    assert resp.status_code == 201
+    location = resp.headers["Location"]
+
+    headers = {"Content-Type": "application/offset+octet-stream"}
+    resp = test_client.patch(location, data=zip_bytes[:half], headers={**headers, "Upload-Offset": "0"})
+    assert resp.status_code == 204
+    assert resp.headers["Upload-Offset"] == str(half)
+
+    # Publishing a dataset meanwhile deletes the temp folder, but not the upload in progress
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        temp_folder = AuthenticationService().temp_folder_by_user(user)
+    shutil.rmtree(temp_folder, ignore_errors=True)
+    assert test_client.head(location).headers["Upload-Offset"] == str(half)
+
+    # Resending from a stale offset (e.g. after a dropped connection) is refused with the offset to resume from
+    resp = test_client.patch(location, data=zip_bytes, headers={**headers, "Upload-Offset": "0"})
+    assert resp.status_code == 409
+    resp = test_client.head(location)
+    assert resp.status_code == 200
+    assert resp.headers["Upload-Offset"] == str(half)
+
+    resp = test_client.post(f"{location}/finalize", json={})
+    assert resp.status_code == 409
+
+    resp = test_client.patch(location, data=zip_bytes[half:], headers={**headers, "Upload-Offset": str(half)})
+    assert resp.status_code == 204
+
+    resp = test_client.post(f"{location}/finalize", json={"md5": hashlib.md5(zip_bytes).hexdigest()})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert any(name.startswith("chunked") for name in body["saved"])
+    assert body["ignored"] == ["readme.md"]
+
+    # The staging area is gone once the archive has been extracted
+    assert test_client.head(location).status_code == 404
+    shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+def test_upload_zip_streams_ndjson_report(test_client):
+    rv = test_client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "test1234"},
+        follow_redirects=False,
+    )
+    assert rv.status_code in (200, 302)
+
+    zip_bytes = _make_zip_bytes({"ok.poke": VALID_POKE, "broken.poke": "Pikachu\n- Thunderbolt\n", "notes.txt": "x"})
+    data = {"file": (io.BytesIO(zip_bytes), "stream.zip")}
+    resp = test_client.post("/dataset/zip/upload?stream=1", data=data, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    reports, summary = lines[:-1], lines[-1]
+    assert [(r["file"], r["valid"]) for r in reports] == [("ok.poke", True), ("broken.poke", False)]
+    assert summary["invalid"] == ["broken.poke"]
+    assert summary["ignored"] == ["notes.txt"]
+
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        temp_folder = AuthenticationService().temp_folder_by_user(user)
+    try:
+        assert os.path.exists(os.path.join(temp_folder, reports[0]["saved_as"]))
+        assert not os.path.exists(os.path.join(temp_folder, "broken.poke"))
+    finally:
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder)
+
+
+def test_upload_poke_streams_validation_and_checksum(test_client):
+    rv = test_client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "test1234"},
+        follow_redirects=False,
+    )
+    assert rv.status_code in (200, 302)
+
+    team = VALID_POKE + "\n" + VALID_POKE.replace("Pikachu", "Raichu")
+    data = {"file": (io.BytesIO(team.encode("utf-8")), "team.poke")}
+    resp = test_client.post("/dataset/file/upload", data=data, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["sets"] == 2
+    assert body["size"] == len(team.encode("utf-8"))
+    assert body["checksum"] == hashlib.md5(team.encode("utf-8")).hexdigest()
+
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        temp_folder = AuthenticationService().temp_folder_by_user(user)
+
+    try:
+        with open(os.path.join(temp_folder, body["filename"]), encoding="utf-8") as f:
+            assert f.read() == team
+        assert not [name for name in os.listdir(temp_folder) if name.endswith(".part")]
+        metadata = read_file_metadata(temp_folder, body["filename"])
+        assert metadata["sha256"] == hashlib.sha256(team.encode("utf-8")).hexdigest()
+        # The sets validated on the way in are kept, to be stored without parsing the file again
+        assert [(position, data["pokemon"]) for position, data in metadata["sets"]] == [(0, "Pikachu"), (1, "Raichu")]
+        assert metadata["line_count"] == team.count("\n")
+
+        # The first set is broken, so the upload stops before the second one is read
+        broken = "Pikachu\n- Thunderbolt\n\n" + VALID_POKE
+        data = {"file": (io.BytesIO(broken.encode("utf-8")), "broken.poke")}
+        resp = test_client.post("/dataset/file/upload", data=data, content_type="multipart/form-data")
+        assert resp.status_code == 400
+        assert resp.get_json()["errors"] == ["Set 1 (Pikachu): No se ha especificado una Habilidad."]
+        assert not os.path.exists(os.path.join(temp_folder, "broken.poke"))
+
+        data = {"file": (io.BytesIO(b"\xff\xfe"), "binary.poke")}
+        resp = test_client.post("/dataset/file/upload", data=data, content_type="multipart/form-data")
+        assert resp.status_code == 400
+
+        test_client.application.config["POKE_UPLOAD_MAX_SIZE"] = 10
+        data = {"file": (io.BytesIO(team.encode("utf-8")), "big.poke")}
+        resp = test_client.post("/dataset/file/upload", data=data, content_type="multipart/form-data")
+        assert resp.status_code == 413
+        assert not [name for name in os.listdir(temp_folder) if name.endswith(".part")]
+    finally:
+        test_client.application.config["POKE_UPLOAD_MAX_SIZE"] = 10 * 1024 * 1024
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder)
+
+
+def test_known_checksums_are_linked_instead_of_uploaded(test_client, dataset_seed, tmp_path, monkeypatch):
+    from app.modules.hubfile.blobs import blob_store
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(blob_store, "root", str(tmp_path / "uploads" / "blobs"))
+    content = VALID_POKE.replace("Pikachu", "Pichu").encode("utf-8")
+    checksum = hashlib.md5(content).hexdigest()
+    unknown = hashlib.md5(b"never uploaded").hexdigest()
+
+    test_client.post("/login", data={"email": "test@example.com", "password": "test1234"})
+    with test_client.application.app_context():
+        # Dataset 8 is published, so its files can be reused by anyone
+        dataset = DataSet.query.get(8)
+        pm = PokeModel(
+            data_set_id=dataset.id,
+            fm_meta_data=FMMetaData(
+                poke_filename="known.poke", title="k", description="d", publication_type=PublicationType.NONE
+            ),
+        )
+        db.session.add(pm)
+        db.session.flush()
+        db.session.add(Hubfile(name="known.poke", checksum=checksum, size=len(content), poke_model_id=pm.id))
+        db.session.commit()
+        source_dir = tmp_path / "uploads" / f"user_{dataset.user_id}" / f"dataset_{dataset.id}"
+        source_dir.mkdir(parents=True)
+        (source_dir / "known.poke").write_bytes(content)
+
+        user = User.query.filter_by(email="test@example.com").first()
+        temp_folder = AuthenticationService().temp_folder_by_user(user)
+
+    resp = test_client.post(
+        "/dataset/file/checksums", json={"checksums": [checksum.upper(), unknown, "not-a-checksum", 7]}
+    )
+    assert resp.status_code == 200
+    assert resp.get_json() == {"known": [checksum]}
+    assert test_client.post("/dataset/file/checksums", json={"checksums": "abc"}).status_code == 400
+
+    try:
+        resp = test_client.post("/dataset/file/link", json={"checksum": checksum, "filename": "mine.poke"})
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body["linked"] and body["size"] == len(content)
+        linked_path = os.path.join(temp_folder, body["filename"])
+        assert os.path.samefile(linked_path, blob_store.path(checksum))
+        assert read_file_metadata(temp_folder, body["filename"])["md5"] == checksum
+
+        resp = test_client.post("/dataset/file/link", json={"checksum": unknown, "filename": "x.poke"})
+        assert resp.status_code == 404
+        resp = test_client.post("/dataset/file/link", json={"checksum": checksum, "filename": "x.txt"})
+        assert resp.status_code == 400
+    finally:
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder)
+
+
+def test_create_from_cart_links_blobs_instead_of_copying(test_client, dataset_seed, tmp_path, monkeypatch):
+    from app.modules.dataset.services import DataSetService
+    from app.modules.hubfile.blobs import blob_store
+    from app.modules.hubfile.models import Hubfile, HubfileBlob
+    from app.modules.hubfile.repositories import HubfileBlobRepository
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+    from app.modules.shopping_cart.models import ShoppingCart, ShoppingCartItem
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(blob_store, "root", str(tmp_path / "uploads" / "blobs"))
+    content = VALID_POKE.encode("utf-8")
+    checksum = hashlib.md5(content).hexdigest()
+
+    with test_client.application.app_context():
+        dataset = DataSet.query.get(8)
+        fm_meta = FMMetaData(
+            poke_filename="cart.poke", title="cart", description="d", publication_type=PublicationType.NONE
+        )
+        pm = PokeModel(data_set_id=dataset.id, fm_meta_data=fm_meta)
+        db.session.add(pm)
+        db.session.flush()
+        hubfile = Hubfile(name="cart.poke", checksum=checksum, size=len(content), poke_model_id=pm.id)
+        db.session.add(hubfile)
+        HubfileBlobRepository().acquire(checksum, len(content))
+
+        # Stored before the blob store existed: only the dataset copy is on disk
+        source_dir = tmp_path / "uploads" / f"user_{dataset.user_id}" / f"dataset_{dataset.id}"
+        source_dir.mkdir(parents=True)
+        (source_dir / "cart.poke").write_bytes(content)
+
+        user = User.query.filter_by(email="test@example.com").first()
+        cart = ShoppingCart.query.filter_by(user_id=user.id).first() or ShoppingCart(user_id=user.id)
+        db.session.add(cart)
+        db.session.flush()
+        db.session.add(ShoppingCartItem(shopping_cart_id=cart.id, file_id=hubfile.id))
+        db.session.commit()
+
+        new_dataset = DataSetService().create_from_cart(
+            user.id, {"title": "From cart", "desc": "d", "publication_type": "none"}, cart
+        )
+
+        dest_path = tmp_path / "uploads" / f"user_{user.id}" / f"dataset_{new_dataset.id}" / "cart.poke"
+        assert dest_path.read_bytes() == content
+        assert os.path.samefile(dest_path, blob_store.path(checksum))
+        assert os.path.samefile(source_dir / "cart.poke", blob_store.path(checksum))
+        assert db.session.get(HubfileBlob, checksum).ref_count == 2
+        assert not cart.items
+
+
+def test_download_dataset_streams_then_serves_cached_archive(test_client, dataset_seed, tmp_path, monkeypatch):
+    from app.modules.dataset.archives import archive_cache
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(archive_cache, "root", str(tmp_path / "archives"))
+    content = VALID_POKE.encode("utf-8")
+
+    with test_client.application.app_context():
+        dataset = DataSet.query.get(8)
+        pm = PokeModel(
+            data_set_id=dataset.id,
+            fm_meta_data=FMMetaData(
+                poke_filename="zipped.poke", title="z", description="d", publication_type=PublicationType.NONE
+            ),
+        )
+        db.session.add(pm)
+        db.session.flush()
+        db.session.add(
+            Hubfile(
+                name="zipped.poke", checksum=hashlib.md5(content).hexdigest(), size=len(content), poke_model_id=pm.id
+            )
+        )
+        db.session.commit()
+        dataset_dir = tmp_path / "uploads" / f"user_{dataset.user_id}" / "dataset_8"
+        dataset_dir.mkdir(parents=True)
+        (dataset_dir / "zipped.poke").write_bytes(content)
+
+    first = test_client.get("/dataset/download/8")
+    assert first.status_code == 200
+    assert first.is_streamed
+    with zipfile.ZipFile(io.BytesIO(first.data)) as zf:
+        assert zf.read("dataset_8/zipped.poke") == content
+    assert len(os.listdir(tmp_path / "archives")) == 1
+
+    second = test_client.get("/dataset/download/8")
+    assert second.status_code == 200
+    assert second.data == first.data
+    assert "dataset_8.zip" in second.headers["Content-Disposition"]
+
+    etag = first.headers["ETag"]
+    assert second.headers["ETag"] == etag
+    assert test_client.get("/dataset/download/8", headers={"If-None-Match": etag}).status_code == 304
+
+    partial = test_client.get("/dataset/download/8", headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.data == first.data[:10]
+
+
+def test_download_dataset_twice_from_default_archive_cache(test_client):
+    from app.modules.dataset.archives import archive_cache
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+    from core.configuration.configuration import uploads_root
+
+    # Unique content, so the archive is not cached yet; the cache root is the configured one
+    content = f"{VALID_POKE}\n# {os.urandom(8).hex()}\n".encode("utf-8")
+    with test_client.application.app_context():
+        user = User.query.first()
+        meta = DSMetaData(title="Downloaded twice", description="d", publication_type=PublicationType.NONE)
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+        pm = PokeModel(
+            data_set=dataset,
+            fm_meta_data=FMMetaData(
+                poke_filename="twice.poke", title="t", description="d", publication_type=PublicationType.NONE
+            ),
+        )
+        pm.files.append(Hubfile(name="twice.poke", checksum=hashlib.md5(content).hexdigest(), size=len(content)))
+        db.session.add(pm)
+        db.session.commit()
+        dataset_id = dataset.id
+        dataset_dir = os.path.join(uploads_root(), f"user_{user.id}", f"dataset_{dataset_id}")
+    os.makedirs(dataset_dir)
+    with open(os.path.join(dataset_dir, "twice.poke"), "wb") as f:
+        f.write(content)
+
+    cached_path = None
+    try:
+        first = test_client.get(f"/dataset/download/{dataset_id}")
+        assert first.status_code == 200
+        assert first.is_streamed
+        body = first.data
+        cached_path = archive_cache.get(first.get_etag()[0])
+        assert cached_path is not None
+
+        second = test_client.get(f"/dataset/download/{dataset_id}")
+        assert second.status_code == 200
+        assert second.content_length == len(body)
+        assert second.data == body
+    finally:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        if cached_path:
+            os.remove(cached_path)
+
+
+def _count_queries(app, fn):
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+        # Requests share the session of the fixture's app context: start from an empty one, as a real request does
+        db.session.remove()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+def test_dataset_pages_run_the_same_queries_whatever_the_dataset_size(test_client):
+    from app.modules.dataset.models import DSComment
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    def add_models(dataset_id, count, start):
+        for i in range(start, start + count):
+            fm_meta = FMMetaData(
+                poke_filename=f"m{i}.poke", title=f"m{i}", description="d", publication_type=PublicationType.NONE
+            )
+            model = PokeModel(data_set_id=dataset_id, fm_meta_data=fm_meta)
+            model.files.append(Hubfile(name=f"m{i}.poke", checksum=f"{i:032x}", size=10))
+            db.session.add(model)
+        db.session.add(DSComment(dataset_id=dataset_id, user_id=user_id, content=f"comment {start}"))
+        db.session.commit()
+
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        user_id = user.id
+        meta = DSMetaData(
+            title="Profiles",
+            description="d",
+            publication_type=PublicationType.NONE,
+            dataset_doi="10.1234/profiles",
+            tags="ou,doubles",
+        )
+        dataset = DataSet(user_id=user_id, ds_meta_data=meta)
+        db.session.add(dataset)
+        db.session.commit()
+        dataset_id = dataset.id
+        add_models(dataset_id, 2, 0)
+        draft = DataSet(
+            user_id=user_id,
+            draft_mode=True,
+            ds_meta_data=DSMetaData(
+                title="Draft profiles", description="d", publication_type=PublicationType.NONE, tags="draft"
+            ),
+        )
+        db.session.add(draft)
+        db.session.commit()
+        draft_id = draft.id
+        add_models(draft_id, 2, 100)
+
+    def view():
+        assert test_client.get("/doi/10.1234/profiles/").status_code == 200
+
+    def listing():
+        assert test_client.get("/dataset/list").status_code == 200
+
+    def api():
+        assert test_client.get("/api/v1/datasets/").status_code == 200
+
+    def edit():
+        assert test_client.get(f"/dataset/{draft_id}/edit").status_code == 200
+
+    def draft_view():
+        assert test_client.get(f"/dataset/unsynchronized/{draft_id}/").status_code == 200
+
+    def count_all():
+        return [_count_queries(test_client.application, page) for page in (view, listing, api, edit, draft_view)]
+
+    test_client.post("/login", data={"email": "test@example.com", "password": "test1234"})
+    # The first visit also records the view
+    view()
+    small = count_all()
+    with test_client.application.app_context():
+        add_models(dataset_id, 30, 2)
+        add_models(draft_id, 30, 102)
+    assert count_all() == small
+
+
+def test_delete_dataset_releases_its_blobs(test_client, tmp_path, monkeypatch):
+    from app.modules.hubfile.blobs import blob_store
+    from app.modules.hubfile.models import Hubfile, HubfileBlob
+    from app.modules.hubfile.repositories import HubfileBlobRepository
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    monkeypatch.setattr(blob_store, "root", str(tmp_path / "blobs"))
+    shared, own = b"shared set", b"own set"
+    checksums = {content: hashlib.md5(content).hexdigest() for content in (shared, own)}
+
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        datasets = []
+        for title, contents in (("keeps", [shared]), ("deleted", [shared, own])):
+            meta = DSMetaData(title=title, description="d", publication_type=PublicationType.NONE)
+            dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+            for content in contents:
+                name = f"{title}-{len(content)}.poke"
+                pm = PokeModel(
+                    fm_meta_data=FMMetaData(
+                        poke_filename=name, title=name, description="d", publication_type=PublicationType.NONE
+                    )
+                )
+                pm.files.append(Hubfile(name=name, checksum=checksums[content], size=len(content)))
+                dataset.poke_models.append(pm)
+                HubfileBlobRepository().acquire(checksums[content], len(content))
+                source = tmp_path / name
+                source.write_bytes(content)
+                blob_store.ingest(checksums[content], str(source))
+            db.session.add(dataset)
+            datasets.append(dataset)
+        db.session.commit()
+
+        datasets[1].delete()
+
+        # The blob still used by the other dataset stays; the one only the deleted dataset used goes away
+        assert db.session.get(HubfileBlob, checksums[shared]).ref_count == 1
+        assert blob_store.exists(checksums[shared])
+        assert db.session.get(HubfileBlob, checksums[own]) is None
+        assert not blob_store.exists(checksums[own])
+
+        datasets[0].delete()
+        assert db.session.get(HubfileBlob, checksums[shared]) is None
+        assert not blob_store.exists(checksums[shared])
+
+
+def test_tags_are_normalized_and_counted_per_dataset(test_client):
+    from app.modules.dataset.repositories import DSMetaDataRepository, TagRepository
+    from app.modules.explore.repositories import ExploreRepository
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    def tag_counts():
+        return {tag["name"]: tag["count"] for tag in ExploreRepository().get_all_tags()}
+
+    with test_client.application.app_context():
+        tag_repository = TagRepository()
+        user = User.query.filter_by(email="test@example.com").first()
+        meta = DSMetaData(
+            title="Tagged",
+            description="d",
+            publication_type=PublicationType.NONE,
+            dataset_doi="10.1234/tagged",
+            tags="trick room, Sun ,",
+        )
+        fm_meta = FMMetaData(
+            poke_filename="tagged.poke",
+            title="tagged",
+            description="d",
+            publication_type=PublicationType.NONE,
+            tags="sun,sandstorm",
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+        dataset.poke_models.append(PokeModel(fm_meta_data=fm_meta))
+        db.session.add(dataset)
+        tag_ids = tag_repository.sync_tags(meta) | tag_repository.sync_tags(fm_meta)
+        tag_repository.refresh_counts(tag_ids)
+        db.session.commit()
+
+        # "Sun" and "sun" are the same tag, and the dataset counts once for it
+        assert [tag.name for tag in fm_meta.tag_list] == ["Sun", "sandstorm"]
+        counts = tag_counts()
+        assert (counts["trick room"], counts["Sun"], counts["sandstorm"]) == (1, 1, 1)
+
+        # Tags match whole, not as substrings
+        assert dataset in ExploreRepository().filter(tags_filter="sandstorm")
+        assert dataset not in ExploreRepository().filter(tags_filter="sand")
+        # Tags are the same whatever their case, and so is the filter
+        assert dataset in ExploreRepository().filter(tags_filter="SUN")
+
+        DSMetaDataRepository().update(meta.id, tags="sandstorm")
+        counts = tag_counts()
+        assert "trick room" not in counts
+        assert (counts["Sun"], counts["sandstorm"]) == (1, 1)
+
+        dataset.delete()
+        counts = tag_counts()
+        assert "Sun" not in counts and "sandstorm" not in counts
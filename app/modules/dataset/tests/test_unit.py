@@ -1,8 +1,12 @@
+import hashlib
 import io
 import os
 import shutil
+import threading
+import time
 import uuid
 import zipfile
+import zlib
 from datetime import datetime
 from unittest.mock import MagicMock, Mock, patch
 from zipfile import ZipFile
@@ -14,9 +18,17 @@ from app.modules.auth.models import User
 from app.modules.auth.repositories import UserRepository
 from app.modules.auth.services import AuthenticationService
 from app.modules.conftest import login, logout
-from app.modules.dataset.models import Author, DataSet, DSComment, DSMetaData, PublicationType
-from app.modules.dataset.services import DataSetService, SizeService
-from app.modules.pokemodel.models import FMMetaData, PokeModel, Pokemon
+from app.modules.dataset.archives import ArchiveCache
+from app.modules.dataset.github_archives import GithubArchiveFetcher
+from app.modules.dataset.models import Author, DataSet, DSComment, DSMetaData, PublicationType, Tag
+from app.modules.dataset.services import (
+    DataSetService,
+    SizeService,
+    calculate_checksum_and_size,
+    uploaded_checksum_and_size,
+)
+from app.modules.dataset.uploads import digest_file, read_file_metadata, write_file_metadata
+from app.modules.pokemodel.models import FMMetaData, PokeModel, Pokemon, PokeSet
 from app.modules.profile.models import UserProfile
 
 
@@ -84,6 +96,20 @@ def test_size_service_human_readable(size, expected):
         assert res == expected
 
 
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        (None, []),
+        ("", []),
+        (" , ,", []),
+        ("ou, doubles", ["ou", "doubles"]),
+        ("Trick Room,trick room , vgc", ["Trick Room", "vgc"]),
+    ],
+)
+def test_tag_names_from_comma_separated_string(raw, expected):
+    assert Tag.names_from(raw) == expected
+
+
 @pytest.fixture(scope="module")
 def test_client(test_client):
     """
@@ -351,12 +377,12 @@ def test_dataset_to_indexed():
     pokemon2.moves = ["Llamarada", "Vuelo", "Giga Impacto", "Ascuas"]
     fm1 = MagicMock(spec=PokeModel)
     fm1.fm_meta_data = fm_meta_data
-    fm1.get_pokemon = MagicMock(return_value=pokemon1)
+    fm1.poke_sets = [MagicMock(spec=PokeSet, to_pokemon=MagicMock(return_value=pokemon1))]
     fm1.get_total_evs = MagicMock(return_value=40)
     fm1.get_total_ivs = MagicMock(return_value=3)
     fm2 = MagicMock(spec=PokeModel)
     fm2.fm_meta_data = fm_meta_data2
-    fm2.get_pokemon = MagicMock(return_value=pokemon2)
+    fm2.poke_sets = [MagicMock(spec=PokeSet, to_pokemon=MagicMock(return_value=pokemon2))]
     fm2.get_total_evs = MagicMock(return_value=6)
     fm2.get_total_ivs = MagicMock(return_value=9)
     metadata = DSMetaData(
@@ -396,6 +422,34 @@ def test_dataset_to_indexed():
     assert indexed["doi"] == "doi_de_prueba", "DOI does not match."
 
 
+def test_dataset_to_indexed_uses_stored_poke_sets():
+    poke_set = PokeSet(
+        species="Glimmora",
+        item="Focus Sash",
+        ability="Toxic Debris",
+        ev_spa=252,
+        ev_spd=4,
+        ev_spe=252,
+        iv_atk=0,
+        moves="Mortal Spin\nStealth Rock",
+    )
+    fm = MagicMock(spec=PokeModel)
+    fm.fm_meta_data = FMMetaData()
+    fm.poke_sets = [poke_set]
+    metadata = DSMetaData(title="Sets", description="Stored sets", tags="", authors=[])
+    dataset = DataSet(created_at=datetime.fromisoformat("2025-11-30T16:15:23"), ds_meta_data=metadata)
+    dataset.__dict__["poke_models"] = [fm]
+
+    indexed = dataset.to_indexed()
+
+    fm.iter_pokemons.assert_not_called()
+    assert indexed["pokemons"] == ["Glimmora"]
+    assert indexed["abilities"] == ["Toxic Debris"]
+    assert indexed["moves"] == ["Mortal Spin", "Stealth Rock"]
+    assert indexed["max_ev_count"] == 508
+    assert indexed["max_iv_count"] == 0
+
+
 @pytest.fixture
 def dataset_service():
     return DataSetService()
@@ -415,12 +469,11 @@ def test_extract_pokes_from_zip(dataset_service, tmp_path):
 
 
 def test_import_pokes_from_github(dataset_service, tmp_path):
-    fake_zip = io.BytesIO()
+    fake_zip = tmp_path / "repo.zip"
     with ZipFile(fake_zip, "w") as zf:
         zf.writestr("repo-branch/file1.poke", "content")
-    fake_zip.seek(0)
 
-    with patch.object(dataset_service, "fetch_repo_zip", return_value=fake_zip.getvalue()):
+    with patch.object(dataset_service, "fetch_repo_zip", return_value=str(fake_zip)):
         saved = dataset_service.import_pokes_from_github("https://github.com/fake/repo", dest_dir=tmp_path)
         assert "file1.poke" in saved
         assert (tmp_path / "file1.poke").exists()
@@ -471,6 +524,18 @@ def feedback_dataset(feedback_user):
     return dataset
 
 
+VALID_POKE = "Pikachu @ Light Ball\nAbility: Static\nEVs: 252 SpA / 4 SpD / 252 Spe\n- Thunderbolt\n- Volt Switch\n"
+
+
+@pytest.fixture
+def github_archives_in_tmp(monkeypatch, tmp_path):
+    """A GitHub archive fetcher caching under tmp_path, in place of the one writing to WORKING_DIR/uploads."""
+    fetcher = GithubArchiveFetcher(ArchiveCache(str(tmp_path / "github"), 10**7))
+    monkeypatch.setattr("app.modules.dataset.routes.github_archives", fetcher)
+    monkeypatch.setattr("app.modules.dataset.services.github_archives", fetcher)
+    return fetcher
+
+
 def _make_zip_bytes(files: dict, root_prefix: str = "") -> bytes:
     buf = io.BytesIO()
     with zipfile.ZipFile(buf, "w") as zf:
@@ -491,8 +556,9 @@ def test_upload_zip_saves_and_ignores(test_client):
     assert rv.status_code in (200, 302)
 
     files = {
-        "good1.poke": "content1",
-        "good2.POKE": "content2",
+        "good1.poke": VALID_POKE,
+        "good2.POKE": VALID_POKE,
+        "bad.poke": "content",
         "ignore.txt": "nope",
         "../escape.poke": "bad",
     }
@@ -516,6 +582,13 @@ def test_upload_zip_saves_and_ignores(test_client):
     assert any("ignore.txt" in ig for ig in body["ignored"])
     assert any(".." in ig or ig.startswith("/") for ig in body["ignored"])
 
+    # members that fail validation are reported but not saved
+    assert body["invalid"] == ["bad.poke"]
+    assert not any(s.endswith("bad.poke") for s in body["saved"])
+    report = {entry["file"]: entry for entry in body["report"]}
+    assert report["good1.poke"]["valid"] and report["good1.poke"]["summary"]["pokemon"] == "Pikachu"
+    assert "No se ha especificado una Habilidad." in report["bad.poke"]["errors"]
+
     # Check files exist in uploads/temp/<user.id>
     # derive path via AuthenticationService
     user = UserRepository().get_by_email("test@example.com")
@@ -530,7 +603,30 @@ def test_upload_zip_saves_and_ignores(test_client):
             shutil.rmtree(temp_folder)
 
 
-def test_import_from_github_with_mocked_zip(monkeypatch, test_client):
+def test_upload_zip_rejects_members_over_the_file_size_limit(test_client):
+    login(test_client, "test@example.com", "test1234")
+    big = VALID_POKE + "\n" + VALID_POKE
+    zip_bytes = _make_zip_bytes({"small.poke": VALID_POKE, "big.poke": big})
+
+    user = UserRepository().get_by_email("test@example.com")
+    temp_folder = AuthenticationService().temp_folder_by_user(user)
+    test_client.application.config["POKE_UPLOAD_MAX_SIZE"] = len(VALID_POKE)
+    try:
+        data = {"file": (io.BytesIO(zip_bytes), "test.zip")}
+        resp = test_client.post("/dataset/zip/upload", data=data, content_type="multipart/form-data")
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body["saved"] == ["small.poke"]
+        # Never decompressed, let alone validated
+        assert body["invalid"] == ["big.poke"]
+        assert [entry["file"] for entry in body["report"]] == ["small.poke"]
+    finally:
+        test_client.application.config["POKE_UPLOAD_MAX_SIZE"] = 10 * 1024 * 1024
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder)
+
+
+def test_import_from_github_with_mocked_zip(monkeypatch, test_client, github_archives_in_tmp):
     # login
     rv = test_client.post(
         "/login",
@@ -541,7 +637,7 @@ def test_import_from_github_with_mocked_zip(monkeypatch, test_client):
 
     # Create a fake repo zip with a root folder and a subdir
     files = {
-        "rootdir/path/good.poke": "ok",
+        "rootdir/path/good.poke": VALID_POKE,
         "rootdir/path/readme.md": "md",
         "rootdir/other/ignored.txt": "no",
     }
@@ -549,11 +645,18 @@ def test_import_from_github_with_mocked_zip(monkeypatch, test_client):
 
     class DummyResp:
         status_code = 200
+        headers = {}
 
         def __init__(self, content):
             self.content = content
 
-    def fake_get(url, timeout=60):
+        def iter_content(self, chunk_size=1):
+            yield self.content
+
+        def close(self):
+            pass
+
+    def fake_get(url, **kwargs):
         return DummyResp(zip_bytes)
 
     monkeypatch.setattr("requests.get", fake_get)
@@ -643,3 +746,425 @@ def test_delete_comment_by_dataset_owner(test_client, feedback_user, feedback_da
     after = DSComment.query.get(comment.id)
     assert after is None
     logout(test_client)
+
+
+def test_calculate_checksum_and_size_streams_in_chunks(tmp_path):
+    content = b"Pikachu\n- Thunderbolt\n" * 100_000  # larger than one hashing chunk
+    path = tmp_path / "big.poke"
+    path.write_bytes(content)
+
+    assert calculate_checksum_and_size(str(path)) == (hashlib.md5(content).hexdigest(), len(content))
+
+    digest = digest_file(str(path))
+    assert digest.sha256.hexdigest() == hashlib.sha256(content).hexdigest()
+    assert digest.line_count == 200_000
+
+
+def test_uploaded_checksum_and_size_reuses_upload_record(tmp_path):
+    temp_folder = str(tmp_path)
+    (tmp_path / "set.poke").write_bytes(b"Pikachu\nAbility: Static\n- Thunderbolt")
+    write_file_metadata(temp_folder, "set.poke", {"size": 37, "md5": "recorded", "sha256": "x", "line_count": 3})
+
+    with patch("app.modules.dataset.services.digest_file") as mock_digest:
+        assert uploaded_checksum_and_size(temp_folder, "set.poke") == ("recorded", 37)
+    mock_digest.assert_not_called()
+
+    # A file that changed after upload is hashed again and its record refreshed
+    (tmp_path / "set.poke").write_bytes(b"Raichu\n- Thunderbolt\n")
+    checksum, size = uploaded_checksum_and_size(temp_folder, "set.poke")
+    assert (checksum, size) == (hashlib.md5(b"Raichu\n- Thunderbolt\n").hexdigest(), 21)
+    assert read_file_metadata(temp_folder, "set.poke")["line_count"] == 2
+
+
+def test_iter_zip_streams_a_valid_archive(tmp_path):
+    from app.modules.dataset.archives import iter_zip
+
+    first = tmp_path / "a.poke"
+    first.write_bytes(b"Pikachu\n" * 1000)
+    second = tmp_path / "b.poke"
+    second.write_bytes(b"")
+
+    chunks = list(iter_zip([("dataset_1/a.poke", str(first)), ("dataset_1/b.poke", str(second))], chunk_size=512))
+    assert len(chunks) > 2
+    with ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.read("dataset_1/a.poke") == b"Pikachu\n" * 1000
+        assert zf.read("dataset_1/b.poke") == b""
+
+    # Rebuilt later, from a copy with another mtime and mode and listed in another order: the same bytes
+    copy = tmp_path / "copy.poke"
+    copy.write_bytes(first.read_bytes())
+    os.chmod(copy, 0o600)
+    os.utime(copy, (1_000_000_000, 1_000_000_000))
+    rebuilt = iter_zip([("dataset_1/b.poke", str(second)), ("dataset_1/a.poke", str(copy))], chunk_size=512)
+    assert b"".join(rebuilt) == b"".join(chunks)
+
+
+def test_archive_cache_stores_complete_archives_and_evicts_lru(tmp_path):
+    from app.modules.dataset.archives import ArchiveCache, archive_key
+
+    assert archive_key([("b", "2"), ("a", "1")]) == archive_key([("a", "1"), ("b", "2")])
+    assert archive_key([("a", "1")]) != archive_key([("a", "2")])
+
+    source = tmp_path / "set.poke"
+    source.write_bytes(os.urandom(4096))
+    cache = ArchiveCache(str(tmp_path / "archives"), max_size=10_000)
+
+    # An interrupted download leaves nothing behind
+    stream = cache.stream("interrupted", [("set.poke", str(source))], chunk_size=1024)
+    next(stream)
+    stream.close()
+    assert cache.get("interrupted") is None
+    assert os.listdir(tmp_path / "archives") == []
+
+    body = b"".join(cache.stream("first", [("set.poke", str(source))]))
+    assert open(cache.get("first"), "rb").read() == body
+
+    b"".join(cache.stream("second", [("set.poke", str(source))]))
+    os.utime(cache.path("second"), (1, 1))  # "second" is now the least recently used
+    cache.get("first")
+    b"".join(cache.stream("third", [("set.poke", str(source))]))
+
+    assert cache.get("second") is None
+    assert cache.get("first") and cache.get("third")
+
+
+def test_resumable_upload_appends_at_offset_and_survives_a_new_worker(tmp_path):
+    from app.modules.dataset.uploads import ResumableUpload, UploadRejected
+
+    data = os.urandom(300_000)
+    upload = ResumableUpload.create(str(tmp_path), "big.zip", len(data), max_size=10**6)
+
+    assert upload.append(io.BytesIO(data[:100_000]), 0) == 100_000
+    with pytest.raises(UploadRejected) as exc:
+        upload.append(io.BytesIO(data[100_000:]), 50_000)
+    assert exc.value.status_code == 409
+    with pytest.raises(UploadRejected):
+        upload.finalize()
+
+    # Another worker picks up the next chunk from the state on disk
+    resumed = ResumableUpload(str(tmp_path), upload.upload_id)
+    assert resumed.offset == 100_000
+    assert resumed.append(io.BytesIO(data[100_000:]), 100_000) == len(data)
+
+    metadata = resumed.finalize(expected_md5=hashlib.md5(data).hexdigest())
+    assert metadata["size"] == len(data)
+    assert metadata["sha256"] == hashlib.sha256(data).hexdigest()
+    with pytest.raises(UploadRejected):
+        resumed.finalize(expected_md5="0" * 32)
+
+    resumed.discard()
+    assert not resumed.exists()
+    with pytest.raises(UploadRejected):
+        ResumableUpload(str(tmp_path), "../../etc")
+    with pytest.raises(UploadRejected):
+        ResumableUpload.create(str(tmp_path), "huge.zip", 10**7, max_size=10**6)
+
+
+def test_resumable_upload_serializes_appends_at_the_same_offset(tmp_path):
+    from app.modules.dataset.uploads import ResumableUpload, UploadRejected
+
+    upload = ResumableUpload.create(str(tmp_path), "big.zip", 20, max_size=10**6)
+    reading, release = threading.Event(), threading.Event()
+    results = {}
+
+    class SlowStream:
+        def __init__(self):
+            self.chunks = [b"x" * 10]
+
+        def read(self, size):
+            reading.set()
+            release.wait(5)
+            return self.chunks.pop() if self.chunks else b""
+
+    def append(key, stream):
+        try:
+            results[key] = ResumableUpload(str(tmp_path), upload.upload_id).append(stream, 0)
+        except UploadRejected as e:
+            results[key] = e.status_code
+
+    first = threading.Thread(target=append, args=("first", SlowStream()))
+    first.start()
+    reading.wait(5)
+    # The retry of the same chunk waits for the first append instead of writing next to it
+    second = threading.Thread(target=append, args=("second", io.BytesIO(b"y" * 10)))
+    second.start()
+    time.sleep(0.1)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert results == {"first": 10, "second": 409}
+    assert upload.offset == 10
+
+
+def test_resumable_upload_expire_stale(tmp_path):
+    from app.modules.dataset.uploads import ResumableUpload
+
+    stale = ResumableUpload.create(str(tmp_path), "old.zip", 10, max_size=10**6)
+    active = ResumableUpload.create(str(tmp_path), "new.zip", 10, max_size=10**6)
+    old = time.time() - 3 * 60 * 60
+    os.utime(stale.data_path, (old, old))
+
+    assert ResumableUpload.expire_stale(str(tmp_path), max_age=60 * 60) == [stale.upload_id]
+    assert not stale.exists()
+    assert active.exists()
+    assert ResumableUpload.expire_stale(str(tmp_path / "nowhere"), max_age=60) == []
+
+
+def test_unique_name_allocator_numbers_duplicates_without_probing(tmp_path):
+    from app.modules.dataset.uploads import UniqueNameAllocator
+
+    (tmp_path / "set.poke").write_text("x")
+    (tmp_path / "set (1).poke").write_text("x")
+    names = UniqueNameAllocator(str(tmp_path))
+
+    with patch("os.path.exists", side_effect=AssertionError("the disk must not be probed")):
+        allocated = [names.allocate("set.poke") for _ in range(3)] + [names.allocate("other.poke")]
+    assert allocated == ["set (2).poke", "set (3).poke", "set (4).poke", "other.poke"]
+
+    # A file created behind the allocator's back is skipped when the name is opened
+    (tmp_path / "late.poke").write_text("x")
+    name, dst = names.open_new(names.allocate("late.poke"), "late.poke")
+    dst.close()
+    assert name == "late (1).poke"
+
+
+def test_replacing_never_writes_through_hard_links(tmp_path):
+    from app.modules.dataset.uploads import replacing
+
+    blob = tmp_path / "blob"
+    blob.write_text("stored")
+    linked = tmp_path / "set.poke"
+    os.link(blob, linked)
+
+    with replacing(str(linked)) as f:
+        f.write(b"new version")
+    assert linked.read_text() == "new version"
+    assert blob.read_text() == "stored"
+    assert sorted(os.listdir(tmp_path)) == ["blob", "set.poke"]
+
+
+def test_extract_pokes_from_zip_with_many_duplicate_names(dataset_service, tmp_path):
+    buf = io.BytesIO()
+    with ZipFile(buf, "w") as zf:
+        for i in range(50):
+            zf.writestr(f"team_{i}/set.poke", f"content {i}")
+    buf.seek(0)
+
+    saved = dataset_service.extract_pokes_from_zip(buf, tmp_path)
+    assert saved == ["set.poke"] + [f"set ({i}).poke" for i in range(1, 50)]
+    assert (tmp_path / "set (49).poke").read_text() == "content 49"
+
+
+@pytest.fixture
+def codeload_stub():
+    """Local stand-in for codeload.github.com: serves one archive with an ETag and honours If-None-Match."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {"archive": b"", "etag": '"v1"', "requests": [], "bodies_sent": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"].append((self.path, self.headers.get("If-None-Match")))
+            if self.headers.get("If-None-Match") == state["etag"]:
+                self.send_response(304)
+                self.send_header("ETag", state["etag"])
+                self.end_headers()
+                return
+            state["bodies_sent"] += 1
+            self.send_response(200)
+            self.send_header("ETag", state["etag"])
+            self.send_header("Content-Length", str(len(state["archive"])))
+            self.end_headers()
+            self.wfile.write(state["archive"])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def _zip_with(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with ZipFile(buf, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buf.getvalue()
+
+
+def test_github_archive_cache_revalidates_with_etag(codeload_stub, tmp_path):
+    from app.modules.dataset.github_archives import GithubArchiveError
+
+    fetcher = GithubArchiveFetcher(ArchiveCache(str(tmp_path), 10**7), base_url=codeload_stub["url"])
+    codeload_stub["archive"] = _zip_with({"repo-main/a.poke": "v1"})
+
+    first = fetcher.fetch("owner", "repo", "main")
+    assert codeload_stub["requests"][-1] == ("/owner/repo/zip/refs/heads/main", None)
+    with ZipFile(first) as zf:
+        assert zf.read("repo-main/a.poke") == b"v1"
+
+    # Unchanged branch: one 304 and the cached copy
+    assert fetcher.fetch("owner", "repo", "main") == first
+    assert codeload_stub["requests"][-1][1] == '"v1"'
+    assert codeload_stub["bodies_sent"] == 1
+
+    # New commit on the branch: new ETag, new archive
+    codeload_stub["archive"] = _zip_with({"repo-main/a.poke": "v2"})
+    codeload_stub["etag"] = '"v2"'
+    second = fetcher.fetch("owner", "repo", "main")
+    with ZipFile(second) as zf:
+        assert zf.read("repo-main/a.poke") == b"v2"
+    assert codeload_stub["bodies_sent"] == 2
+
+    # Other branches are cached on their own
+    fetcher.fetch("owner", "repo", "dev")
+    assert codeload_stub["requests"][-1] == ("/owner/repo/zip/refs/heads/dev", None)
+
+    small = GithubArchiveFetcher(ArchiveCache(str(tmp_path / "small"), 10**7), codeload_stub["url"], max_size=10)
+    with pytest.raises(GithubArchiveError):
+        small.fetch("owner", "repo", "main")
+    assert not list((tmp_path / "small").glob("*.zip"))
+
+
+class _StaticArchives:
+    """Stands in for the GitHub archive fetcher: every fetch returns the archive set in `path`."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, owner, repo, branch):
+        return self.path
+
+
+def test_incremental_github_import_only_extracts_changes(test_client, monkeypatch, tmp_path):
+    login(test_client, "test@example.com", "test1234")
+    dest = tmp_path / "temp"
+    monkeypatch.setattr(User, "temp_folder", lambda self: str(dest))
+
+    first = tmp_path / "v1.zip"
+    second = tmp_path / "v2.zip"
+    changed = VALID_POKE + "\n"
+    first.write_bytes(_zip_with({"repo-main/a/set.poke": VALID_POKE, "repo-main/b/set.poke": VALID_POKE}))
+    second.write_bytes(
+        _zip_with(
+            {"repo-main/a/set.poke": VALID_POKE, "repo-main/b/set.poke": changed, "repo-main/c/new.poke": VALID_POKE}
+        )
+    )
+    archives = _StaticArchives(str(first))
+    monkeypatch.setattr("app.modules.dataset.routes.github_archives", archives)
+    payload = {"repo_url": "https://github.com/Owner/Repo", "branch": "main", "mode": "incremental"}
+
+    body = test_client.post("/dataset/github/import", json=payload).get_json()
+    assert body["saved"] == ["set.poke", "set (1).poke"]
+    assert read_file_metadata(str(dest), "set (1).poke")["source"]["path"] == "b/set.poke"
+
+    archives.path = str(second)
+    body = test_client.post("/dataset/github/import", json=payload).get_json()
+
+    # b/set.poke changed and replaced its copy; a/set.poke was not touched; c/new.poke is new
+    assert body["saved"] == ["set (1).poke", "new.poke"]
+    assert body["modified"] == ["set (1).poke"]
+    assert body["unchanged"] == ["set.poke"]
+    assert (dest / "set (1).poke").read_text() == changed
+    assert (dest / "set.poke").read_text() == VALID_POKE
+    assert sorted(p.name for p in dest.glob("*.poke")) == ["new.poke", "set (1).poke", "set.poke"]
+    checksum = hashlib.md5(changed.encode()).hexdigest()
+    assert read_file_metadata(str(dest), "set (1).poke")["source"]["checksum"] == checksum
+
+    # Nothing changed since: nothing extracted
+    assert test_client.post("/dataset/github/import", json=payload).get_json()["saved"] == []
+    logout(test_client)
+
+
+def test_saved_dataset_stores_the_sets_parsed_at_upload(test_client, monkeypatch, tmp_path):
+    login(test_client, "user@example.com", "test1234")
+    dest = tmp_path / "temp"
+    monkeypatch.setattr(User, "temp_folder", lambda self: str(dest))
+    team = VALID_POKE + "\n" + VALID_POKE.replace("Pikachu", "Raichu")
+    data = {"file": (io.BytesIO(team.encode("utf-8")), "team.poke")}
+    assert test_client.post("/dataset/file/upload", data=data, content_type="multipart/form-data").status_code == 200
+
+    form = {
+        "save_as_draft": "true",
+        "title": "Parsed once",
+        "desc": "d",
+        "tags": "parsed",
+        "poke_models-0-poke_filename": "team.poke",
+        "poke_models-0-title": "t",
+        "poke_models-0-desc": "d",
+        "poke_models-0-publication_type": "NONE",
+    }
+    with patch("app.modules.dataset.services.iter_sets", side_effect=AssertionError("file parsed again")):
+        dataset_id = test_client.post("/dataset/upload", data=form).get_json()["dataset_id"]
+
+    with test_client.application.app_context():
+        dataset = DataSet.query.get(dataset_id)
+        poke_sets = dataset.poke_models[0].poke_sets
+        assert [(s.position, s.species) for s in poke_sets] == [(0, "Pikachu"), (1, "Raichu")]
+        shutil.rmtree(os.path.dirname(dataset.poke_models[0].files[0].get_path()), ignore_errors=True)
+    logout(test_client)
+
+
+def test_incremental_github_import_compares_with_saved_files(test_client, monkeypatch, tmp_path):
+    from app.modules.hubfile.models import Hubfile
+    from core.configuration.configuration import uploads_root
+
+    # The user of the module fixture, who has a profile to author the dataset
+    login(test_client, "user@example.com", "test1234")
+    dest = tmp_path / "temp"
+    monkeypatch.setattr(User, "temp_folder", lambda self: str(dest))
+    first = tmp_path / "v1.zip"
+    first.write_bytes(_zip_with({"saved-main/a.poke": VALID_POKE, "saved-main/b.poke": VALID_POKE}))
+    archives = _StaticArchives(str(first))
+    monkeypatch.setattr("app.modules.dataset.routes.github_archives", archives)
+    payload = {"repo_url": "https://github.com/Owner/Saved", "branch": "main", "mode": "incremental"}
+    assert test_client.post("/dataset/github/import", json=payload).get_json()["saved"] == ["a.poke", "b.poke"]
+
+    # a.poke is saved in a dataset, which takes it out of the temp folder; then the temp folder goes away
+    form = {
+        "save_as_draft": "true",
+        "title": "Imported",
+        "desc": "d",
+        "tags": "imported",
+        "poke_models-0-poke_filename": "a.poke",
+        "poke_models-0-title": "a",
+        "poke_models-0-desc": "d",
+        "poke_models-0-publication_type": "NONE",
+    }
+    dataset_id = test_client.post("/dataset/upload", data=form).get_json()["dataset_id"]
+    shutil.rmtree(dest)
+    with test_client.application.app_context():
+        dataset = DataSet.query.get(dataset_id)
+        hubfile = dataset.poke_models[0].files[0]
+        assert (hubfile.source_repo, hubfile.source_branch, hubfile.source_path) == ("owner/saved", "main", "a.poke")
+        assert hubfile.source_crc32 == zlib.crc32(VALID_POKE.encode())
+        dataset_dir = os.path.join(uploads_root(), f"user_{dataset.user_id}", f"dataset_{dataset_id}")
+
+    try:
+        # The saved file is still known: unchanged; b.poke only ever was in the deleted temp folder
+        body = test_client.post("/dataset/github/import", json=payload).get_json()
+        assert body["unchanged"] == ["a.poke"]
+        assert body["added"] == ["b.poke"]
+
+        changed = tmp_path / "v2.zip"
+        changed.write_bytes(_zip_with({"saved-main/a.poke": VALID_POKE + "\n", "saved-main/b.poke": VALID_POKE}))
+        archives.path = str(changed)
+        body = test_client.post("/dataset/github/import", json=payload).get_json()
+        # The changed file is extracted anew, without touching the temp folder's unrelated files
+        assert body["modified"] == ["a.poke"]
+        assert body["unchanged"] == ["b.poke"]
+        assert (dest / "a.poke").read_text() == VALID_POKE + "\n"
+    finally:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        with test_client.application.app_context():
+            Hubfile.query.filter_by(source_repo="owner/saved").update({"source_repo": None})
+            db.session.commit()
+        logout(test_client)
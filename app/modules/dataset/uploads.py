@@ -0,0 +1,561 @@
+import codecs
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import NEED_DATA, Data, Epilogue, Field, File, MultipartDecoder
+
+from core.pokemon_check.check_poke import PokemonSetChecker
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+# Upload-time metadata of every file in a temp folder lives in this hidden subfolder, one JSON per file
+FILE_METADATA_DIR = ".meta"
+# Room for the multipart boundaries and part headers around the file itself
+UPLOAD_MULTIPART_OVERHEAD = 16 * 1024
+# Threads writing extracted archive members to disk, and how many members may wait in memory for them
+EXTRACT_WORKERS = int(os.getenv("ZIP_EXTRACT_WORKERS", "4"))
+EXTRACT_MAX_PENDING = int(os.getenv("ZIP_EXTRACT_MAX_PENDING", str(4 * EXTRACT_WORKERS)))
+
+
+class UploadRejected(Exception):
+    """Raised while an upload is still being received, so the client gets an answer before sending the rest."""
+
+    def __init__(self, message: str, status_code: int = 400, errors: list | None = None, sets: int | None = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.errors = errors or []
+        self.sets = sets
+
+    def to_dict(self) -> dict:
+        body = {"message": self.message}
+        if self.errors:
+            body["errors"] = self.errors
+        if self.sets is not None:
+            body["sets"] = self.sets
+        return body
+
+
+class FileDigest:
+    """Size, MD5, SHA-256 and line count of a file, accumulated chunk by chunk."""
+
+    def __init__(self):
+        self.size = 0
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+        self._newlines = 0
+        self._last_byte = b""
+
+    def update(self, chunk, newlines: int | None = None):
+        """`chunk` may be a memoryview, in which case the caller passes its newline count."""
+        if not chunk:
+            return
+        self.size += len(chunk)
+        self.md5.update(chunk)
+        self.sha256.update(chunk)
+        self._newlines += chunk.count(b"\n") if newlines is None else newlines
+        self._last_byte = bytes(chunk[-1:])
+
+    @property
+    def line_count(self) -> int:
+        # A last line without a trailing newline still counts
+        return self._newlines + (1 if self._last_byte and self._last_byte != b"\n" else 0)
+
+    def to_metadata(self) -> dict:
+        return {
+            "size": self.size,
+            "md5": self.md5.hexdigest(),
+            "sha256": self.sha256.hexdigest(),
+            "line_count": self.line_count,
+        }
+
+
+def digest_file(file_path: str) -> FileDigest:
+    """Hashes a file in fixed-size chunks through a reused buffer, without loading it in memory."""
+    digest = FileDigest()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read], newlines=buffer.count(b"\n", 0, read))
+    return digest
+
+
+def file_metadata_path(temp_folder: str, filename: str) -> str:
+    return os.path.join(temp_folder, FILE_METADATA_DIR, f"{filename}.json")
+
+
+def write_file_metadata(temp_folder: str, filename: str, metadata: dict):
+    """Records the metadata computed while a file was received, so dataset creation doesn't rehash it."""
+    stat = os.stat(os.path.join(temp_folder, filename))
+    record = dict(metadata, mtime_ns=stat.st_mtime_ns)
+    os.makedirs(os.path.join(temp_folder, FILE_METADATA_DIR), exist_ok=True)
+    with open(file_metadata_path(temp_folder, filename), "w", encoding="utf-8") as f:
+        json.dump(record, f)
+
+
+def read_file_metadata(temp_folder: str, filename: str) -> dict | None:
+    """Returns the upload-time record of a file, or None if it is missing or the file changed since."""
+    try:
+        with open(file_metadata_path(temp_folder, filename), "r", encoding="utf-8") as f:
+            record = json.load(f)
+        stat = os.stat(os.path.join(temp_folder, filename))
+    except (OSError, ValueError):
+        return None
+
+    if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return record
+
+
+def delete_file_metadata(temp_folder: str, filename: str):
+    path = file_metadata_path(temp_folder, filename)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class UniqueNameAllocator:
+    """
+    Hands out names that are free in `dest_dir`, adding " (1)", " (2)"... before the extension when a name
+    is taken. The folder is listed once and every name handed out is remembered, with a counter per name so
+    the next free suffix is found without probing the disk; a thousand "set.poke" members cost one listdir
+    instead of half a million stat calls.
+    """
+
+    def __init__(self, dest_dir: str):
+        self.dest_dir = dest_dir
+        try:
+            self._taken = set(os.listdir(dest_dir))
+        except FileNotFoundError:
+            self._taken = set()
+        self._next_suffix = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, filename: str) -> str:
+        with self._lock:
+            candidate = filename
+            if candidate in self._taken:
+                base, ext = os.path.splitext(filename)
+                i = self._next_suffix.get(filename, 1)
+                candidate = f"{base} ({i}){ext}"
+                while candidate in self._taken:
+                    i += 1
+                    candidate = f"{base} ({i}){ext}"
+                self._next_suffix[filename] = i + 1
+            self._taken.add(candidate)
+            return candidate
+
+    def open_new(self, name: str, filename: str):
+        """
+        Creates `name` (as allocated for `filename`) for writing. When something outside this allocator took
+        it since the folder was listed, another name is allocated. Returns the name and the open file.
+        """
+        while True:
+            try:
+                return name, open(os.path.join(self.dest_dir, name), "xb")
+            except FileExistsError:
+                name = self.allocate(filename)
+
+
+@contextmanager
+def replacing(path: str):
+    """
+    Opens a new version of `path` for writing and swaps it in once written. The old file is never written
+    through, which matters when it is a hard link to a stored blob.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def map_bounded(fn, items, workers: int | None = None, max_pending: int | None = None):
+    """
+    Yields fn(item) for every item, in order, running the calls on a thread pool. Items are consumed on
+    demand, at most `max_pending` ahead of the results, so large archives are never decompressed at once.
+    """
+    workers = EXTRACT_WORKERS if workers is None else workers
+    max_pending = max_pending or EXTRACT_MAX_PENDING
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for item in items:
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            pending.append(pool.submit(fn, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+class ImportSources:
+    """
+    Where the files already imported from one repository branch came from.
+
+    Every imported file's metadata record carries a "source" entry (repo, branch, path in the repository,
+    CRC-32 and MD5 checksum), which becomes the file's source columns once it is saved in a dataset. On a
+    re-import the archive's central directory is compared with the files in the temp folder and with the
+    user's stored files (`stored`, rows of HubfileRepository.find_imported), so members whose CRC and size
+    didn't change are skipped without being decompressed, changed ones replace the temp folder file they
+    were imported as and only new paths get a new file.
+    """
+
+    ADDED, MODIFIED, UNCHANGED = "added", "modified", "unchanged"
+
+    def __init__(self, temp_folder: str, repo: str, branch: str, stored=()):
+        self.repo = repo
+        self.branch = branch
+        # path in the repository -> (filename, CRC-32, size, whether the file is in the temp folder)
+        self._by_path = {}
+        for path, filename, crc32, size in stored:
+            self._by_path[path] = (filename, crc32, size, False)
+
+        drafts = {}
+        try:
+            entries = list(os.scandir(os.path.join(temp_folder, FILE_METADATA_DIR)))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            filename = entry.name[: -len(".json")]
+            # Files deleted or edited since they were imported no longer count as imported
+            record = read_file_metadata(temp_folder, filename)
+            source = (record or {}).get("source")
+            if source and source.get("repo") == repo and source.get("branch") == branch:
+                # After a full re-import the same path has several copies; the newest one is the import
+                current = drafts.get(source["path"])
+                if current is None or current[1].get("mtime_ns", 0) < record.get("mtime_ns", 0):
+                    drafts[source["path"]] = (filename, record)
+        # The temp folder holds what was imported after the stored files
+        for path, (filename, record) in drafts.items():
+            self._by_path[path] = (filename, record["source"].get("crc32"), record.get("size"), True)
+
+    def forget_previous(self):
+        """Treats every member as new (a full import) while still recording where the files come from."""
+        self._by_path = {}
+
+    @staticmethod
+    def path_of(member_name: str) -> str:
+        """Path of an archive member inside the repository: GitHub archives put everything in one root folder."""
+        norm = os.path.normpath(member_name).replace("\\", "/")
+        return norm.split("/", 1)[1] if "/" in norm else norm
+
+    def previous_filename(self, path: str) -> str | None:
+        previous = self._by_path.get(path)
+        return previous[0] if previous else None
+
+    def draft_filename(self, path: str) -> str | None:
+        """The temp folder file a member was imported as, which a changed member replaces."""
+        previous = self._by_path.get(path)
+        return previous[0] if previous and previous[3] else None
+
+    def status(self, path: str, crc32: int, size: int) -> str:
+        previous = self._by_path.get(path)
+        if previous is None:
+            return self.ADDED
+        if previous[1] == crc32 and previous[2] == size:
+            return self.UNCHANGED
+        return self.MODIFIED
+
+    def source_record(self, path: str, crc32: int, md5: str) -> dict:
+        return {"repo": self.repo, "branch": self.branch, "path": path, "crc32": crc32, "checksum": md5}
+
+
+class PokeUploadWriter:
+    """
+    Consumes the bytes of a .poke upload as they arrive: validates them line by line, hashes them and
+    writes them to a staging file in the same pass.
+    """
+
+    def __init__(self, temp_folder: str, max_size: int):
+        self.max_size = max_size
+        self.digest = FileDigest()
+        self.checker = PokemonSetChecker(keep_sets=True)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._pending_line = ""
+        fd, self.staging_path = tempfile.mkstemp(dir=temp_folder, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        if self.digest.size + len(chunk) > self.max_size:
+            raise UploadRejected(f"File exceeds the maximum size of {self.max_size} bytes", status_code=413)
+
+        self.digest.update(chunk)
+        self._file.write(chunk)
+
+        try:
+            text = self._decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise UploadRejected("Invalid .poke file format", errors=["El archivo no está codificado en UTF-8."])
+        self._feed(text)
+
+    def _feed(self, text: str):
+        lines = (self._pending_line + text).split("\n")
+        self._pending_line = lines.pop()
+        for line in lines:
+            self.checker.feed_line(line)
+
+        # A set is checked as soon as the next one starts, so broken team exports stop here
+        if self.checker.set_errors:
+            self._reject_invalid()
+
+    def _reject_invalid(self):
+        self.checker.finish()
+        raise UploadRejected(
+            "Invalid .poke file format",
+            errors=self.checker.get_errors(),
+            sets=self.checker.set_count,
+        )
+
+    def close(self):
+        """Validates whatever is left once the whole part has been received."""
+        self._file.close()
+        try:
+            text = self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise UploadRejected("Invalid .poke file format", errors=["El archivo no está codificado en UTF-8."])
+        self._feed(text)
+
+        if self._pending_line:
+            self.checker.feed_line(self._pending_line)
+            self._pending_line = ""
+        self.checker.finish()
+        if not self.checker.is_valid():
+            self._reject_invalid()
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.staging_path):
+            os.remove(self.staging_path)
+
+
+def receive_poke_upload(stream, content_type: str, temp_folder: str, max_size: int, field_name: str = "file"):
+    """
+    Reads a multipart request body chunk by chunk and stores its .poke file in `temp_folder`.
+
+    Returns the staging path, the original filename, the set count and the file metadata (size, MD5, SHA-256,
+    line count), or raises UploadRejected
+    as soon as the file is known to be too big or invalid, without reading the rest of the body.
+    """
+    mimetype, options = parse_options_header(content_type or "")
+    boundary = options.get("boundary")
+    if mimetype != "multipart/form-data" or not boundary:
+        raise UploadRejected("No valid file")
+
+    decoder = MultipartDecoder(boundary.encode("latin-1"))
+    writer = None
+    filename = None
+    in_file_part = False
+    done = False
+
+    try:
+        while not done:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+
+            event = decoder.next_event()
+            while event is not NEED_DATA:
+                if isinstance(event, File) and event.name == field_name and writer is None:
+                    if not event.filename.endswith(".poke"):
+                        raise UploadRejected("No valid file")
+                    filename = os.path.basename(event.filename)
+                    writer = PokeUploadWriter(temp_folder, max_size)
+                    in_file_part = True
+                elif isinstance(event, (File, Field)):
+                    in_file_part = False
+                elif isinstance(event, Data) and in_file_part:
+                    writer.write(event.data)
+                    if not event.more_data:
+                        writer.close()
+                        in_file_part = False
+                elif isinstance(event, Epilogue):
+                    done = True
+                    break
+                event = decoder.next_event()
+
+            if not chunk:
+                break
+    except UploadRejected:
+        if writer is not None:
+            writer.discard()
+        raise
+    except ValueError as exc:
+        # Malformed multipart body
+        if writer is not None:
+            writer.discard()
+        raise UploadRejected(f"Error reading or validating file: {exc}")
+
+    if writer is None or in_file_part:
+        if writer is not None:
+            writer.discard()
+        raise UploadRejected("No valid file")
+
+    return {
+        "staging_path": writer.staging_path,
+        "filename": filename,
+        "sets": writer.checker.set_count,
+        "metadata": {**writer.digest.to_metadata(), "sets": writer.checker.sets},
+    }
+
+
+class ResumableUpload:
+    """
+    Staging area of a chunked upload, in the spirit of the tus protocol: the client declares the total length,
+    appends chunks at the offset the server reports and finalizes once every byte has arrived. A dropped
+    connection only loses the chunk in flight; the client asks for the offset and carries on from there.
+
+    All the state lives on disk (<user's resumable uploads folder>/<id>/, outside the temp folder that
+    publishing a dataset deletes), so any worker can take the next chunk: the bytes received are the offset,
+    and the checksums are computed once, from the staged file, at finalize. A lock file serializes the offset
+    check and the append, so two PATCHes at the same offset can't both write. Uploads nobody has appended to
+    for a while are removed by `expire_stale`.
+    """
+
+    _ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+    def __init__(self, uploads_dir: str, upload_id: str):
+        if not self._ID_PATTERN.fullmatch(upload_id or ""):
+            raise UploadRejected("Unknown upload", status_code=404)
+        self.upload_id = upload_id
+        self.folder = os.path.join(uploads_dir, upload_id)
+        self.data_path = os.path.join(self.folder, "data.part")
+        self._state_path = os.path.join(self.folder, "state.json")
+        self._lock_path = os.path.join(self.folder, "lock")
+
+    @classmethod
+    def create(cls, uploads_dir: str, filename: str, length: int, max_size: int) -> "ResumableUpload":
+        if length < 0:
+            raise UploadRejected("Invalid upload length")
+        if length > max_size:
+            raise UploadRejected(f"File exceeds the maximum size of {max_size} bytes", status_code=413)
+
+        upload = cls(uploads_dir, uuid.uuid4().hex)
+        os.makedirs(upload.folder)
+        open(upload.data_path, "wb").close()
+        with open(upload._state_path, "w", encoding="utf-8") as f:
+            json.dump({"filename": os.path.basename(filename), "length": length}, f)
+        return upload
+
+    @classmethod
+    def expire_stale(cls, uploads_dir: str, max_age: int) -> list:
+        """Removes the uploads in `uploads_dir` that received no bytes in `max_age` seconds; returns their ids."""
+        try:
+            entries = list(os.scandir(uploads_dir))
+        except OSError:
+            return []
+
+        now = time.time()
+        expired = []
+        for entry in entries:
+            if not entry.is_dir() or not cls._ID_PATTERN.fullmatch(entry.name):
+                continue
+            upload = cls(uploads_dir, entry.name)
+            try:
+                # Every append touches the data file; an upload without one is left from an interrupted create
+                last_activity = os.path.getmtime(upload.data_path)
+            except OSError:
+                last_activity = entry.stat().st_mtime
+            if now - last_activity > max_age:
+                upload.discard()
+                expired.append(upload.upload_id)
+        return expired
+
+    def exists(self) -> bool:
+        return os.path.exists(self._state_path) and os.path.exists(self.data_path)
+
+    @property
+    def state(self) -> dict:
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadRejected("Unknown upload", status_code=404)
+
+    @property
+    def length(self) -> int:
+        return self.state["length"]
+
+    @property
+    def filename(self) -> str:
+        return self.state["filename"]
+
+    @property
+    def offset(self) -> int:
+        try:
+            return os.path.getsize(self.data_path)
+        except OSError:
+            raise UploadRejected("Unknown upload", status_code=404)
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock on this upload, across the threads and processes of every worker on the host."""
+        try:
+            lock_file = open(self._lock_path, "a")
+        except OSError:
+            raise UploadRejected("Unknown upload", status_code=404)
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, stream, offset: int) -> int:
+        """
+        Appends the body of a PATCH request at `offset`, which must be the current one. Whatever arrives
+        is kept even if the connection drops mid-chunk. Returns the new offset.
+        """
+        length = self.length
+        with self._locked():
+            current = self.offset
+            if offset != current:
+                raise UploadRejected(f"Offset mismatch: the upload is at {current}", status_code=409)
+
+            with open(self.data_path, "ab") as f:
+                while True:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if current + len(chunk) > length:
+                        raise UploadRejected(f"Chunk goes past the declared length of {length} bytes", status_code=413)
+                    f.write(chunk)
+                    current += len(chunk)
+        return current
+
+    def finalize(self, expected_md5: str | None = None) -> dict:
+        """Checks that the upload is complete (and matches the client's MD5) and returns its metadata."""
+        with self._locked():
+            if self.offset != self.length:
+                raise UploadRejected(
+                    f"Upload incomplete: {self.offset} of {self.length} bytes received", status_code=409
+                )
+            metadata = digest_file(self.data_path).to_metadata()
+        if expected_md5 and expected_md5.lower() != metadata["md5"]:
+            raise UploadRejected("Checksum mismatch: the upload does not match the file sent", status_code=409)
+        return metadata
+
+    def discard(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
@@ -41,7 +41,8 @@ class ElasticsearchService(BaseService):
                             "created_at": {"type": "date"},
                             "pokemons": {"type": "search_as_you_type"},
                             "abilities": {"type": "search_as_you_type"},
-                            "moves": {"type": "text"},
+                            # The keyword subfield allows exact move filters (moves.keyword) next to full-text search
+                            "moves": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
                             "max_ev_count": {"type": "integer"},
                             "max_iv_count": {"type": "integer"},
                             "doi": {"type": "keyword"},
@@ -1,11 +1,11 @@
 import re
-from collections import defaultdict
 
 import unidecode
 from sqlalchemy import func, or_
 from sqlalchemy.orm import aliased
 
-from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType, Tag
+from app.modules.dataset.repositories import TagRepository
 from app.modules.pokemodel.models import FMMetaData, PokeModel
 from core.repositories.BaseRepository import BaseRepository
 
@@ -30,17 +30,14 @@ class ExploreRepository(BaseRepository):
         return [{"id": r.id, "name": r.name, "count": int(r.count)} for r in results]
 
     def get_all_tags(self):
-        # Obtenemos las tags en un diccionario con su count
-        tags_dict = defaultdict(int)
-        metadata_datasets = DSMetaData.query.all()
-
-        for metadata in metadata_datasets:
-            for tag in metadata.get_all_tags():
-                tags_dict[tag] += 1
-
-        # Lo devolvemos como JSON, ordenado por count desc
-        sorted_tags = sorted(tags_dict.items(), key=lambda kv: kv[1], reverse=True)
-        return [{"name": tag, "count": int(count)} for tag, count in sorted_tags]
+        # Cuántos datasets llevan cada tag ya está guardado en la tabla tag, ordenado por count desc
+        results = (
+            Tag.query.with_entities(Tag.name, Tag.dataset_count)
+            .filter(Tag.dataset_count > 0)
+            .order_by(Tag.dataset_count.desc(), Tag.name)
+            .all()
+        )
+        return [{"name": r.name, "count": int(r.dataset_count)} for r in results]
 
     def filter(
         self, query="", sorting="newest", publication_type="any", authors_filter="any", tags_filter="any", **kwargs
@@ -83,8 +80,7 @@ class ExploreRepository(BaseRepository):
         if tags_filter not in ("any", None, ""):
             tag_name = tags_filter.strip()
             if tag_name:
-                like_tag = f"%{tag_name}%"
-                datasets = datasets.filter(or_(DSMetaData.tags.ilike(like_tag), FMMetaData.tags.ilike(like_tag)))
+                datasets = datasets.filter(DataSet.id.in_(TagRepository().dataset_ids_with(tag_name)))
 
         if sorting == "oldest":
             datasets = datasets.order_by(self.model.created_at.asc())
@@ -95,3 +91,33 @@ class ExploreRepository(BaseRepository):
 
     def get_all_datasets(self):
         return self.filter()
+
+    def get_published_dataset_ids(self) -> set:
+        rows = (
+            self.model.query.join(DataSet.ds_meta_data)
+            .filter(DSMetaData.dataset_doi.isnot(None))
+            .with_entities(DataSet.id)
+            .all()
+        )
+        return {row.id for row in rows}
+
+    def get_poke_model_summaries(self, poke_model_ids: list) -> list:
+        """Id, file and dataset of each model, in the order of `poke_model_ids`."""
+        if not poke_model_ids:
+            return []
+        rows = (
+            PokeModel.query.join(PokeModel.fm_meta_data)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .join(DataSet.ds_meta_data)
+            .filter(PokeModel.id.in_(poke_model_ids))
+            .with_entities(
+                PokeModel.id.label("poke_model_id"),
+                PokeModel.data_set_id.label("dataset_id"),
+                FMMetaData.poke_filename.label("filename"),
+                DSMetaData.title.label("dataset_title"),
+                DSMetaData.dataset_doi.label("dataset_doi"),
+            )
+            .all()
+        )
+        by_id = {row.poke_model_id: row._asdict() for row in rows}
+        return [by_id[poke_model_id] for poke_model_id in poke_model_ids if poke_model_id in by_id]
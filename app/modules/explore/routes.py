@@ -5,6 +5,7 @@ from flask import jsonify, render_template, request
 from app.modules.elasticsearch.services import ElasticsearchService
 from app.modules.explore import explore_bp
 from app.modules.explore.services import ExploreService
+from app.modules.pokemodel.inverted_index import FIELDS
 
 
 @explore_bp.route("/explore", methods=["GET", "POST"])
@@ -40,3 +41,41 @@ def index():
 
         hits = [hit["_source"] for hit in es_results["hits"]["hits"]]
         return jsonify(hits)
+
+
+@explore_bp.route("/explore/sets", methods=["GET"])
+def search_sets():
+    """
+    Exact-match search that doesn't need Elasticsearch. Every field parameter (species, move, ability, item,
+    tera_type) may be repeated and takes "|"-separated alternatives: ?move=Trick Room&item=Leftovers|Life Orb
+    """
+    clauses = []
+    for field in FIELDS:
+        for value in request.args.getlist(field):
+            alternatives = [alternative for alternative in value.split("|") if alternative.strip()]
+            if alternatives:
+                clauses.append((field, alternatives))
+    if not clauses:
+        return jsonify({"error": f"Give at least one of: {', '.join(FIELDS)}"}), 400
+
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), 100)
+    try:
+        result = ExploreService().search_sets(
+            clauses,
+            match=request.args.get("match", "all"),
+            published_only=request.args.get("published", "true").lower() != "false",
+            page=page,
+            per_page=per_page,
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(result)
+
+
+@explore_bp.route("/explore/sets/terms/<field>", methods=["GET"])
+def set_terms(field):
+    if field not in FIELDS:
+        return jsonify({"error": f"Unknown field: {field}"}), 404
+    limit = min(request.args.get("limit", 50, type=int), 500)
+    return jsonify(ExploreService().get_set_terms(field, prefix=request.args.get("prefix", ""), limit=limit))
@@ -1,4 +1,5 @@
 from app.modules.explore.repositories import ExploreRepository
+from app.modules.pokemodel.inverted_index import poke_index
 from core.services.BaseService import BaseService
 
 
@@ -19,3 +20,26 @@ class ExploreService(BaseService):
 
     def get_all_datasets(self):
         return self.repository.get_all_datasets()
+
+    def search_sets(self, clauses, match="all", published_only=True, page=1, per_page=20):
+        """
+        Exact species/move/ability/item/tera type search over the in-process inverted index, so it keeps
+        working when Elasticsearch is down. See PokeInvertedIndex.search() for the clause format.
+        """
+        poke_index.ensure_fresh()
+        model_ids = poke_index.search(clauses, match=match)
+        if published_only:
+            published = self.repository.get_published_dataset_ids()
+            model_ids = [model_id for model_id in model_ids if poke_index.dataset_of(model_id) in published]
+
+        start = (page - 1) * per_page
+        return {
+            "total": len(model_ids),
+            "page": page,
+            "per_page": per_page,
+            "results": self.repository.get_poke_model_summaries(model_ids[start : start + per_page]),
+        }
+
+    def get_set_terms(self, field, prefix="", limit=50):
+        poke_index.ensure_fresh()
+        return poke_index.terms(field, prefix=prefix, limit=limit)
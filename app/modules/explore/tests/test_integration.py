@@ -114,3 +114,22 @@ def test_post_explore_filter(test_client, post_data, expected_status, expected_l
 
     if expected_title:
         assert response_data[0]["title"] == expected_title
+
+
+def test_search_sets_works_without_elasticsearch(test_client, tmp_path, monkeypatch):
+    from app.modules.pokemodel.inverted_index import poke_index
+
+    monkeypatch.setattr(poke_index, "path", str(tmp_path / "poke_index.npz"))
+    poke_index.loaded = False
+
+    response = test_client.get("/explore/sets?species=Pikachu|Garchomp&published=false")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body) == {"total", "page", "per_page", "results"}
+    assert len(body["results"]) <= body["per_page"]
+    assert (tmp_path / "poke_index.npz").exists()
+
+    assert test_client.get("/explore/sets").status_code == 400
+    assert test_client.get("/explore/sets?move=Protect&match=some").status_code == 400
+    assert test_client.get("/explore/sets/terms/move").status_code == 200
+    assert test_client.get("/explore/sets/terms/nature").status_code == 404
@@ -0,0 +1,104 @@
+import filecmp
+import os
+import shutil
+
+from core.configuration.configuration import uploads_root
+
+DEFAULT_BLOBS_DIR = os.path.join(uploads_root(), "blobs")
+
+
+class BlobStore:
+    """
+    Content-addressed copy of every uploaded file, one blob per checksum.
+
+    Dataset folders keep their usual uploads/user_<id>/dataset_<id>/<name> layout, but the files in them are
+    hard links to the blob, so the same content uploaded or added from the cart many times is stored once and
+    a new link costs the same whatever the file size. How many Hubfile rows use a blob is tracked in the
+    file_blob table (HubfileBlobRepository); the blob is deleted when that count drops to zero.
+
+    The checksum is an MD5, so a file is only linked to an existing blob after checking that their bytes match;
+    a colliding file keeps its own copy instead of being replaced by someone else's content.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, checksum: str) -> str:
+        return os.path.join(self.root, checksum[:2], checksum[2:4], checksum)
+
+    def exists(self, checksum: str) -> bool:
+        return os.path.exists(self.path(checksum))
+
+    def matches(self, checksum: str, file_path: str) -> bool:
+        """Whether `file_path` has the bytes of the stored blob. Files already linked to it are not read."""
+        blob_path = self.path(checksum)
+        if not os.path.exists(blob_path):
+            return False
+        if os.path.samefile(blob_path, file_path):
+            return True
+        return filecmp.cmp(blob_path, file_path, shallow=False)
+
+    @staticmethod
+    def _link(source: str, dest: str):
+        """Hard link when possible; a plain copy when the filesystem doesn't allow it (e.g. another device)."""
+        tmp_dest = f"{dest}.{os.getpid()}.tmp"
+        try:
+            os.link(source, tmp_dest)
+        except OSError:
+            shutil.copy2(source, tmp_dest)
+        os.replace(tmp_dest, dest)
+
+    def ingest(self, checksum: str, file_path: str) -> str:
+        """Makes `file_path` the content of its blob, unless the blob is already stored."""
+        blob_path = self.path(checksum)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            self._link(file_path, blob_path)
+        return blob_path
+
+    def share(self, checksum: str, file_path: str) -> bool:
+        """
+        Stores `file_path` as its blob, or replaces it with a link to the blob already stored with the same
+        bytes. Returns False when the blob holds other bytes under that checksum; the file is then left alone.
+        """
+        if not self.exists(checksum):
+            self.ingest(checksum, file_path)
+            return True
+        if not self.matches(checksum, file_path):
+            return False
+        self._link(self.path(checksum), file_path)
+        return True
+
+    def materialize(self, checksum: str, dest_path: str, source_path: str | None = None) -> bool:
+        """
+        Puts the content of a blob at `dest_path`. Files stored before the blob store existed are taken from
+        `source_path` (and ingested on the way), and so are files whose bytes differ from the blob stored under
+        their checksum. Returns False when the content is nowhere to be found.
+        """
+        has_source = bool(source_path) and os.path.exists(source_path)
+        if not self.exists(checksum):
+            if not has_source:
+                return False
+            self.ingest(checksum, source_path)
+
+        content_path = self.path(checksum)
+        if has_source and not self.matches(checksum, source_path):
+            content_path = source_path
+
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+        self._link(content_path, dest_path)
+        return True
+
+    def delete(self, checksum: str):
+        blob_path = self.path(checksum)
+        if os.path.exists(blob_path):
+            os.remove(blob_path)
+
+    def iter_checksums(self):
+        for _, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".tmp"):
+                    yield filename
+
+
+blob_store = BlobStore(os.getenv("BLOBS_DIR", DEFAULT_BLOBS_DIR))
@@ -11,11 +11,37 @@ class Hubfile(db.Model):
     __tablename__ = "file"
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
-    checksum = db.Column(db.String(120), nullable=False)
+    checksum = db.Column(db.String(120), nullable=False, index=True)
     size = db.Column(db.Integer, nullable=False)
     poke_model_id = db.Column(db.Integer, db.ForeignKey("poke_model.id"), nullable=False)
+    # Location relative to the uploads folder, written with the row so resolving it needs no joins
+    storage_path = db.Column(db.String(255), nullable=True, index=True)
+    # Where an imported file came from (repository, branch, path in it and CRC-32 of the content), so a later
+    # import of the same repository only extracts what changed since, even once the draft has been published
+    source_repo = db.Column(db.String(255), nullable=True)
+    source_branch = db.Column(db.String(255), nullable=True)
+    source_path = db.Column(db.String(1024), nullable=True)
+    source_crc32 = db.Column(db.BigInteger, nullable=True)
     items = db.relationship("ShoppingCartItem", backref="file", lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (db.Index("ix_file_source", "source_repo", "source_branch"),)
+
+    @staticmethod
+    def storage_path_for(user_id: int, dataset_id: int, name: str) -> str:
+        return f"user_{user_id}/dataset_{dataset_id}/{name}"
+
+    @staticmethod
+    def source_columns(source: dict | None) -> dict:
+        """Column values for the "source" entry of a file's upload-time record (none for files not imported)."""
+        if not source:
+            return {}
+        return {
+            "source_repo": source["repo"],
+            "source_branch": source["branch"],
+            "source_path": source["path"],
+            "source_crc32": source["crc32"],
+        }
+
     def get_formatted_size(self):
         from app.modules.dataset.services import SizeService
 
@@ -50,6 +76,18 @@ class Hubfile(db.Model):
         return f"File<{self.id}>"
 
 
+class HubfileBlob(db.Model):
+    """Reference count of a stored blob: how many Hubfile rows have its checksum."""
+
+    __tablename__ = "file_blob"
+    checksum = db.Column(db.String(120), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"FileBlob<{self.checksum}, refs={self.ref_count}>"
+
+
 class HubfileViewRecord(db.Model):
     __tablename__ = "file_view_record"
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,110 @@
+import mmap
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from core.cache.lru_cache import LRUCache
+
+DEFAULT_PREVIEW_LINES = 500
+MAX_PREVIEW_LINES = 5000
+DEFAULT_PREVIEW_BYTES = 64 * 1024
+MAX_PREVIEW_BYTES = 1024 * 1024
+INDEX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Line-offset index per file checksum. The same content always has the same index, so entries never go stale
+line_index_cache = LRUCache(maxsize=int(os.getenv("LINE_INDEX_CACHE_SIZE", "256")))
+
+
+@contextmanager
+def _mapped(path: str):
+    """The file mapped read-only; empty files (which can't be mapped) come out as b""."""
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def build_line_index(path: str) -> np.ndarray:
+    """
+    Byte offset where every line starts, followed by the file size, so line i is offsets[i]:offsets[i + 1] and
+    there are len(offsets) - 1 lines. The file is scanned in chunks, so memory stays bounded whatever its size.
+    """
+    with _mapped(path) as mm:
+        size = len(mm)
+        starts = [np.zeros(1, dtype=np.int64)]
+        if size:
+            view = memoryview(mm)
+            try:
+                for position in range(0, size, INDEX_CHUNK_SIZE):
+                    chunk = np.frombuffer(view[position : position + INDEX_CHUNK_SIZE], dtype=np.uint8)
+                    starts.append(np.flatnonzero(chunk == ord("\n")).astype(np.int64) + position + 1)
+                    del chunk
+            finally:
+                view.release()
+
+    # A trailing newline doesn't start another line
+    if starts[-1][-1:].tolist() == [size]:
+        starts[-1] = starts[-1][:-1]
+    starts.append(np.array([size], dtype=np.int64))
+    return np.concatenate(starts)
+
+
+def line_index(path: str, checksum: str) -> np.ndarray:
+    return line_index_cache.get_or_load(checksum, lambda: build_line_index(path))
+
+
+def _window(path: str, start: int, end: int) -> str:
+    with _mapped(path) as mm:
+        return mm[start:end].decode("utf-8", errors="replace")
+
+
+def read_lines(path: str, checksum: str, line: int = 0, limit: int = DEFAULT_PREVIEW_LINES) -> dict:
+    """Lines [line, line + limit) of the file, with what the viewer needs to ask for the next ones."""
+    offsets = line_index(path, checksum)
+    total_lines = len(offsets) - 1
+    start = min(line, total_lines)
+    end = min(start + limit, total_lines)
+    more = end < total_lines
+    return {
+        "content": _window(path, int(offsets[start]), int(offsets[end])),
+        "size": int(offsets[-1]),
+        "total_lines": total_lines,
+        "line": start,
+        "next_line": end if more else None,
+        "next_offset": int(offsets[end]) if more else None,
+    }
+
+
+def read_bytes(path: str, checksum: str, offset: int = 0, length: int = DEFAULT_PREVIEW_BYTES) -> dict:
+    """
+    Bytes [offset, offset + length) of the file. Both ends are moved back to the start of a UTF-8 character, so
+    paging through with next_offset never splits one.
+    """
+    offsets = line_index(path, checksum)
+    size = int(offsets[-1])
+    with _mapped(path) as mm:
+        start = min(offset, size)
+        end = min(start + length, size)
+        while 0 < start < size and mm[start] & 0xC0 == 0x80:
+            start -= 1
+        while start < end < size and mm[end] & 0xC0 == 0x80:
+            end -= 1
+        if end == start < size and length > 0:
+            # The window is narrower than the character it starts in: return that whole character
+            end += 1
+            while end < size and mm[end] & 0xC0 == 0x80:
+                end += 1
+        content = mm[start:end].decode("utf-8", errors="replace")
+    more = end < size
+    return {
+        "content": content,
+        "size": size,
+        "total_lines": len(offsets) - 1,
+        "offset": start,
+        "next_offset": end if more else None,
+        # Line the window starts in (it may begin halfway through it)
+        "line": int(np.searchsorted(offsets, start, side="right")) - 1 if size else 0,
+    }
@@ -1,10 +1,13 @@
-from sqlalchemy import func
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, or_, update
 
 from app import db
 from app.modules.auth.models import User
-from app.modules.dataset.models import DataSet
-from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileViewRecord
+from app.modules.dataset.models import DataSet, DSMetaData
+from app.modules.hubfile.models import Hubfile, HubfileBlob, HubfileDownloadRecord, HubfileViewRecord
 from app.modules.pokemodel.models import PokeModel
+from app.modules.public.repositories import SiteCountersRepository
 from core.repositories.BaseRepository import BaseRepository
 
 
@@ -20,20 +23,171 @@ class HubfileRepository(BaseRepository):
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
         return db.session.query(DataSet).join(PokeModel).join(Hubfile).filter(Hubfile.id == hubfile.id).first()
 
+    def get_with_dataset_or_404(self, file_id: int) -> tuple:
+        """(Hubfile, dataset id, owner user id, dataset DOI) of a file in one query, for serving it."""
+        return (
+            db.session.query(Hubfile, DataSet.id, DataSet.user_id, DSMetaData.dataset_doi)
+            .join(PokeModel, PokeModel.id == Hubfile.poke_model_id)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .join(DSMetaData, DSMetaData.id == DataSet.ds_meta_data_id)
+            .filter(Hubfile.id == file_id)
+            .first_or_404()
+        )
+
+    def is_published(self, hubfile: Hubfile) -> bool:
+        doi = (
+            db.session.query(DSMetaData.dataset_doi)
+            .join(DataSet, DataSet.ds_meta_data_id == DSMetaData.id)
+            .join(PokeModel, PokeModel.data_set_id == DataSet.id)
+            .filter(PokeModel.id == hubfile.poke_model_id)
+            .scalar()
+        )
+        return bool(doi)
+
+    def find_reusable(self, checksums, user_id: int | None) -> dict:
+        """
+        Checksum -> (name, owner user id, dataset id) of one stored file per checksum in `checksums`, among the
+        files a user may reuse: those of published datasets and their own. Drafts of other users are never
+        revealed, so the lookup can't be used to tell whether someone else uploaded a file.
+        """
+        checksums = list(set(checksums))
+        if not checksums:
+            return {}
+        visible = DSMetaData.dataset_doi.isnot(None)
+        if user_id is not None:
+            visible = or_(visible, DataSet.user_id == user_id)
+        rows = (
+            db.session.query(Hubfile.checksum, Hubfile.name, DataSet.user_id, DataSet.id)
+            .join(PokeModel, PokeModel.id == Hubfile.poke_model_id)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .join(DSMetaData, DSMetaData.id == DataSet.ds_meta_data_id)
+            .filter(Hubfile.checksum.in_(checksums), visible)
+            .order_by(Hubfile.id)
+        )
+        found = {}
+        for checksum, name, owner_id, dataset_id in rows:
+            found.setdefault(checksum, (name, owner_id, dataset_id))
+        return found
+
+    def find_imported(self, user_id: int, repo: str, branch: str) -> list:
+        """(path in the repository, name, CRC-32, size) of the user's files imported from a branch, oldest first."""
+        return (
+            db.session.query(Hubfile.source_path, Hubfile.name, Hubfile.source_crc32, Hubfile.size)
+            .join(PokeModel, PokeModel.id == Hubfile.poke_model_id)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .filter(DataSet.user_id == user_id, Hubfile.source_repo == repo, Hubfile.source_branch == branch)
+            .order_by(Hubfile.id)
+            .all()
+        )
+
+    def iter_with_locations(self, batch_size: int = 1000):
+        """(file id, checksum, name, owner user id, dataset id) of every file, without loading the models."""
+        return (
+            db.session.query(Hubfile.id, Hubfile.checksum, Hubfile.name, DataSet.user_id, DataSet.id)
+            .join(PokeModel, PokeModel.id == Hubfile.poke_model_id)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .order_by(Hubfile.id)
+            .yield_per(batch_size)
+        )
+
+    def iter_storage_paths(self, batch_size: int = 1000):
+        """(file id, stored path, name, owner user id, dataset id) of every file, to check the stored paths."""
+        return (
+            db.session.query(Hubfile.id, Hubfile.storage_path, Hubfile.name, DataSet.user_id, DataSet.id)
+            .join(PokeModel, PokeModel.id == Hubfile.poke_model_id)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .order_by(Hubfile.id)
+            .yield_per(batch_size)
+        )
+
+    def set_storage_paths(self, paths: dict):
+        """Writes file id -> storage path in one bulk update; committed by the caller."""
+        if paths:
+            db.session.execute(
+                update(Hubfile), [{"id": file_id, "storage_path": path} for file_id, path in paths.items()]
+            )
+
+
+class HubfileBlobRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(HubfileBlob)
+
+    def acquire(self, checksum: str, size: int) -> HubfileBlob:
+        """Counts one more Hubfile using the blob. Committed together with that Hubfile by the caller."""
+        blob = self.session.get(HubfileBlob, checksum)
+        if blob is None:
+            blob = HubfileBlob(checksum=checksum, size=size, ref_count=0)
+            self.session.add(blob)
+        blob.ref_count += 1
+        self.session.flush()
+        return blob
+
+    def release(self, checksum: str) -> int:
+        """Counts one Hubfile less and returns how many are left; the row goes away with the last one."""
+        blob = self.session.get(HubfileBlob, checksum)
+        if blob is None:
+            return 0
+        blob.ref_count -= 1
+        remaining = blob.ref_count
+        if remaining <= 0:
+            self.session.delete(blob)
+        self.session.flush()
+        return max(remaining, 0)
+
+    def reference_counts(self) -> dict:
+        """Checksum -> number of Hubfile rows, as stored in the file table."""
+        rows = self.session.query(Hubfile.checksum, func.count(Hubfile.id), func.max(Hubfile.size)).group_by(
+            Hubfile.checksum
+        )
+        return {checksum: (count, size) for checksum, count, size in rows}
+
 
 class HubfileViewRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(HubfileViewRecord)
 
+    def create(self, commit: bool = True, **kwargs) -> HubfileViewRecord:
+        SiteCountersRepository().add(poke_model_views=1)
+        return super().create(commit=commit, **kwargs)
+
     def total_hubfile_views(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
-        return max_id if max_id is not None else 0
+        return self.count()
 
 
 class HubfileDownloadRecordRepository(BaseRepository):
     def __init__(self):
         super().__init__(HubfileDownloadRecord)
 
+    def create(self, commit: bool = True, **kwargs) -> HubfileDownloadRecord:
+        SiteCountersRepository().add(poke_model_downloads=1)
+        return super().create(commit=commit, **kwargs)
+
     def total_hubfile_downloads(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
-        return max_id if max_id is not None else 0
+        return self.count()
+
+    def record_many(self, file_ids, user_id: int | None, download_cookie: str) -> int:
+        """
+        Records a download of each file in one INSERT, skipping the files this cookie already downloaded.
+        Returns how many records were added.
+        """
+        file_ids = set(file_ids)
+        if not file_ids:
+            return 0
+        already_recorded = {
+            file_id
+            for (file_id,) in self.session.query(self.model.file_id).filter(
+                self.model.user_id == user_id,
+                self.model.download_cookie == download_cookie,
+                self.model.file_id.in_(file_ids),
+            )
+        }
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"user_id": user_id, "file_id": file_id, "download_date": now, "download_cookie": download_cookie}
+            for file_id in sorted(file_ids - already_recorded)
+        ]
+        if rows:
+            self.session.execute(insert(self.model), rows)
+            SiteCountersRepository().add(poke_model_downloads=len(rows))
+            self.session.commit()
+        return len(rows)
@@ -2,23 +2,54 @@ import os
 import uuid
 from datetime import datetime, timezone
 
-from flask import current_app, jsonify, make_response, request, send_from_directory
+from flask import jsonify, make_response, request
 from flask_login import current_user
 
-from app import db
 from app.modules.hubfile import hubfile_bp
 from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
-from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from app.modules.hubfile.previews import (
+    DEFAULT_PREVIEW_BYTES,
+    DEFAULT_PREVIEW_LINES,
+    MAX_PREVIEW_BYTES,
+    MAX_PREVIEW_LINES,
+    read_bytes,
+    read_lines,
+)
+from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService, HubfileViewRecordService
+from core.helpers.file_delivery import (
+    REVALIDATE_PRIVATE,
+    REVALIDATE_PUBLIC,
+    deliver_file,
+    is_first_request_of_download,
+    is_not_modified,
+    last_modified_of,
+    not_modified_response,
+)
+
+
+def _cache_control_for(dataset_doi) -> str:
+    """Files of published datasets may be kept by shared caches; drafts only by the browser."""
+    return REVALIDATE_PUBLIC if dataset_doi else REVALIDATE_PRIVATE
+
+
+def _file_with_path(file_id: int) -> tuple:
+    """(Hubfile, dataset id, dataset DOI, path on disk), with the dataset loaded in the same query as the file."""
+    hubfile_service = HubfileService()
+    file, dataset_id, owner_id, dataset_doi = hubfile_service.get_with_dataset_or_404(file_id)
+    return file, dataset_id, dataset_doi, hubfile_service.get_path_by_hubfile(file, owner_id, dataset_id)
 
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
 def download_file(file_id):
-    file = HubfileService().get_or_404(file_id)
+    file, dataset_id, dataset_doi, file_path = _file_with_path(file_id)
     filename = file.name
 
-    directory_path = f"uploads/user_{file.poke_model.data_set.user_id}/dataset_{file.poke_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path)
+    # The checksum identifies the content, so a client that already has it gets a 304 (not counted). The file is
+    # also sent with its mtime as Last-Modified, so clients revalidating with If-Modified-Since get the same.
+    cache_control = _cache_control_for(dataset_doi)
+    last_modified = last_modified_of(file_path)
+    if is_not_modified(file.checksum, last_modified):
+        return not_modified_response(file.checksum, cache_control)
 
     # Get the cookie from the request or generate a new one if it does not exist
     user_cookie = request.cookies.get("file_download_cookie")
@@ -40,52 +71,84 @@ def download_file(file_id):
         )
 
     # Save the cookie to the user's browser
-    resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
+    resp = deliver_file(file_path, download_name=filename, etag=file.checksum, cache_control=cache_control)
     resp.set_cookie("file_download_cookie", user_cookie)
 
-    HubfileService().increment_download_count(file)
+    if is_first_request_of_download(file.checksum, last_modified):
+        HubfileService().increment_download_count(file, dataset_id)
 
     return resp
 
 
+def _preview_window():
+    """
+    (mode, start, size) asked for in the query string: `line` and `limit` page by lines (the default), `offset`
+    and `length` by bytes. Returns None when a value is invalid.
+    """
+    by_bytes = "offset" in request.args or "length" in request.args
+    if by_bytes:
+        start = request.args.get("offset", 0, type=int)
+        size = request.args.get("length", DEFAULT_PREVIEW_BYTES, type=int)
+        maximum = MAX_PREVIEW_BYTES
+    else:
+        start = request.args.get("line", 0, type=int)
+        size = request.args.get("limit", DEFAULT_PREVIEW_LINES, type=int)
+        maximum = MAX_PREVIEW_LINES
+    if start is None or size is None or start < 0 or size < 1:
+        return None
+    return ("bytes" if by_bytes else "lines"), start, min(size, maximum)
+
+
 @hubfile_bp.route("/file/view/<int:file_id>", methods=["GET"])
 def view_file(file_id):
-    file = HubfileService().get_or_404(file_id)
-    filename = file.name
+    file, _dataset_id, dataset_doi, file_path = _file_with_path(file_id)
+
+    window = _preview_window()
+    if window is None:
+        return jsonify({"success": False, "error": "Invalid preview window"}), 400
+    mode, start, size = window
 
-    directory_path = f"uploads/user_{file.poke_model.data_set.user_id}/dataset_{file.poke_model.data_set_id}/"
-    parent_directory_path = os.path.dirname(current_app.root_path)
-    file_path = os.path.join(parent_directory_path, directory_path, filename)
+    # The JSON body is another representation of the same content, so it gets its own validator
+    etag = f"{file.checksum}-view"
+    cache_control = _cache_control_for(dataset_doi)
+    if os.path.exists(file_path) and is_not_modified(etag):
+        return not_modified_response(etag, cache_control)
 
     try:
         if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                content = f.read()
+            # Only the requested window is read (through mmap), however large the file is
+            if mode == "bytes":
+                preview = read_bytes(file_path, file.checksum, offset=start, length=size)
+            else:
+                preview = read_lines(file_path, file.checksum, line=start, limit=size)
 
             user_cookie = request.cookies.get("view_cookie")
             if not user_cookie:
                 user_cookie = str(uuid.uuid4())
 
-            # Check if the view record already exists for this cookie
-            existing_record = HubfileViewRecord.query.filter_by(
-                user_id=current_user.id if current_user.is_authenticated else None,
-                file_id=file_id,
-                view_cookie=user_cookie,
-            ).first()
+            # Only the first page records a view: further pages belong to the same one
+            if start == 0:
+                existing_record = HubfileViewRecord.query.filter_by(
+                    user_id=current_user.id if current_user.is_authenticated else None,
+                    file_id=file_id,
+                    view_cookie=user_cookie,
+                ).first()
+            else:
+                existing_record = True
 
             if not existing_record:
                 # Register file view
-                new_view_record = HubfileViewRecord(
+                HubfileViewRecordService().create(
                     user_id=current_user.id if current_user.is_authenticated else None,
                     file_id=file_id,
                     view_date=datetime.now(),
                     view_cookie=user_cookie,
                 )
-                db.session.add(new_view_record)
-                db.session.commit()
 
             # Prepare response
-            response = jsonify({"success": True, "content": content})
+            response = jsonify({"success": True, **preview})
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = cache_control
             if not request.cookies.get("view_cookie"):
                 response = make_response(response)
                 response.set_cookie("view_cookie", user_cookie, max_age=60 * 60 * 24 * 365 * 2)
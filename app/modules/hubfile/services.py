@@ -9,6 +9,7 @@ from app.modules.hubfile.repositories import (
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from core.configuration.configuration import uploads_root
 from core.services.BaseService import BaseService
 
 
@@ -24,17 +25,26 @@ class HubfileService(BaseService):
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
         return self.repository.get_dataset_by_hubfile(hubfile)
 
-    def get_path_by_hubfile(self, hubfile: Hubfile) -> str:
+    def get_with_dataset_or_404(self, file_id: int) -> tuple:
+        return self.repository.get_with_dataset_or_404(file_id)
 
-        hubfile_user = self.get_owner_user_by_hubfile(hubfile)
-        hubfile_dataset = self.get_dataset_by_hubfile(hubfile)
-        working_dir = os.getenv("WORKING_DIR")
+    def get_storage_path(self, hubfile: Hubfile, owner_id: int | None = None, dataset_id: int | None = None) -> str:
+        """
+        Path relative to the uploads folder. Rows written before it was stored are resolved through their dataset,
+        which is looked up unless the caller already has its owner and id.
+        """
+        if hubfile.storage_path:
+            return hubfile.storage_path
+        if dataset_id is None:
+            hubfile_dataset = self.get_dataset_by_hubfile(hubfile)
+            owner_id, dataset_id = hubfile_dataset.user_id, hubfile_dataset.id
+        return Hubfile.storage_path_for(owner_id, dataset_id, hubfile.name)
 
-        path = os.path.join(
-            working_dir, "uploads", f"user_{hubfile_user.id}", f"dataset_{hubfile_dataset.id}", hubfile.name
-        )
+    def get_path_by_hubfile(self, hubfile: Hubfile, owner_id: int | None = None, dataset_id: int | None = None) -> str:
+        return os.path.join(uploads_root(), self.get_storage_path(hubfile, owner_id, dataset_id))
 
-        return path
+    def is_published(self, hubfile: Hubfile) -> bool:
+        return self.repository.is_published(hubfile)
 
     def total_hubfile_views(self) -> int:
         return self.hubfile_view_record_repository.total_hubfile_views()
@@ -43,11 +53,17 @@ class HubfileService(BaseService):
         hubfile_download_record_repository = HubfileDownloadRecordRepository()
         return hubfile_download_record_repository.total_hubfile_downloads()
 
-    def increment_download_count(self, file):
-        dataset = self.get_dataset_by_hubfile(file)
-        DataSetService().increment_download_count(dataset.id)
+    def increment_download_count(self, file, dataset_id: int | None = None):
+        if dataset_id is None:
+            dataset_id = self.get_dataset_by_hubfile(file).id
+        DataSetService().increment_download_count(dataset_id)
 
 
 class HubfileDownloadRecordService(BaseService):
     def __init__(self):
         super().__init__(HubfileDownloadRecordRepository())
+
+
+class HubfileViewRecordService(BaseService):
+    def __init__(self):
+        super().__init__(HubfileViewRecordRepository())
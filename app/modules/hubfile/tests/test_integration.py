@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord
+from app.modules.hubfile.services import HubfileService
+from app.modules.pokemodel.models import FMMetaData, PokeModel
+from core.configuration.configuration import uploads_root
+
+CONTENT = b"Pikachu @ Light Ball\nAbility: Static\n- Thunderbolt\n" * 20
+
+
+@pytest.fixture(scope="module")
+def stored_file(test_client):
+    with test_client.application.app_context():
+        user = User.query.first()
+        meta = DSMetaData(
+            title="Cached downloads", description="d", publication_type=PublicationType.NONE, dataset_doi="10.1/x"
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+        pm = PokeModel(
+            data_set=dataset,
+            fm_meta_data=FMMetaData(
+                poke_filename="cached.poke", title="c", description="d", publication_type=PublicationType.NONE
+            ),
+        )
+        hubfile = Hubfile(name="cached.poke", checksum=hashlib.md5(CONTENT).hexdigest(), size=len(CONTENT))
+        pm.files.append(hubfile)
+        db.session.add(pm)
+        db.session.commit()
+
+        dataset_dir = os.path.join(uploads_root(), f"user_{user.id}", f"dataset_{dataset.id}")
+        os.makedirs(dataset_dir, exist_ok=True)
+        with open(os.path.join(dataset_dir, "cached.poke"), "wb") as f:
+            f.write(CONTENT)
+        file_id, checksum = hubfile.id, hubfile.checksum
+
+    yield file_id, checksum
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+
+
+def test_file_download_conditional_and_range(test_client, stored_file):
+    file_id, checksum = stored_file
+
+    # The dataset comes with the file: no further lookups to decide caching or count the download
+    with (
+        patch.object(HubfileService, "is_published", side_effect=AssertionError("joined lookup")),
+        patch.object(HubfileService, "get_dataset_by_hubfile", side_effect=AssertionError("joined lookup")),
+    ):
+        resp = test_client.get(f"/file/download/{file_id}")
+    assert resp.status_code == 200
+    assert resp.data == CONTENT
+    assert resp.headers["ETag"] == f'"{checksum}"'
+    assert resp.headers["Cache-Control"] == "public, no-cache"
+    assert resp.headers["Accept-Ranges"] == "bytes"
+
+    with test_client.application.app_context():
+        records = HubfileDownloadRecord.query.filter_by(file_id=file_id).count()
+
+    resp = test_client.get(f"/file/download/{file_id}", headers={"If-None-Match": f'"{checksum}"'})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    with test_client.application.app_context():
+        assert HubfileDownloadRecord.query.filter_by(file_id=file_id).count() == records
+
+    resp = test_client.get(f"/file/download/{file_id}", headers={"Range": "bytes=10-19"})
+    assert resp.status_code == 206
+    assert resp.data == CONTENT[10:20]
+    assert resp.headers["Content-Range"] == f"bytes 10-19/{len(CONTENT)}"
+
+
+def test_file_download_revalidated_by_date_is_not_counted(test_client, stored_file):
+    file_id, _checksum = stored_file
+    resp = test_client.get(f"/file/download/{file_id}")
+    last_modified = resp.headers["Last-Modified"]
+    with test_client.application.app_context():
+        records = HubfileDownloadRecord.query.filter_by(file_id=file_id).count()
+
+    # A client with the date but no ETag revalidates with If-Modified-Since only
+    test_client.delete_cookie("file_download_cookie")
+    with patch.object(HubfileService, "increment_download_count", side_effect=AssertionError("counted")):
+        resp = test_client.get(f"/file/download/{file_id}", headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 304
+    with test_client.application.app_context():
+        assert HubfileDownloadRecord.query.filter_by(file_id=file_id).count() == records
+
+
+def test_file_view_revalidates_with_etag(test_client, stored_file):
+    file_id, checksum = stored_file
+
+    resp = test_client.get(f"/file/view/{file_id}")
+    assert resp.status_code == 200
+    assert resp.get_json()["content"] == CONTENT.decode("utf-8")
+    assert resp.headers["ETag"] == f'"{checksum}-view"'
+
+    resp = test_client.get(f"/file/view/{file_id}", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+
+
+def test_file_view_pages_by_lines_and_bytes(test_client, stored_file):
+    file_id, _ = stored_file
+    lines = CONTENT.decode("utf-8").splitlines(keepends=True)
+
+    first = test_client.get(f"/file/view/{file_id}?limit=25").get_json()
+    assert first["content"] == "".join(lines[:25])
+    assert (first["total_lines"], first["next_line"]) == (len(lines), 25)
+    assert first["next_offset"] == len("".join(lines[:25]).encode("utf-8"))
+
+    last = test_client.get(f"/file/view/{file_id}?line=50&limit=25").get_json()
+    assert last["content"] == "".join(lines[50:])
+    assert last["next_line"] is None
+
+    window = test_client.get(f"/file/view/{file_id}?offset=10&length=20").get_json()
+    assert window["content"] == CONTENT[10:30].decode("utf-8")
+    assert window["next_offset"] == 30
+
+    assert test_client.get(f"/file/view/{file_id}?line=-1").status_code == 400
+    assert test_client.get(f"/file/view/{file_id}?limit=0").status_code == 400
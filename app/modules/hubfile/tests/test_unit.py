@@ -1,5 +1,9 @@
+import os
+
 import pytest
 
+from core.configuration.configuration import uploads_root
+
 
 @pytest.fixture(scope="module")
 def test_client(test_client):
@@ -22,3 +26,242 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+def test_blob_store_ingests_once_and_materializes_links(tmp_path):
+    from app.modules.hubfile.blobs import BlobStore
+
+    store = BlobStore(str(tmp_path / "blobs"))
+    first = tmp_path / "a.poke"
+    first.write_text("Pikachu\n", encoding="utf-8")
+    duplicate = tmp_path / "b.poke"
+    duplicate.write_text("Pikachu\n", encoding="utf-8")
+
+    blob_path = store.ingest("abcdef", str(first))
+    assert blob_path == str(tmp_path / "blobs" / "ab" / "cd" / "abcdef")
+    # Same content again: the stored blob is kept
+    store.ingest("abcdef", str(duplicate))
+    assert os.path.samefile(blob_path, first)
+
+    dest = tmp_path / "dataset_2" / "a.poke"
+    assert store.materialize("abcdef", str(dest))
+    assert os.path.samefile(dest, blob_path)
+    assert not store.materialize("missing", str(tmp_path / "missing.poke"))
+    assert list(store.iter_checksums()) == ["abcdef"]
+
+    store.delete("abcdef")
+    assert not store.exists("abcdef")
+    assert dest.read_text(encoding="utf-8") == "Pikachu\n"
+
+
+def test_blob_store_only_shares_blobs_with_the_same_bytes(tmp_path):
+    from app.modules.hubfile.blobs import BlobStore
+
+    store = BlobStore(str(tmp_path / "blobs"))
+    stored = tmp_path / "a.poke"
+    stored.write_text("Pikachu\n", encoding="utf-8")
+    same = tmp_path / "b.poke"
+    same.write_text("Pikachu\n", encoding="utf-8")
+    # Same checksum, other bytes: what an MD5 collision looks like to the store
+    colliding = tmp_path / "c.poke"
+    colliding.write_text("Raichu\n", encoding="utf-8")
+
+    assert store.share("abcdef", str(stored))
+    assert store.share("abcdef", str(same))
+    assert os.path.samefile(same, store.path("abcdef"))
+
+    assert not store.share("abcdef", str(colliding))
+    assert colliding.read_text(encoding="utf-8") == "Raichu\n"
+    assert not os.path.samefile(colliding, store.path("abcdef"))
+
+    dest = tmp_path / "dataset_2" / "c.poke"
+    assert store.materialize("abcdef", str(dest), source_path=str(colliding))
+    assert dest.read_text(encoding="utf-8") == "Raichu\n"
+
+
+def test_blob_reference_counts(test_client):
+    from app import db
+    from app.modules.hubfile.models import HubfileBlob
+    from app.modules.hubfile.repositories import HubfileBlobRepository
+
+    with test_client.application.app_context():
+        repository = HubfileBlobRepository()
+        repository.acquire("refcount-checksum", 10)
+        repository.acquire("refcount-checksum", 10)
+        db.session.commit()
+        assert db.session.get(HubfileBlob, "refcount-checksum").ref_count == 2
+
+        assert repository.release("refcount-checksum") == 1
+        assert repository.release("refcount-checksum") == 0
+        db.session.commit()
+        assert db.session.get(HubfileBlob, "refcount-checksum") is None
+        assert repository.release("refcount-checksum") == 0
+
+
+def test_deliver_file_hands_over_to_nginx_in_x_accel_mode(test_client, tmp_path):
+    from core.helpers.file_delivery import deliver_file
+
+    stored = tmp_path / "user_1" / "dataset 1" / "set.poke"
+    stored.parent.mkdir(parents=True)
+    stored.write_text("Pikachu\n", encoding="utf-8")
+    app = test_client.application
+
+    with app.test_request_context():
+        app.config.update(FILE_DELIVERY="x-accel", X_ACCEL_ROOT=str(tmp_path), X_ACCEL_PREFIX="/_protected/")
+        try:
+            resp = deliver_file(str(stored))
+            assert resp.headers["X-Accel-Redirect"] == "/_protected/user_1/dataset%201/set.poke"
+            assert resp.headers["Content-Disposition"] == "attachment; filename=set.poke"
+            assert resp.get_data() == b""
+
+            # Files outside the mapped root are still sent by the worker
+            outside = tmp_path.parent / "outside.poke"
+            outside.write_text("Eevee\n", encoding="utf-8")
+            app.config["X_ACCEL_ROOT"] = str(stored.parent)
+            resp = deliver_file(str(outside))
+            assert "X-Accel-Redirect" not in resp.headers
+            resp.direct_passthrough = False
+            assert resp.get_data() == b"Eevee\n"
+        finally:
+            app.config.update(FILE_DELIVERY="flask", X_ACCEL_ROOT=uploads_root())
+
+        resp = deliver_file(str(stored))
+        assert "X-Accel-Redirect" not in resp.headers
+
+
+def test_x_accel_only_maps_the_uploads_folder(test_client, tmp_path, monkeypatch):
+    from core.configuration.configuration import Config
+    from core.helpers.file_delivery import x_accel_uri
+
+    assert Config.X_ACCEL_ROOT == uploads_root()
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    stored = tmp_path / "uploads" / "user_1" / "set.poke"
+    stored.parent.mkdir(parents=True)
+    stored.write_text("Pikachu\n", encoding="utf-8")
+    (tmp_path / ".env").write_text("SECRET_KEY=x\n", encoding="utf-8")
+
+    with test_client.application.test_request_context():
+        monkeypatch.setitem(test_client.application.config, "X_ACCEL_ROOT", uploads_root())
+        assert x_accel_uri(str(stored)) == "/_protected/user_1/set.poke"
+        assert x_accel_uri(str(tmp_path / ".env")) is None
+
+
+def test_find_reusable_only_reveals_published_and_own_files(test_client):
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.hubfile.repositories import HubfileRepository
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+
+    published, draft, missing = "1" * 32, "2" * 32, "3" * 32
+
+    with test_client.application.app_context():
+        owner = User(email="reuse-owner@example.com", password="test1234")
+        other = User(email="reuse-other@example.com", password="test1234")
+        db.session.add_all([owner, other])
+        db.session.flush()
+
+        for checksum, doi in ((published, "10.1234/reuse"), (draft, None)):
+            meta = DSMetaData(title="t", description="d", publication_type=PublicationType.NONE, dataset_doi=doi)
+            dataset = DataSet(user_id=owner.id, ds_meta_data=meta)
+            fm_meta = FMMetaData(
+                poke_filename=f"{checksum[0]}.poke", title="t", description="d", publication_type=PublicationType.NONE
+            )
+            model = PokeModel(data_set=dataset, fm_meta_data=fm_meta)
+            db.session.add_all([dataset, model])
+            db.session.flush()
+            db.session.add(Hubfile(name=f"{checksum[0]}.poke", checksum=checksum, size=1, poke_model_id=model.id))
+        db.session.commit()
+
+        repository = HubfileRepository()
+        assert set(repository.find_reusable([published, draft, missing], other.id)) == {published}
+        assert set(repository.find_reusable([published, draft, missing], None)) == {published}
+
+        found = repository.find_reusable([published, draft, published], owner.id)
+        assert set(found) == {published, draft}
+        name, owner_id, _ = found[draft]
+        assert (name, owner_id) == ("2.poke", owner.id)
+        assert repository.find_reusable([], owner.id) == {}
+
+
+def test_storage_path_is_resolved_without_joins_once_checked(test_client):
+    from unittest.mock import patch
+
+    from app import db
+    from app.modules.auth.models import User
+    from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.hubfile.services import HubfileService
+    from app.modules.pokemodel.models import FMMetaData, PokeModel
+    from rosemary.commands.files_check import files_check
+
+    with test_client.application.app_context():
+        user = User.query.first()
+        meta = DSMetaData(title="t", description="d", publication_type=PublicationType.NONE)
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+        fm_meta = FMMetaData(
+            poke_filename="old.poke", title="t", description="d", publication_type=PublicationType.NONE
+        )
+        model = PokeModel(data_set=dataset, fm_meta_data=fm_meta)
+        # Written before storage paths were stored
+        hubfile = Hubfile(name="old.poke", checksum="4" * 32, size=1)
+        model.files.append(hubfile)
+        db.session.add(model)
+        db.session.commit()
+        expected = f"user_{user.id}/dataset_{dataset.id}/old.poke"
+        assert HubfileService().get_storage_path(hubfile) == expected
+
+        result = test_client.application.test_cli_runner().invoke(files_check, ["--fix"])
+        assert result.exit_code == 0, result.output
+        assert "rewritten" in result.output
+
+        db.session.expire_all()
+        hubfile = db.session.get(Hubfile, hubfile.id)
+        assert hubfile.storage_path == expected
+        with patch.object(HubfileService, "get_dataset_by_hubfile", side_effect=AssertionError("no joins")):
+            assert HubfileService().get_path_by_hubfile(hubfile).endswith(expected)
+        assert not HubfileService().is_published(hubfile)
+
+
+def test_line_index_and_preview_windows(tmp_path):
+    from app.modules.hubfile.previews import build_line_index, line_index_cache, read_bytes, read_lines
+
+    path = tmp_path / "team.poke"
+    path.write_bytes(b"a\nbb\n\nccc")
+    assert build_line_index(str(path)).tolist() == [0, 2, 5, 6, 9]
+    path.write_bytes(b"a\nbb\n")
+    assert build_line_index(str(path)).tolist() == [0, 2, 5]
+    path.write_bytes(b"")
+    assert build_line_index(str(path)).tolist() == [0]
+    assert read_lines(str(path), "empty")["content"] == ""
+
+    text = "Flabébé @ Leftovers\nAbility: Flower Veil\n- Moonblast\n"
+    path.write_bytes(text.encode("utf-8"))
+    line_index_cache.clear()
+    page = read_lines(str(path), "flabebe", line=1, limit=1)
+    assert page["content"] == "Ability: Flower Veil\n"
+    assert (page["total_lines"], page["next_line"], page["next_offset"]) == (
+        3,
+        2,
+        len("Flabébé @ Leftovers\nAbility: Flower Veil\n".encode()),
+    )
+    assert read_lines(str(path), "flabebe", line=2, limit=10)["next_line"] is None
+    assert line_index_cache.stats()["hits"] == 1
+
+    # Paging by bytes never splits the two-byte "é"
+    pages, offset = [], 0
+    while offset is not None:
+        page = read_bytes(str(path), "flabebe", offset=offset, length=5)
+        pages.append(page["content"])
+        offset = page["next_offset"]
+    assert "".join(pages) == text
+    assert all("�" not in content for content in pages)
+    assert read_bytes(str(path), "flabebe", offset=4, length=1)["content"] == "é"
+
+
+def test_uploads_root_is_absolute_without_working_dir(monkeypatch, tmp_path):
+    # CI runs without WORKING_DIR: paths must not depend on who resolves them (cwd vs app.root_path)
+    monkeypatch.delenv("WORKING_DIR", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert uploads_root() == os.path.join(str(tmp_path), "uploads")
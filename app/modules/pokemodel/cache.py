@@ -0,0 +1,23 @@
+import os
+
+from core.cache.lru_cache import LRUCache
+
+# Process-wide cache of parsed Pokemon objects. Entries are keyed by the Hubfile checksum, so a file
+# whose content changes gets a new key; when no checksum is known we fall back to path + mtime + size.
+pokemon_cache = LRUCache(maxsize=int(os.getenv("POKEMON_CACHE_SIZE", "1024")))
+
+
+def pokemon_cache_key(file_path: str, checksum: str | None = None):
+    if checksum:
+        return ("checksum", checksum)
+    stat = os.stat(file_path)
+    return ("path", file_path, stat.st_mtime_ns, stat.st_size)
+
+
+def invalidate_pokemon(checksum: str | None = None, file_path: str | None = None) -> bool:
+    """Drops a parsed Pokemon from the cache, e.g. when its file is replaced or deleted."""
+    if checksum:
+        return pokemon_cache.invalidate(("checksum", checksum))
+    if file_path and os.path.exists(file_path):
+        return pokemon_cache.invalidate(pokemon_cache_key(file_path))
+    return False
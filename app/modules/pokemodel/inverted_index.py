@@ -0,0 +1,276 @@
+import logging
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+from app.modules.pokemodel.models import PokeSet
+from app.modules.pokemodel.repositories import PokeSetRepository
+from core.configuration.configuration import uploads_root
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("species", "move", "ability", "item", "tera_type")
+
+DEFAULT_INDEX_PATH = os.path.join(uploads_root(), "cache", "poke_index.npz")
+
+
+def normalize_term(value: str) -> str:
+    """Case, hyphens and extra spaces don't matter: "Swords-Dance" and "swords  dance" are the same term."""
+    return " ".join(value.lower().replace("-", " ").split())
+
+
+def intersect(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Intersection of two sorted posting lists, probing the longer one with the ids of the shorter one."""
+    if len(left) > len(right):
+        left, right = right, left
+    if not len(left):
+        return left
+    positions = np.searchsorted(right, left)
+    found = positions < len(right)
+    found[found] = right[positions[found]] == left[found]
+    return left[found]
+
+
+class PokeInvertedIndex:
+    """
+    Exact lookups of the models that use a species, move, ability, item or tera type.
+
+    Every (field, value) pair is interned to a term id whose posting list holds the sorted ids of the
+    PokeModels with at least one set using it, so a query is a handful of sorted-array intersections and
+    unions instead of a database or Elasticsearch round trip. Team files match when any of their sets do.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._reset()
+
+    def __len__(self):
+        return len(self._model_terms)
+
+    def _reset(self):
+        self._term_ids = {}  # (field, normalized value) -> term id
+        self._labels = []  # (field, value as first seen) per term id
+        self._postings = []  # array("q") of sorted model ids per term id
+        self._model_terms = {}  # model id -> term ids
+        self._model_datasets = {}  # model id -> dataset id
+        self._model_sets = {}  # model id -> (number of sets, highest set id)
+        self._set_count = 0
+
+    def _term_id(self, field: str, value: str) -> int:
+        key = (field, normalize_term(value))
+        term_id = self._term_ids.get(key)
+        if term_id is None:
+            term_id = len(self._labels)
+            self._term_ids[key] = term_id
+            self._labels.append((field, value.strip()))
+            self._postings.append(array("q"))
+        return term_id
+
+    def _add(self, model_id: int, dataset_id: int, sets: list):
+        """`sets` holds (set id, species, item, ability, tera type, moves) tuples, moves one per line."""
+        if model_id in self._model_terms:
+            self._remove(model_id)
+        if not sets:
+            return
+
+        terms = set()
+        for _, species, item, ability, tera_type, moves in sets:
+            for field, value in (("species", species), ("item", item), ("ability", ability), ("tera_type", tera_type)):
+                if value and value.strip():
+                    terms.add(self._term_id(field, value))
+            for move in (moves or "").split("\n"):
+                if move.strip():
+                    terms.add(self._term_id("move", move))
+
+        for term_id in terms:
+            posting = self._postings[term_id]
+            # Models are almost always indexed in id order, so this is an append
+            if not posting or posting[-1] < model_id:
+                posting.append(model_id)
+            else:
+                posting.insert(bisect_left(posting, model_id), model_id)
+
+        self._model_terms[model_id] = tuple(sorted(terms))
+        self._model_datasets[model_id] = dataset_id
+        self._model_sets[model_id] = (len(sets), max((row[0] for row in sets), default=None))
+        self._set_count += len(sets)
+
+    def _remove(self, model_id: int):
+        for term_id in self._model_terms.pop(model_id, ()):
+            posting = self._postings[term_id]
+            position = bisect_left(posting, model_id)
+            if position < len(posting) and posting[position] == model_id:
+                del posting[position]
+        self._model_datasets.pop(model_id, None)
+        count, _ = self._model_sets.pop(model_id, (0, None))
+        self._set_count -= count
+
+    # --- Building, persistence and freshness ---
+
+    def build(self):
+        """Indexes every stored PokeSet, grouped by model."""
+        columns = [PokeSet.species, PokeSet.item, PokeSet.ability, PokeSet.tera_type, PokeSet.moves]
+        rows_by_model = {}
+        datasets = {}
+        for set_id, model_id, dataset_id, *values in PokeSetRepository().iter_with_dataset(*columns):
+            rows_by_model.setdefault(model_id, []).append((set_id, *values))
+            datasets[model_id] = dataset_id
+
+        with self._lock:
+            self._reset()
+            for model_id in sorted(rows_by_model):
+                self._add(model_id, datasets[model_id], rows_by_model[model_id])
+            self.loaded = True
+
+    def save(self, path: str | None = None):
+        path = path or self.path
+        with self._lock:
+            model_ids = sorted(self._model_terms)
+            postings = [np.frombuffer(posting, dtype=np.int64) for posting in self._postings]
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                fields=np.array([field for field, _ in self._labels], dtype=str),
+                labels=np.array([label for _, label in self._labels], dtype=str),
+                posting_lengths=np.array([len(posting) for posting in postings], dtype=np.int64),
+                postings=np.concatenate(postings) if postings else np.zeros(0, dtype=np.int64),
+                model_ids=np.array(model_ids, dtype=np.int64),
+                model_datasets=np.array([self._model_datasets[m] for m in model_ids], dtype=np.int64),
+                model_sets=np.array([self._model_sets[m] for m in model_ids], dtype=np.int64).reshape(-1, 2),
+            )
+            os.replace(tmp_path, path)
+
+    def load(self, path: str | None = None) -> bool:
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"Could not load the inverted index from {path}: {exc}")
+            return False
+
+        with self._lock:
+            self._reset()
+            offsets = np.concatenate(([0], np.cumsum(arrays["posting_lengths"])))
+            model_terms = {}
+            for term_id, (field, label) in enumerate(zip(arrays["fields"].tolist(), arrays["labels"].tolist())):
+                self._term_ids[(field, normalize_term(label))] = term_id
+                self._labels.append((field, label))
+                posting = array("q", arrays["postings"][offsets[term_id] : offsets[term_id + 1]].tolist())
+                self._postings.append(posting)
+                for model_id in posting:
+                    model_terms.setdefault(model_id, []).append(term_id)
+
+            for model_id, dataset_id, (count, max_set_id) in zip(
+                arrays["model_ids"].tolist(), arrays["model_datasets"].tolist(), arrays["model_sets"].tolist()
+            ):
+                self._model_terms[model_id] = tuple(model_terms.get(model_id, ()))
+                self._model_datasets[model_id] = dataset_id
+                self._model_sets[model_id] = (count, max_set_id)
+                self._set_count += count
+            self.loaded = True
+        return True
+
+    def signature(self) -> tuple:
+        """Same (count, highest set id) pair as PokeSetRepository.get_signature()."""
+        with self._lock:
+            max_set_id = max((m for _, m in self._model_sets.values() if m is not None), default=None)
+            return (self._set_count, max_set_id)
+
+    def ensure_fresh(self):
+        """Starts from the .npz snapshot when possible and rebuilds when other workers changed the sets."""
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            if self.loaded and self.signature() == PokeSetRepository().get_signature():
+                return
+            self.build()
+            if self.path:
+                try:
+                    self.save()
+                except OSError as exc:
+                    logger.warning(f"Could not save the inverted index to {self.path}: {exc}")
+
+    # --- Incremental updates ---
+
+    def add_models(self, poke_models):
+        """Indexes (or reindexes) the given models. Nothing to do until the index has been loaded."""
+        with self._lock:
+            if not self.loaded:
+                return
+            for poke_model in poke_models:
+                sets = [(s.id, s.species, s.item, s.ability, s.tera_type, s.moves) for s in poke_model.poke_sets]
+                self._add(poke_model.id, poke_model.data_set_id, sets)
+
+    def remove_models(self, model_ids):
+        with self._lock:
+            if not self.loaded:
+                return
+            for model_id in model_ids:
+                self._remove(model_id)
+
+    # --- Queries ---
+
+    def posting(self, field: str, value: str) -> np.ndarray:
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        with self._lock:
+            term_id = self._term_ids.get((field, normalize_term(value)))
+            if term_id is None:
+                return np.zeros(0, dtype=np.int64)
+            return np.array(self._postings[term_id], dtype=np.int64)
+
+    def search(self, clauses, match: str = "all") -> list:
+        """
+        Sorted ids of the models matching the clauses. Each clause is a (field, values) pair whose values are
+        OR-ed; clauses are AND-ed with match="all" and OR-ed with match="any".
+        """
+        if match not in ("all", "any"):
+            raise ValueError(f"Unknown match mode: {match}")
+        with self._lock:
+            results = []
+            for field, values in clauses:
+                if not values:
+                    raise ValueError(f"No values given for {field}")
+                postings = [self.posting(field, value) for value in values]
+                results.append(np.unique(np.concatenate(postings)) if len(postings) > 1 else postings[0])
+            if not results:
+                return []
+
+            if match == "any":
+                return np.unique(np.concatenate(results)).tolist()
+            # Intersect the shortest lists first, so the candidate set shrinks as fast as possible
+            results.sort(key=len)
+            matched = results[0]
+            for posting in results[1:]:
+                if not len(matched):
+                    break
+                matched = intersect(matched, posting)
+            return matched.tolist()
+
+    def dataset_of(self, model_id: int) -> int | None:
+        return self._model_datasets.get(model_id)
+
+    def terms(self, field: str, prefix: str = "", limit: int = 50) -> list:
+        """Known values of a field with the number of models using them, most used first."""
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        prefix = normalize_term(prefix)
+        found = []
+        with self._lock:
+            for (term_field, key), term_id in self._term_ids.items():
+                if term_field == field and key.startswith(prefix) and self._postings[term_id]:
+                    found.append({"value": self._labels[term_id][1], "count": len(self._postings[term_id])})
+        found.sort(key=lambda term: (-term["count"], term["value"]))
+        return found[:limit]
+
+
+poke_index = PokeInvertedIndex(path=os.getenv("POKE_INDEX_PATH", DEFAULT_INDEX_PATH))
@@ -1,11 +1,12 @@
 import os
-import re
 
-from flask import current_app
 from sqlalchemy import Enum as SQLAlchemyEnum
 
 from app import db
 from app.modules.dataset.models import Author, PublicationType
+from app.modules.pokemodel.cache import pokemon_cache, pokemon_cache_key
+from core.configuration.configuration import uploads_root
+from core.pokemon_check.parser import STAT_DISPLAY_NAMES, ParsedSet, iter_sets, parse_set
 
 
 class Pokemon:
@@ -13,10 +14,26 @@ class Pokemon:
     item: str
     ability: str
     tera_type: str
+    nature: str
+    level: int | None
     evs: dict[str, int]
     ivs: dict[str, int]
     moves: list[str]
 
+    @classmethod
+    def from_parsed_set(cls, parsed: ParsedSet) -> "Pokemon":
+        pokemon = cls()
+        pokemon.name = parsed.species
+        pokemon.item = parsed.item or ""
+        pokemon.ability = parsed.ability or ""
+        pokemon.tera_type = parsed.tera_type or ""
+        pokemon.nature = parsed.nature or ""
+        pokemon.level = parsed.level
+        pokemon.evs = {STAT_DISPLAY_NAMES[stat]: value for stat, value in parsed.evs.items()}
+        pokemon.ivs = {STAT_DISPLAY_NAMES[stat]: value for stat, value in parsed.ivs.items()}
+        pokemon.moves = parsed.moves
+        return pokemon
+
 
 class PokeModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -24,18 +41,35 @@ class PokeModel(db.Model):
     fm_meta_data_id = db.Column(db.Integer, db.ForeignKey("fm_meta_data.id"))
     files = db.relationship("Hubfile", backref="poke_model", lazy=True, cascade="all, delete")
     fm_meta_data = db.relationship("FMMetaData", uselist=False, backref="poke_model", cascade="all, delete")
+    poke_sets = db.relationship(
+        "PokeSet", backref="poke_model", lazy=True, cascade="all, delete-orphan", order_by="PokeSet.position"
+    )
 
     def __repr__(self):
         return f"PokeModel<{self.id}>"
 
+    def get_file_path(self):
+        from app.modules.hubfile.models import Hubfile
+
+        hubfile = self.files[0]
+        storage_path = hubfile.storage_path or Hubfile.storage_path_for(
+            self.data_set.user_id, self.data_set_id, hubfile.name
+        )
+        return os.path.join(uploads_root(), storage_path)
+
     def get_pokemon(self):
+        """First set of the file, which is the whole content for single-set uploads."""
+        hubfile = self.files[0]
+        file_path = self.get_file_path()
 
-        directory_path = f"uploads/user_{self.data_set.user_id}/dataset_{self.data_set_id}/{self.files[0].name}"
-        parent_directory_path = os.path.dirname(current_app.root_path)
-        file_path = os.path.join(parent_directory_path, directory_path)
+        # Parsed sets are shared through the process-wide cache, so repeated calls
+        # (to_indexed, get_total_evs/ivs...) only read the file once
+        key = pokemon_cache_key(file_path, checksum=hubfile.checksum)
+        return pokemon_cache.get_or_load(key, lambda: parse_poke(file_path))
 
-        pokemon = parse_poke(file_path)
-        return pokemon
+    def iter_pokemons(self):
+        """Every set of the file, parsed lazily. Team exports can be large, so they are not cached."""
+        return iter_poke(self.get_file_path())
 
     def get_total_ivs(self):
         pokemon = self.get_pokemon()
@@ -47,56 +81,108 @@ class PokeModel(db.Model):
 
 
 def parse_poke(file_path):
+    with open(file_path, "r") as f:
+        parsed = parse_set(f.read(), validate=False, strict=True)
+
+    if parsed is None:
+        raise IndexError(f"{file_path} does not contain any Pokemon set")
+    return Pokemon.from_parsed_set(parsed)
 
+
+def iter_poke(file_path):
+    """Yields one Pokemon per set of a (possibly multi-set) .poke file, reading it line by line."""
     with open(file_path, "r") as f:
-        lines = f.read().strip().splitlines()
-        name = lines[0].split("@")[0].strip()
-        item = lines[0].split("@")[1].strip() if "@" in lines[0] else ""
-        moves = []
-        ability = ""
-        tera_type = ""
-        evs = {}
-        ivs = {}
-
-        for line in lines[1:]:
-            if not line:
-                continue
-
-            kv_match = re.match(r"^\s*([^:]+):\s*(.*)$", line, re.IGNORECASE)
-            if kv_match:
-                key = kv_match.group(1).strip().lower()
-                value = kv_match.group(2).strip()
-
-                if key == "ability":
-                    ability = value
-                elif key == "tera type":
-                    tera_type = value
-                elif key == "evs":
-                    ev_parts = value.split("/")
-                    for ev in ev_parts:
-                        val, stat = ev.strip().split()
-                        evs[stat] = int(val)
-                elif key == "ivs":
-                    iv_parts = value.split("/")
-                    for iv in iv_parts:
-                        val, stat = iv.strip().split()
-                        ivs[stat] = int(val)
-                continue
-
-            move_match = re.match(r"^\s*-\s+(.*)$", line)
-            if move_match:
-                moves.append(move_match.group(1).strip())
-                continue
+        for parsed in iter_sets(f, validate=False, strict=True):
+            yield Pokemon.from_parsed_set(parsed)
+
 
+STAT_KEYS = ("hp", "atk", "def", "spa", "spd", "spe")
+
+
+class PokeSet(db.Model):
+    """Structured content of a .poke set, stored at upload time so consumers don't have to reparse files."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    poke_model_id = db.Column(db.Integer, db.ForeignKey("poke_model.id"), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    species = db.Column(db.String(120), nullable=False, index=True)
+    item = db.Column(db.String(120))
+    ability = db.Column(db.String(120))
+    tera_type = db.Column(db.String(32))
+    # Stats not written in the file are stored as NULL
+    ev_hp = db.Column(db.Integer)
+    ev_atk = db.Column(db.Integer)
+    ev_def = db.Column(db.Integer)
+    ev_spa = db.Column(db.Integer)
+    ev_spd = db.Column(db.Integer)
+    ev_spe = db.Column(db.Integer)
+    iv_hp = db.Column(db.Integer)
+    iv_atk = db.Column(db.Integer)
+    iv_def = db.Column(db.Integer)
+    iv_spa = db.Column(db.Integer)
+    iv_spd = db.Column(db.Integer)
+    iv_spe = db.Column(db.Integer)
+    # One move per line
+    moves = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"PokeSet<{self.id}, {self.species}>"
+
+    @staticmethod
+    def columns_from_parsed_data(parsed_data: dict) -> dict:
+        """Maps the dictionary returned by PokemonSetChecker.get_parsed_data() to PokeSet columns."""
+        evs = {stat.lower(): value for stat, value in (parsed_data.get("evs") or {}).items()}
+        ivs = {stat.lower(): value for stat, value in (parsed_data.get("ivs") or {}).items()}
+        columns = {
+            "species": parsed_data.get("pokemon") or "",
+            "item": parsed_data.get("item") or None,
+            "ability": parsed_data.get("ability") or None,
+            "tera_type": parsed_data.get("tera_type") or None,
+            "moves": "\n".join(parsed_data.get("moves") or []),
+        }
+        for stat in STAT_KEYS:
+            columns[f"ev_{stat}"] = evs.get(stat)
+            columns[f"iv_{stat}"] = ivs.get(stat)
+        return columns
+
+    def get_evs(self) -> dict[str, int]:
+        return {stat: getattr(self, f"ev_{stat}") for stat in STAT_KEYS if getattr(self, f"ev_{stat}") is not None}
+
+    def get_ivs(self) -> dict[str, int]:
+        return {stat: getattr(self, f"iv_{stat}") for stat in STAT_KEYS if getattr(self, f"iv_{stat}") is not None}
+
+    def get_moves(self) -> list[str]:
+        return self.moves.split("\n") if self.moves else []
+
+    def get_total_evs(self) -> int:
+        return sum(self.get_evs().values())
+
+    def get_total_ivs(self) -> int:
+        return sum(self.get_ivs().values())
+
+    def to_pokemon(self) -> Pokemon:
         pokemon = Pokemon()
-        pokemon.name = name
-        pokemon.item = item
-        pokemon.ability = ability
-        pokemon.tera_type = tera_type
-        pokemon.evs = evs
-        pokemon.ivs = ivs
-        pokemon.moves = moves
-    return pokemon
+        pokemon.name = self.species
+        pokemon.item = self.item or ""
+        pokemon.ability = self.ability or ""
+        pokemon.tera_type = self.tera_type or ""
+        pokemon.evs = self.get_evs()
+        pokemon.ivs = self.get_ivs()
+        pokemon.moves = self.get_moves()
+        return pokemon
+
+    def copy(self) -> "PokeSet":
+        columns = {column.name: getattr(self, column.name) for column in self.__table__.columns}
+        columns.pop("id")
+        columns.pop("poke_model_id")
+        return PokeSet(**columns)
+
+
+fm_meta_data_tags = db.Table(
+    "fm_meta_data_tag",
+    db.Column("fm_meta_data_id", db.Integer, db.ForeignKey("fm_meta_data.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), primary_key=True, index=True),
+)
 
 
 class FMMetaData(db.Model):
@@ -113,6 +199,7 @@ class FMMetaData(db.Model):
     authors = db.relationship(
         "Author", backref="fm_metadata", lazy=True, cascade="all, delete", foreign_keys=[Author.fm_meta_data_id]
     )
+    tag_list = db.relationship("Tag", secondary=fm_meta_data_tags, lazy=True)
 
     def __repr__(self):
         return f"FMMetaData<{self.title}"
@@ -1,6 +1,8 @@
 from sqlalchemy import func
 
-from app.modules.pokemodel.models import FMMetaData, PokeModel
+from app import db
+from app.modules.pokemodel.models import FMMetaData, PokeModel, PokeSet
+from app.modules.public.repositories import SiteCountersRepository
 from core.repositories.BaseRepository import BaseRepository
 
 
@@ -8,11 +10,62 @@ class PokeModelRepository(BaseRepository):
     def __init__(self):
         super().__init__(PokeModel)
 
+    def create(self, commit: bool = True, **kwargs) -> PokeModel:
+        SiteCountersRepository().add(poke_models=1)
+        return super().create(commit=commit, **kwargs)
+
     def count_poke_models(self) -> int:
-        max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
-        return max_id if max_id is not None else 0
+        return self.count()
 
 
 class FMMetaDataRepository(BaseRepository):
     def __init__(self):
         super().__init__(FMMetaData)
+
+
+class PokeSetRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(PokeSet)
+
+    def create_from_parsed_data(self, poke_model_id: int, parsed_data: dict, position: int = 0, commit: bool = True):
+        return self.create(
+            commit=commit,
+            poke_model_id=poke_model_id,
+            position=position,
+            **PokeSet.columns_from_parsed_data(parsed_data),
+        )
+
+    def get_poke_models_without_sets(self, limit: int | None = None):
+        query = (
+            db.session.query(PokeModel)
+            .outerjoin(PokeSet, PokeSet.poke_model_id == PokeModel.id)
+            .filter(PokeSet.id.is_(None))
+            .order_by(PokeModel.id)
+        )
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    def count_species_by_dataset(self, dataset_id: int):
+        return (
+            db.session.query(PokeSet.species, func.count(PokeSet.id))
+            .join(PokeModel, PokeModel.id == PokeSet.poke_model_id)
+            .filter(PokeModel.data_set_id == dataset_id)
+            .group_by(PokeSet.species)
+            .order_by(func.count(PokeSet.id).desc(), PokeSet.species)
+            .all()
+        )
+
+    def get_signature(self) -> tuple:
+        """(number of sets, highest set id); in-process indexes compare it to notice sets written elsewhere."""
+        count, max_id = db.session.query(func.count(PokeSet.id), func.max(PokeSet.id)).one()
+        return (count, max_id)
+
+    def iter_with_dataset(self, *columns, batch_size: int = 5000):
+        """Streams the given PokeSet columns of every set, preceded by its id, model id and dataset id."""
+        return (
+            db.session.query(PokeSet.id, PokeSet.poke_model_id, PokeModel.data_set_id, *columns)
+            .join(PokeModel, PokeModel.id == PokeSet.poke_model_id)
+            .order_by(PokeSet.id)
+            .yield_per(batch_size)
+        )
@@ -1,8 +1,77 @@
-from flask import render_template
+from flask import jsonify, render_template, request
 
 from app.modules.pokemodel import poke_model_bp
+from app.modules.pokemodel.services import PokeModelService
+from app.modules.pokemodel.stats import STAT_COLUMNS, TOTAL_COLUMNS
+
+poke_model_service = PokeModelService()
 
 
 @poke_model_bp.route("/poke_model", methods=["GET"])
 def index():
     return render_template("poke_model/index.html")
+
+
+def _int_list(name: str) -> list[int]:
+    return [int(value) for values in request.args.getlist(name) for value in values.split(",") if value]
+
+
+@poke_model_bp.route("/poke_model/stats", methods=["GET"])
+def stats():
+    """
+    Aggregates the EVs/IVs of every stored set, e.g.
+    /poke_model/stats?species=Garchomp&stats=ev_spe&agg=mean or /poke_model/stats?group_by=species&ev_total__gte=508
+    """
+    known_columns = STAT_COLUMNS + TOTAL_COLUMNS
+    reserved = {"species", "dataset_id", "model_id", "stats", "agg", "group_by"}
+    try:
+        columns = tuple(c for c in request.args.get("stats", "").split(",") if c) or STAT_COLUMNS
+        unknown = [c for c in columns if c not in known_columns]
+        if unknown:
+            return jsonify({"message": f"Unknown stats: {', '.join(unknown)}"}), 400
+
+        conditions = {key: float(value) for key, value in request.args.items() if key not in reserved}
+        agg = request.args.get("agg", "mean")
+        group_by = request.args.get("group_by") or None
+        result = poke_model_service.ev_iv_stats(
+            species=request.args.getlist("species"),
+            dataset_ids=_int_list("dataset_id"),
+            model_ids=_int_list("model_id"),
+            conditions=conditions,
+            columns=columns,
+            agg=agg,
+            group_by=group_by,
+        )
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if group_by:
+        return jsonify({"agg": agg, "group_by": group_by, "stats": list(columns), "groups": result})
+    return jsonify({"agg": agg, "stats": list(columns), **result})
+
+
+@poke_model_bp.route("/poke_model/<int:poke_model_id>/similar", methods=["GET"])
+def similar_to_model(poke_model_id):
+    k = min(request.args.get("k", 10, type=int), 50)
+    result = poke_model_service.similar_to_model(poke_model_id, k=k)
+    if result is None:
+        return jsonify({"message": "This poke model has no parsed sets"}), 404
+    return jsonify(result)
+
+
+@poke_model_bp.route("/poke_model/similar", methods=["POST"])
+def similar_to_upload():
+    file = request.files.get("file")
+    if not file or not file.filename.endswith(".poke"):
+        return jsonify({"message": "No valid file"}), 400
+
+    try:
+        text = file.read().decode("utf-8")
+    except UnicodeDecodeError:
+        return jsonify({"message": "The file is not UTF-8 encoded"}), 400
+
+    k = min(request.form.get("k", 10, type=int), 50)
+    result = poke_model_service.similar_to_text(text, k=k)
+    if result is None:
+        return jsonify({"message": "The file does not contain any Pokemon set"}), 400
+    return jsonify(result)
@@ -1,5 +1,8 @@
 from app.modules.hubfile.services import HubfileService
 from app.modules.pokemodel.repositories import FMMetaDataRepository, PokeModelRepository
+from app.modules.pokemodel.similarity import similar_sets
+from app.modules.pokemodel.stats import poke_stats
+from core.pokemon_check.parser import parse_set
 from core.services.BaseService import BaseService
 
 
@@ -17,6 +20,32 @@ class PokeModelService(BaseService):
     def count_poke_models(self):
         return self.repository.count_poke_models()
 
+    def ev_iv_stats(self, **query) -> dict | list:
+        """Runs an aggregate over the EV/IV store (see PokeStatsStore.query), refreshing it first if needed."""
+        poke_stats.ensure_fresh()
+        return poke_stats.query(**query)
+
+    def similar_to_model(self, poke_model_id: int, k: int = 10) -> dict | None:
+        """Sets most similar to the first set of a model (other sets of the same model are left out)."""
+        poke_model = self.repository.get_or_404(poke_model_id)
+        if not poke_model.poke_sets:
+            return None
+        poke_set = poke_model.poke_sets[0]
+        similar_sets.ensure_fresh()
+        result = similar_sets.similar(
+            poke_set.get_evs(), poke_set.get_ivs(), poke_set.get_moves(), k=k, exclude_models={poke_model.id}
+        )
+        return {"query": {"poke_model_id": poke_model.id, "species": poke_set.species}, **result}
+
+    def similar_to_text(self, text: str, k: int = 10) -> dict | None:
+        """Sets most similar to the first set of an uploaded .poke file."""
+        parsed = parse_set(text, validate=False)
+        if parsed is None:
+            return None
+        similar_sets.ensure_fresh()
+        result = similar_sets.similar(parsed.evs, parsed.ivs, parsed.moves, k=k)
+        return {"query": {"species": parsed.species}, **result}
+
     class FMMetaDataService(BaseService):
         def __init__(self):
             super().__init__(FMMetaDataRepository())
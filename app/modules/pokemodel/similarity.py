@@ -0,0 +1,219 @@
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from app.modules.pokemodel.inverted_index import normalize_term
+from app.modules.pokemodel.models import STAT_KEYS, PokeSet
+from app.modules.pokemodel.repositories import PokeSetRepository
+from app.modules.pokemodel.stats import DEFAULT_EV, DEFAULT_IV, EV_COLUMNS, IV_COLUMNS
+
+# Spreads: 12-dim vector (EVs / 252, IVs / 31), L2-normalized, bucketed with random-hyperplane LSH
+SPREAD_SCALE = np.array([252.0] * len(STAT_KEYS) + [31.0] * len(STAT_KEYS), dtype=np.float32)
+SPREAD_TABLES = 6
+SPREAD_BITS = 6
+# Movesets: MinHash signature of the move names, bucketed by bands of rows
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32
+MINHASH_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+_MERSENNE_PRIME = (1 << 31) - 1
+_SEED = 20240601
+
+
+def spread_vector(evs: dict, ivs: dict) -> np.ndarray:
+    """Normalized 12-dim spread of a set; stats missing from the file take Showdown's defaults."""
+    raw = [evs.get(stat, DEFAULT_EV) for stat in STAT_KEYS] + [ivs.get(stat, DEFAULT_IV) for stat in STAT_KEYS]
+    vector = np.asarray(raw, dtype=np.float32) / SPREAD_SCALE
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarSetIndex:
+    """
+    Finds the sets closest to a given one by EV/IV spread (cosine) and by moveset (Jaccard).
+
+    Both searches go through LSH buckets, so a query only scores the candidates that share a bucket with it
+    and the corpus is never scanned; candidates are then ranked by their exact cosine or Jaccard similarity.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        rng = np.random.default_rng(_SEED)
+        self._hyperplanes = rng.standard_normal((SPREAD_TABLES, SPREAD_BITS, len(SPREAD_SCALE))).astype(np.float32)
+        self._bit_weights = 1 << np.arange(SPREAD_BITS)
+        self._hash_a = rng.integers(1, _MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+        self._hash_b = rng.integers(0, _MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.int64)
+        self.loaded = False
+        self._reset()
+
+    def __len__(self):
+        return len(self._row_by_set)
+
+    def _reset(self):
+        self._rows = []  # (set id, model id, dataset id, species, moves) per row; None once removed
+        self._vectors = np.zeros((1024, len(SPREAD_SCALE)), dtype=np.float32)
+        self._row_by_set = {}
+        self._max_set_id = None
+        self._rows_by_model = defaultdict(list)
+        self._spread_buckets = defaultdict(list)
+        self._move_buckets = defaultdict(list)
+
+    # --- Hashing ---
+
+    def _spread_keys(self, vector: np.ndarray) -> list:
+        bits = (self._hyperplanes @ vector) > 0
+        codes = bits.astype(np.int64) @ self._bit_weights
+        return [(table, int(code)) for table, code in enumerate(codes)]
+
+    def minhash(self, moves) -> np.ndarray | None:
+        keys = {normalize_term(move) for move in moves if move and move.strip()}
+        if not keys:
+            return None
+        hashes = np.fromiter((zlib.crc32(key.encode("utf-8")) for key in keys), dtype=np.int64, count=len(keys))
+        permuted = (self._hash_a[:, None] * (hashes[None, :] % _MERSENNE_PRIME) + self._hash_b[:, None]) % (
+            _MERSENNE_PRIME
+        )
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def _move_keys(signature: np.ndarray) -> list:
+        bands = signature.reshape(MINHASH_BANDS, MINHASH_ROWS)
+        return [(band, tuple(values)) for band, values in enumerate(bands.tolist())]
+
+    # --- Building and incremental updates ---
+
+    def _add(self, set_id, model_id, dataset_id, species, evs: dict, ivs: dict, moves: list):
+        if set_id in self._row_by_set:
+            return
+        row = len(self._rows)
+        move_keys = frozenset(normalize_term(move) for move in moves if move and move.strip())
+        self._rows.append((set_id, model_id, dataset_id, species, move_keys))
+        self._row_by_set[set_id] = row
+        self._max_set_id = set_id if self._max_set_id is None else max(self._max_set_id, set_id)
+        self._rows_by_model[model_id].append(row)
+
+        vector = spread_vector(evs, ivs)
+        if row == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._vectors[row] = vector
+        for key in self._spread_keys(vector):
+            self._spread_buckets[key].append(row)
+
+        signature = self.minhash(moves)
+        if signature is not None:
+            for key in self._move_keys(signature):
+                self._move_buckets[key].append(row)
+
+    @staticmethod
+    def _stats_from_columns(values, columns) -> dict:
+        return {column[3:]: value for column, value in zip(columns, values) if value is not None}
+
+    def build(self):
+        """Indexes every stored PokeSet."""
+        columns = [PokeSet.species, PokeSet.moves] + [getattr(PokeSet, c) for c in EV_COLUMNS + IV_COLUMNS]
+        with self._lock:
+            self._reset()
+            for row in PokeSetRepository().iter_with_dataset(*columns):
+                set_id, model_id, dataset_id, species, moves = row[:5]
+                self._add(
+                    set_id,
+                    model_id,
+                    dataset_id,
+                    species,
+                    self._stats_from_columns(row[5:11], EV_COLUMNS),
+                    self._stats_from_columns(row[11:17], IV_COLUMNS),
+                    moves.split("\n") if moves else [],
+                )
+            self.loaded = True
+
+    def ensure_fresh(self):
+        with self._lock:
+            if not self.loaded or self.signature() != PokeSetRepository().get_signature():
+                self.build()
+
+    def signature(self) -> tuple:
+        """Same (count, highest set id) pair as PokeSetRepository.get_signature()."""
+        with self._lock:
+            return (len(self._row_by_set), self._max_set_id)
+
+    def add_models(self, poke_models):
+        """Indexes the sets of new models. Nothing to do until the index has been built."""
+        with self._lock:
+            if not self.loaded:
+                return
+            for poke_model in poke_models:
+                for poke_set in poke_model.poke_sets:
+                    self._add(
+                        poke_set.id,
+                        poke_model.id,
+                        poke_model.data_set_id,
+                        poke_set.species,
+                        poke_set.get_evs(),
+                        poke_set.get_ivs(),
+                        poke_set.get_moves(),
+                    )
+
+    def remove_models(self, model_ids):
+        """Removed rows stay in their buckets but are skipped by queries; a rebuild drops them for good."""
+        with self._lock:
+            for model_id in model_ids:
+                for row in self._rows_by_model.pop(model_id, []):
+                    set_id = self._rows[row][0]
+                    self._rows[row] = None
+                    self._row_by_set.pop(set_id, None)
+            self._max_set_id = max(self._row_by_set) if self._row_by_set else None
+
+    # --- Queries ---
+
+    def _result(self, row: int, score: float) -> dict:
+        set_id, model_id, dataset_id, species, _ = self._rows[row]
+        return {
+            "set_id": set_id,
+            "poke_model_id": model_id,
+            "dataset_id": dataset_id,
+            "species": species,
+            "score": round(float(score), 4),
+        }
+
+    def _candidates(self, buckets, keys, exclude_models) -> np.ndarray:
+        rows = set()
+        for key in keys:
+            rows.update(buckets.get(key, ()))
+        return np.fromiter(
+            (row for row in rows if self._rows[row] is not None and self._rows[row][1] not in exclude_models),
+            dtype=np.int64,
+        )
+
+    def similar_by_spread(self, evs: dict, ivs: dict, k: int = 10, exclude_models=()) -> list:
+        vector = spread_vector(evs, ivs)
+        with self._lock:
+            candidates = self._candidates(self._spread_buckets, self._spread_keys(vector), set(exclude_models))
+            if not len(candidates):
+                return []
+            scores = self._vectors[candidates] @ vector
+            top = np.argsort(-scores, kind="stable")[:k]
+            return [self._result(int(candidates[i]), scores[i]) for i in top]
+
+    def similar_by_moves(self, moves, k: int = 10, exclude_models=()) -> list:
+        signature = self.minhash(moves)
+        if signature is None:
+            return []
+        query = frozenset(normalize_term(move) for move in moves if move and move.strip())
+        with self._lock:
+            candidates = self._candidates(self._move_buckets, self._move_keys(signature), set(exclude_models))
+            scored = []
+            for row in candidates.tolist():
+                other = self._rows[row][4]
+                scored.append((len(query & other) / len(query | other), row))
+            scored.sort(key=lambda item: (-item[0], item[1]))
+            return [self._result(row, score) for score, row in scored[:k]]
+
+    def similar(self, evs: dict, ivs: dict, moves, k: int = 10, exclude_models=()) -> dict:
+        return {
+            "by_spread": self.similar_by_spread(evs, ivs, k=k, exclude_models=exclude_models),
+            "by_moves": self.similar_by_moves(moves, k=k, exclude_models=exclude_models),
+        }
+
+
+similar_sets = SimilarSetIndex()
@@ -0,0 +1,340 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+from app.modules.pokemodel.models import STAT_KEYS, PokeSet
+from app.modules.pokemodel.repositories import PokeSetRepository
+from core.configuration.configuration import uploads_root
+
+logger = logging.getLogger(__name__)
+
+EV_COLUMNS = tuple(f"ev_{stat}" for stat in STAT_KEYS)
+IV_COLUMNS = tuple(f"iv_{stat}" for stat in STAT_KEYS)
+STAT_COLUMNS = EV_COLUMNS + IV_COLUMNS
+TOTAL_COLUMNS = ("ev_total", "iv_total")
+# Stats missing from a set take the values Showdown uses: 0 EVs and 31 IVs
+DEFAULT_EV = 0
+DEFAULT_IV = 31
+
+AGGREGATES = ("count", "sum", "mean", "min", "max")
+GROUP_BY = ("species", "dataset", "model")
+FILTER_OPERATORS = {
+    "eq": np.equal,
+    "gt": np.greater,
+    "gte": np.greater_equal,
+    "lt": np.less,
+    "lte": np.less_equal,
+}
+
+DEFAULT_STATS_PATH = os.path.join(uploads_root(), "cache", "poke_stats.npz")
+
+
+class PokeStatsStore:
+    """
+    Columnar copy of the EVs and IVs of every stored PokeSet, one row per set.
+
+    Rows live in preallocated NumPy arrays (ids, species codes and a 12-column stat matrix) so filters,
+    group-bys and aggregates are vectorized. Deleted models are only flagged and compacted in bulk.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._reset()
+
+    def __len__(self):
+        return int(self._alive[: self._size].sum())
+
+    def _reset(self, capacity: int = 1024):
+        self._size = 0
+        self._dead = 0
+        self.set_ids = np.zeros(capacity, dtype=np.int64)
+        self.model_ids = np.zeros(capacity, dtype=np.int64)
+        self.dataset_ids = np.zeros(capacity, dtype=np.int64)
+        self.species_codes = np.zeros(capacity, dtype=np.int32)
+        self.values = np.zeros((capacity, len(STAT_COLUMNS)), dtype=np.int32)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self.species = []
+        self._species_index = {}
+
+    def _species_code(self, name: str) -> int:
+        code = self._species_index.get(name)
+        if code is None:
+            code = len(self.species)
+            self.species.append(name)
+            self._species_index[name] = code
+        return code
+
+    def _reserve(self, extra: int):
+        capacity = len(self.set_ids)
+        needed = self._size + extra
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("set_ids", "model_ids", "dataset_ids", "species_codes", "values", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def _append(self, rows: list):
+        """`rows` holds (set id, model id, dataset id, species, 12 stat values) tuples."""
+        if not rows:
+            return
+        self._reserve(len(rows))
+        start, end = self._size, self._size + len(rows)
+        set_ids, model_ids, dataset_ids, species, values = zip(*rows)
+        self.set_ids[start:end] = set_ids
+        self.model_ids[start:end] = model_ids
+        self.dataset_ids[start:end] = dataset_ids
+        self.species_codes[start:end] = [self._species_code(name) for name in species]
+        self.values[start:end] = values
+        self._alive[start:end] = True
+        self._size = end
+
+    @staticmethod
+    def _row_values(evs, ivs) -> list:
+        return [DEFAULT_EV if value is None else value for value in evs] + [
+            DEFAULT_IV if value is None else value for value in ivs
+        ]
+
+    def _compact(self):
+        alive = self._alive[: self._size]
+        count = int(alive.sum())
+        for name in ("set_ids", "model_ids", "dataset_ids", "species_codes", "values"):
+            array = getattr(self, name)
+            array[:count] = array[: self._size][alive]
+        self._alive[:count] = True
+        self._alive[count:] = False
+        self._size = count
+        self._dead = 0
+
+    # --- Building, persistence and freshness ---
+
+    def build(self):
+        """Loads every PokeSet from the database."""
+        columns = [PokeSet.species] + [getattr(PokeSet, column) for column in STAT_COLUMNS]
+        with self._lock:
+            self._reset()
+            batch = []
+            for row in PokeSetRepository().iter_with_dataset(*columns):
+                batch.append((row[0], row[1], row[2], row[3], self._row_values(row[4:10], row[10:16])))
+                if len(batch) == 5000:
+                    self._append(batch)
+                    batch = []
+            self._append(batch)
+            self.loaded = True
+
+    def save(self, path: str | None = None):
+        path = path or self.path
+        with self._lock:
+            alive = self._alive[: self._size]
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                set_ids=self.set_ids[: self._size][alive],
+                model_ids=self.model_ids[: self._size][alive],
+                dataset_ids=self.dataset_ids[: self._size][alive],
+                species_codes=self.species_codes[: self._size][alive],
+                values=self.values[: self._size][alive],
+                species=np.array(self.species, dtype=str),
+            )
+            os.replace(tmp_path, path)
+
+    def load(self, path: str | None = None) -> bool:
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"Could not load EV/IV stats from {path}: {exc}")
+            return False
+
+        with self._lock:
+            count = len(arrays["set_ids"])
+            self._reset(capacity=max(1024, count))
+            self.set_ids[:count] = arrays["set_ids"]
+            self.model_ids[:count] = arrays["model_ids"]
+            self.dataset_ids[:count] = arrays["dataset_ids"]
+            self.species_codes[:count] = arrays["species_codes"]
+            self.values[:count] = arrays["values"]
+            self._alive[:count] = True
+            self._size = count
+            self.species = [str(name) for name in arrays["species"]]
+            self._species_index = {name: code for code, name in enumerate(self.species)}
+            self.loaded = True
+        return True
+
+    def signature(self) -> tuple:
+        """(number of sets, highest set id); compared with the database to detect changes made elsewhere."""
+        with self._lock:
+            alive = self._alive[: self._size]
+            if not alive.any():
+                return (0, None)
+            return (int(alive.sum()), int(self.set_ids[: self._size][alive].max()))
+
+    def ensure_fresh(self):
+        """Starts from the .npz snapshot when possible and rebuilds when other workers changed the sets."""
+        with self._lock:
+            if not self.loaded:
+                self.load()
+            if self.loaded and self.signature() == PokeSetRepository().get_signature():
+                return
+            self.build()
+            if self.path:
+                try:
+                    self.save()
+                except OSError as exc:
+                    logger.warning(f"Could not save EV/IV stats to {self.path}: {exc}")
+
+    # --- Incremental updates ---
+
+    def add_models(self, poke_models):
+        """Adds (or replaces) the sets of the given models. Nothing to do until the store has been loaded."""
+        with self._lock:
+            if not self.loaded:
+                return
+            self.remove_models([poke_model.id for poke_model in poke_models])
+            self._append(
+                [
+                    (
+                        poke_set.id,
+                        poke_model.id,
+                        poke_model.data_set_id,
+                        poke_set.species,
+                        self._row_values(
+                            [getattr(poke_set, column) for column in EV_COLUMNS],
+                            [getattr(poke_set, column) for column in IV_COLUMNS],
+                        ),
+                    )
+                    for poke_model in poke_models
+                    for poke_set in poke_model.poke_sets
+                ]
+            )
+
+    def remove_models(self, model_ids):
+        with self._lock:
+            if not self.loaded or self._size == 0:
+                return
+            removed = self._alive[: self._size] & np.isin(self.model_ids[: self._size], list(model_ids))
+            count = int(removed.sum())
+            if not count:
+                return
+            self._alive[: self._size][removed] = False
+            self._dead += count
+            if self._dead * 2 > self._size:
+                self._compact()
+
+    # --- Queries ---
+
+    def column(self, name: str) -> np.ndarray:
+        values = self.values[: self._size]
+        if name in STAT_COLUMNS:
+            return values[:, STAT_COLUMNS.index(name)]
+        if name == "ev_total":
+            return values[:, : len(EV_COLUMNS)].sum(axis=1, dtype=np.int32)
+        if name == "iv_total":
+            return values[:, len(EV_COLUMNS) :].sum(axis=1, dtype=np.int32)
+        raise ValueError(f"Unknown stat column: {name}")
+
+    def filter(self, species=None, dataset_ids=None, model_ids=None, conditions=None) -> np.ndarray:
+        """
+        Boolean mask over the rows. `conditions` maps "<column>__<op>" (op in eq, gt, gte, lt, lte)
+        to a number, e.g. {"ev_spe__gte": 252}.
+        """
+        with self._lock:
+            mask = self._alive[: self._size].copy()
+            if species:
+                codes = [self._species_index[name] for name in species if name in self._species_index]
+                mask &= np.isin(self.species_codes[: self._size], codes)
+            if dataset_ids:
+                mask &= np.isin(self.dataset_ids[: self._size], list(dataset_ids))
+            if model_ids:
+                mask &= np.isin(self.model_ids[: self._size], list(model_ids))
+            for key, value in (conditions or {}).items():
+                name, _, operator = key.rpartition("__")
+                if operator not in FILTER_OPERATORS:
+                    raise ValueError(f"Unknown filter operator: {operator}")
+                mask &= FILTER_OPERATORS[operator](self.column(name), value)
+            return mask
+
+    def aggregate(self, mask: np.ndarray, columns=STAT_COLUMNS, agg: str = "mean", group_by: str | None = None):
+        """
+        Aggregates the selected rows. Without `group_by` returns {"count", "values"}; with it, one such
+        dict per group plus its "key" (species name, dataset id or model id).
+        """
+        if agg not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {agg}")
+        if group_by is not None and group_by not in GROUP_BY:
+            raise ValueError(f"Unknown group_by: {group_by}")
+
+        with self._lock:
+            matrix = np.column_stack([self.column(name)[mask] for name in columns]).astype(np.int64)
+            if group_by is None:
+                return {"count": int(len(matrix)), "values": self._reduce(matrix, agg, columns)}
+
+            keys = {"species": self.species_codes, "dataset": self.dataset_ids, "model": self.model_ids}[group_by]
+            unique_keys, inverse = np.unique(keys[: self._size][mask], return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(unique_keys))
+
+            if agg in ("sum", "mean"):
+                sums = np.zeros((len(unique_keys), len(columns)), dtype=np.int64)
+                np.add.at(sums, inverse, matrix)
+                reduced = sums / counts[:, None] if agg == "mean" else sums
+            elif agg in ("min", "max"):
+                order = np.argsort(inverse, kind="stable")
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                ufunc = np.minimum if agg == "min" else np.maximum
+                reduced = ufunc.reduceat(matrix[order], starts, axis=0) if len(order) else matrix
+            else:
+                reduced = None
+
+            groups = []
+            for i, key in enumerate(unique_keys.tolist()):
+                values = (
+                    {name: int(counts[i]) for name in columns}
+                    if reduced is None
+                    else dict(zip(columns, reduced[i].tolist()))
+                )
+                groups.append(
+                    {
+                        "key": self.species[key] if group_by == "species" else key,
+                        "count": int(counts[i]),
+                        "values": values,
+                    }
+                )
+            return groups
+
+    def query(
+        self,
+        species=None,
+        dataset_ids=None,
+        model_ids=None,
+        conditions=None,
+        columns=STAT_COLUMNS,
+        agg="mean",
+        group_by=None,
+    ):
+        """filter() + aggregate() under the same lock, so concurrent updates can't change the rows in between."""
+        with self._lock:
+            mask = self.filter(species=species, dataset_ids=dataset_ids, model_ids=model_ids, conditions=conditions)
+            return self.aggregate(mask, columns=columns, agg=agg, group_by=group_by)
+
+    @staticmethod
+    def _reduce(matrix: np.ndarray, agg: str, columns) -> dict:
+        if agg == "count":
+            return {name: int(len(matrix)) for name in columns}
+        if not len(matrix):
+            return {name: None for name in columns}
+        reduced = {"sum": matrix.sum, "mean": matrix.mean, "min": matrix.min, "max": matrix.max}[agg](axis=0)
+        return dict(zip(columns, reduced.tolist()))
+
+
+poke_stats = PokeStatsStore(path=os.getenv("POKE_STATS_PATH", DEFAULT_STATS_PATH))
@@ -74,3 +74,86 @@ def test_poke_model_service_counts(test_client, pokemodel_seed):
         svc = PokeModelService()
         count = svc.count_poke_models()
         assert count >= 1
+
+
+def test_store_poke_sets_persists_parsed_content(test_client, pokemodel_seed, tmp_path):
+    from app.modules.dataset.services import DataSetService
+    from app.modules.pokemodel.repositories import PokeSetRepository
+
+    poke_file = tmp_path / "glimmora.poke"
+    poke_file.write_text(
+        "Glimmora @ Focus Sash\nAbility: Toxic Debris\nEVs: 252 SpA / 4 SpD / 252 Spe\n- Mortal Spin\n- Power Gem\n",
+        encoding="utf-8",
+    )
+
+    with test_client.application.app_context():
+        pm = PokeModel.query.filter(PokeModel.data_set_id == 8).first()
+        DataSetService().store_poke_sets(pm, str(poke_file))
+        db.session.commit()
+
+        assert [poke_set.species for poke_set in pm.poke_sets] == ["Glimmora"]
+        assert pm.poke_sets[0].get_total_evs() == 508
+        assert ("Glimmora", 1) in PokeSetRepository().count_species_by_dataset(8)
+        assert pm not in PokeSetRepository().get_poke_models_without_sets()
+
+
+def test_poke_model_stats_endpoint(test_client, pokemodel_seed, tmp_path, monkeypatch):
+    from app.modules.pokemodel.stats import poke_stats
+
+    monkeypatch.setattr(poke_stats, "path", str(tmp_path / "poke_stats.npz"))
+    poke_stats.loaded = False
+
+    resp = test_client.get("/poke_model/stats?group_by=species&stats=ev_total&agg=max")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["stats"] == ["ev_total"]
+    assert all(set(group) == {"key", "count", "values"} for group in body["groups"])
+    assert (tmp_path / "poke_stats.npz").exists()
+
+    resp = test_client.get("/poke_model/stats?stats=ev_spe&ev_spe__gte=252")
+    assert resp.status_code == 200
+    assert set(resp.get_json()) == {"agg", "stats", "count", "values"}
+
+    assert test_client.get("/poke_model/stats?agg=median").status_code == 400
+    assert test_client.get("/poke_model/stats?stats=speed").status_code == 400
+
+
+def test_poke_model_similar_endpoints(test_client, pokemodel_seed, tmp_path):
+    import io
+
+    from app.modules.dataset.services import DataSetService
+    from app.modules.pokemodel.similarity import similar_sets
+
+    content = "Kingambit @ Leftovers\nEVs: 252 HP / 252 Atk / 4 SpD\n- Sucker Punch\n- Kowtow Cleave\n- Iron Head\n"
+    poke_file = tmp_path / "kingambit.poke"
+    poke_file.write_text(content, encoding="utf-8")
+
+    with test_client.application.app_context():
+        pm = PokeModel(data_set_id=8, fm_meta_data_id=PokeModel.query.first().fm_meta_data_id)
+        db.session.add(pm)
+        db.session.flush()
+        DataSetService().store_poke_sets(pm, str(poke_file))
+        db.session.commit()
+        pm_id = pm.id
+    similar_sets.loaded = False
+
+    resp = test_client.get(f"/poke_model/{pm_id}/similar?k=3")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["query"] == {"poke_model_id": pm_id, "species": "Kingambit"}
+    assert pm_id not in [r["poke_model_id"] for r in body["by_spread"] + body["by_moves"]]
+
+    resp = test_client.post(
+        "/poke_model/similar",
+        data={"file": (io.BytesIO(content.encode("utf-8")), "query.poke")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["by_spread"][0]["poke_model_id"] == pm_id
+    assert body["by_moves"][0] == {**body["by_moves"][0], "poke_model_id": pm_id, "score": 1.0}
+
+    resp = test_client.post(
+        "/poke_model/similar", data={"file": (io.BytesIO(b""), "empty.poke")}, content_type="multipart/form-data"
+    )
+    assert resp.status_code == 400
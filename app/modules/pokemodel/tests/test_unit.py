@@ -4,7 +4,12 @@ from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 
-from app.modules.pokemodel.models import FMMetaData, FMMetrics, PokeModel, parse_poke
+from app.modules.pokemodel.cache import invalidate_pokemon
+from app.modules.pokemodel.inverted_index import PokeInvertedIndex, intersect
+from app.modules.pokemodel.models import FMMetaData, FMMetrics, PokeModel, PokeSet, iter_poke, parse_poke
+from app.modules.pokemodel.similarity import SimilarSetIndex
+from app.modules.pokemodel.stats import PokeStatsStore
+from core.cache.lru_cache import LRUCache
 
 
 @pytest.fixture(scope="module")
@@ -223,7 +228,8 @@ IVs: 31SpA/31 Spe
         os.remove(path)
 
 
-def test_get_pokemon_delegates_to_parse_poke(test_client):
+def test_get_pokemon_delegates_to_parse_poke(test_client, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", "/srv/app")
     pm = PokeModel()
 
     class DS:
@@ -234,6 +240,8 @@ def test_get_pokemon_delegates_to_parse_poke(test_client):
 
     hubfile_mock = MagicMock()
     hubfile_mock.name = "dummy.poke"
+    # Written before storage paths were stored, so it is resolved through its dataset
+    hubfile_mock.storage_path = None
 
     pm.__dict__["data_set"] = ds
     pm.data_set_id = 5
@@ -248,17 +256,249 @@ def test_get_pokemon_delegates_to_parse_poke(test_client):
         mock_parse.return_value = "parsed_result"
 
         with test_client.application.app_context():
-            test_client.application.root_path = "/srv/app/myapp"
-
             res = pm.get_pokemon()
 
     # Verificaciones
     assert res == "parsed_result"
 
     # Reconstruimos la ruta esperada para verificar la llamada
-    parent = os.path.dirname("/srv/app/myapp")
-    expected_dir = os.path.join(parent, f"uploads/user_{ds.user_id}/dataset_{pm.data_set_id}/")
+    expected_dir = os.path.join("/srv/app", f"uploads/user_{ds.user_id}/dataset_{pm.data_set_id}/")
     expected_full_path = os.path.join(expected_dir, "dummy.poke")
 
     # Verificamos que parse_poke fue llamado con la ruta correcta
     mock_parse.assert_called_once_with(expected_full_path)
+
+
+def test_lru_cache_counts_hits_misses_and_evictions():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+
+    # "b" is now the least recently used entry
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1}
+
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+
+
+def test_lru_cache_entries_expire_after_the_ttl():
+    cache = LRUCache(maxsize=2, ttl=60)
+    with patch("core.cache.lru_cache.time.monotonic", return_value=1000.0):
+        cache.put("a", 1)
+    with patch("core.cache.lru_cache.time.monotonic", return_value=1059.0):
+        assert cache.get("a") == 1
+    with patch("core.cache.lru_cache.time.monotonic", return_value=1060.0):
+        assert "a" not in cache
+        assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_get_pokemon_is_cached_by_checksum(test_client):
+    pm = PokeModel()
+
+    class DS:
+        user_id = 3
+
+    hubfile_mock = MagicMock()
+    hubfile_mock.name = "cached.poke"
+    hubfile_mock.checksum = "checksum-get-pokemon-cache"
+
+    pm.__dict__["data_set"] = DS()
+    pm.data_set_id = 9
+    pm.__dict__["files"] = [hubfile_mock]
+
+    with patch("app.modules.pokemodel.models.parse_poke") as mock_parse:
+        mock_parse.return_value = Mock(evs={"Atk": 252, "Spe": 252}, ivs={"Atk": 31})
+
+        with test_client.application.app_context():
+            assert pm.get_total_evs() == 504
+            assert pm.get_total_ivs() == 31
+            pm.get_pokemon()
+
+        mock_parse.assert_called_once()
+
+        assert invalidate_pokemon(checksum="checksum-get-pokemon-cache") is True
+        with test_client.application.app_context():
+            pm.get_pokemon()
+        assert mock_parse.call_count == 2
+
+    invalidate_pokemon(checksum="checksum-get-pokemon-cache")
+
+
+def test_poke_set_columns_from_parsed_data_round_trip():
+    parsed_data = {
+        "pokemon": "Glimmora",
+        "item": "Focus Sash",
+        "ability": "Toxic Debris",
+        "tera_type": "Ghost",
+        "evs": {"spa": 252, "spd": 4, "spe": 252},
+        "ivs": {"atk": 0},
+        "moves": ["Mortal Spin", "Stealth Rock", "Power Gem", "Earth Power"],
+    }
+
+    columns = PokeSet.columns_from_parsed_data(parsed_data)
+    assert columns["species"] == "Glimmora"
+    assert columns["ev_spa"] == 252 and columns["ev_hp"] is None
+    assert columns["iv_atk"] == 0
+
+    pokemon = PokeSet(**columns).to_pokemon()
+    assert pokemon.name == "Glimmora"
+    assert pokemon.item == "Focus Sash"
+    assert pokemon.tera_type == "Ghost"
+    assert pokemon.evs == {"spa": 252, "spd": 4, "spe": 252}
+    assert pokemon.ivs == {"atk": 0}
+    assert pokemon.moves == parsed_data["moves"]
+
+
+def test_poke_set_copy_drops_identity():
+    poke_set = PokeSet(id=4, poke_model_id=2, position=1, species="Snorlax", moves="Rest")
+    copied = poke_set.copy()
+    assert copied.id is None and copied.poke_model_id is None
+    assert copied.species == "Snorlax" and copied.position == 1 and copied.get_moves() == ["Rest"]
+
+
+def test_iter_poke_yields_every_set_of_a_team_file():
+    content = """Garchomp @ Rocky Helmet
+Ability: Rough Skin
+- Earthquake
+
+Corviknight @ Leftovers
+Ability: Pressure
+- Roost
+"""
+    path = _write_temp_file(content)
+    try:
+        assert [pokemon.name for pokemon in iter_poke(path)] == ["Garchomp", "Corviknight"]
+        # parse_poke keeps returning the first set
+        assert parse_poke(path).name == "Garchomp"
+    finally:
+        os.remove(path)
+
+
+def _stats_model(model_id, dataset_id, *sets):
+    poke_sets = [PokeSet(id=model_id * 10 + i, **columns) for i, columns in enumerate(sets)]
+    return Mock(id=model_id, data_set_id=dataset_id, poke_sets=poke_sets)
+
+
+def test_poke_stats_store_filters_groups_and_aggregates(tmp_path):
+    store = PokeStatsStore(path=str(tmp_path / "stats.npz"))
+    store.loaded = True
+    store.add_models(
+        [
+            _stats_model(1, 100, {"species": "Garchomp", "ev_atk": 252, "ev_spe": 252, "iv_spa": 0}),
+            _stats_model(2, 100, {"species": "Garchomp", "ev_hp": 252, "ev_spe": 4}),
+            _stats_model(3, 200, {"species": "Toxapex", "ev_hp": 252, "ev_def": 252}, {"species": "Garchomp"}),
+        ]
+    )
+
+    assert store.query(species=["Garchomp"], columns=("ev_spe",))["values"] == {"ev_spe": (252 + 4 + 0) / 3}
+    # Missing IVs count as 31
+    assert store.query(model_ids=[1], columns=("iv_spa", "iv_spe"), agg="max")["values"] == {"iv_spa": 0, "iv_spe": 31}
+
+    groups = store.query(columns=("ev_hp", "ev_total"), agg="sum", group_by="species")
+    assert groups == [
+        {"key": "Garchomp", "count": 3, "values": {"ev_hp": 252, "ev_total": 760}},
+        {"key": "Toxapex", "count": 1, "values": {"ev_hp": 252, "ev_total": 504}},
+    ]
+    by_dataset = store.query(columns=("ev_spe",), agg="min", group_by="dataset", conditions={"ev_total__gte": 256})
+    assert by_dataset == [
+        {"key": 100, "count": 2, "values": {"ev_spe": 4}},
+        {"key": 200, "count": 1, "values": {"ev_spe": 0}},
+    ]
+
+    with pytest.raises(ValueError):
+        store.query(conditions={"ev_spe__near": 1})
+
+    # Incremental delete, then a warm start from the snapshot
+    store.remove_models([3])
+    assert len(store) == 2
+    store.save()
+
+    warm = PokeStatsStore(path=str(tmp_path / "stats.npz"))
+    assert warm.load()
+    assert warm.signature() == store.signature() == (2, 20)
+    assert warm.query(agg="count", columns=("ev_hp",)) == {"count": 2, "values": {"ev_hp": 2}}
+
+
+def test_similar_set_index_ranks_by_spread_and_moves():
+    index = SimilarSetIndex()
+    index.loaded = True
+    sweeper = {"ev_atk": 252, "ev_spe": 252, "ev_hp": 4}
+    sweeper_moves = "Earthquake\nDragon Claw\nSwords Dance\nFire Fang"
+    index.add_models(
+        [
+            _stats_model(1, 100, {"species": "Garchomp", "moves": sweeper_moves, **sweeper}),
+            _stats_model(2, 100, {"species": "Garchomp", "moves": "Earthquake\nDragon Claw\nStealth Rock\nFire Fang"}),
+            _stats_model(3, 200, {"species": "Toxapex", "moves": "Scald\nRecover\nHaze\nToxic", "ev_hp": 252}),
+        ]
+    )
+    assert len(index) == 3
+
+    by_spread = index.similar_by_spread({"atk": 252, "spe": 252, "hp": 4}, {}, k=1)
+    assert [(r["poke_model_id"], r["score"]) for r in by_spread] == [(1, 1.0)]
+
+    by_moves = index.similar_by_moves(["earthquake", "Dragon Claw", "Swords-Dance", "Fire Fang"], k=5)
+    assert [r["poke_model_id"] for r in by_moves][:2] == [1, 2]
+    assert by_moves[0]["score"] == 1.0 and by_moves[1]["score"] == 0.6
+    assert 3 not in [r["poke_model_id"] for r in by_moves]
+
+    # Excluded and removed models never come back
+    assert 1 not in [r["poke_model_id"] for r in index.similar_by_moves(sweeper_moves.split("\n"), exclude_models={1})]
+    index.remove_models([1])
+    assert len(index) == 2 and index.signature() == (2, 30)
+    assert 1 not in [r["poke_model_id"] for r in index.similar_by_spread({"atk": 252, "spe": 252, "hp": 4}, {})]
+    assert index.similar_by_moves([]) == []
+
+
+def test_poke_inverted_index_and_or_queries_and_snapshot(tmp_path):
+    index = PokeInvertedIndex(path=str(tmp_path / "index.npz"))
+    index.loaded = True
+    index.add_models(
+        [
+            _stats_model(3, 100, {"species": "Hatterene", "item": "Leftovers", "moves": "Trick Room\nPsychic"}),
+            _stats_model(1, 100, {"species": "Porygon2", "item": "Eviolite", "moves": "Trick-Room\nRecover"}),
+            _stats_model(
+                2,
+                200,
+                {"species": "Garchomp", "item": "Leftovers", "tera_type": "Steel", "moves": "Earthquake"},
+                {"species": "Toxapex", "ability": "Regenerator", "moves": "Recover"},
+            ),
+        ]
+    )
+
+    assert index.search([("move", ["trick room"])]) == [1, 3]
+    assert index.search([("move", ["Trick Room"]), ("item", ["leftovers"])]) == [3]
+    assert index.search([("move", ["Recover"]), ("item", ["Leftovers"])]) == [2]
+    assert index.search([("item", ["Eviolite", "Leftovers"])]) == [1, 2, 3]
+    assert index.search([("tera_type", ["Steel"]), ("species", ["Porygon2"])], match="any") == [1, 2]
+    assert index.search([("ability", ["Levitate"])]) == []
+    assert index.terms("item") == [{"value": "Leftovers", "count": 2}, {"value": "Eviolite", "count": 1}]
+    with pytest.raises(ValueError):
+        index.search([("nature", ["Bold"])])
+
+    index.remove_models([3])
+    assert index.search([("move", ["Trick Room"])]) == [1]
+    assert index.signature() == (3, 21)
+    index.save()
+
+    warm = PokeInvertedIndex(path=str(tmp_path / "index.npz"))
+    assert warm.load()
+    assert warm.signature() == index.signature()
+    assert warm.search([("move", ["Recover"])]) == [1, 2]
+    assert warm.dataset_of(2) == 200
+    # Reindexing a model replaces its terms
+    warm.add_models([_stats_model(2, 200, {"species": "Garchomp", "moves": "Earthquake"})])
+    assert warm.search([("move", ["Recover"])]) == [1]
+
+
+def test_intersect_sorted_posting_lists():
+    import numpy as np
+
+    left = np.array([1, 4, 9, 12, 40], dtype=np.int64)
+    assert intersect(left, np.array([4, 5, 12, 41], dtype=np.int64)).tolist() == [4, 12]
+    assert intersect(left, np.zeros(0, dtype=np.int64)).tolist() == []
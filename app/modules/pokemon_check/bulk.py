@@ -0,0 +1,119 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain
+
+from core.pokemon_check.workers import check_batch
+
+BULK_WORKERS = int(os.getenv("POKE_BULK_WORKERS", str(os.cpu_count() or 1)))
+# Cada tarea del pool valida un lote de archivos para no pagar el coste de IPC por archivo
+BULK_BATCH_SIZE = int(os.getenv("POKE_BULK_BATCH_SIZE", "64"))
+# Lotes enviados al pool pendientes de recoger; acota la memoria usada con archivos ZIP enormes
+BULK_MAX_PENDING = int(os.getenv("POKE_BULK_MAX_PENDING", str(2 * BULK_WORKERS)))
+
+
+# Pool compartido por todas las peticiones del proceso; se crea con la primera que lo necesita
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    # Los workers no heredan una copia del proceso web (hilos, conexiones a la BD): forkserver, o spawn si no existe.
+    # El forkserver importa el validador una sola vez y cada worker parte de esa copia ya importada. Solo el
+    # validador: importar este módulo importaría el paquete `app`, y con él crearía otra aplicación
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([check_batch.__module__])
+    return context
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos compartido; `workers` solo fija su tamaño cuando se crea."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Retira un pool roto (murió un worker) para que la siguiente petición cree otro."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pool():
+    """Cierra el pool compartido al terminar el proceso de la aplicación."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _batches(members, size: int):
+    batch = []
+    for member in members:
+        batch.append(member)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_members(
+    members, workers: int | None = None, batch_size: int | None = None, max_pending: int | None = None
+):
+    """
+    Valida en paralelo un iterable de pares (nombre, bytes) y devuelve (nombre, bytes, informe) en el mismo orden.
+
+    Los miembros se consumen bajo demanda: como mucho hay `max_pending` lotes en vuelo, así que un ZIP con
+    miles de archivos no se descomprime entero en memoria. Si solo hay un lote se valida en este proceso.
+    """
+    workers = BULK_WORKERS if workers is None else workers
+    batch_size = batch_size or BULK_BATCH_SIZE
+    max_pending = max_pending or BULK_MAX_PENDING
+
+    batches = _batches(members, batch_size)
+    first = next(batches, None)
+    if first is None:
+        return
+    second = next(batches, None)
+
+    if second is None or workers <= 1:
+        for batch in chain([first], [second] if second else [], batches):
+            for (name, data), report in zip(batch, check_batch(batch)):
+                yield name, data, report
+        return
+
+    pool = get_pool(workers)
+    pending = deque()
+    try:
+        for batch in chain([first, second], batches):
+            if len(pending) >= max_pending:
+                done_batch, future = pending.popleft()
+                for (name, data), report in zip(done_batch, future.result()):
+                    yield name, data, report
+            pending.append((batch, pool.submit(check_batch, batch)))
+
+        while pending:
+            done_batch, future = pending.popleft()
+            for (name, data), report in zip(done_batch, future.result()):
+                yield name, data, report
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # Si el cliente abandona la respuesta, los lotes que aún no han empezado no se validan
+        for _, future in pending:
+            future.cancel()
@@ -4,7 +4,7 @@ from flask import jsonify
 
 from app.modules.hubfile.services import HubfileService
 from app.modules.pokemon_check import pokemon_check_bp
-from app.modules.pokemon_check.check_poke import PokemonSetChecker
+from core.pokemon_check.check_poke import PokemonSetChecker
 
 logger = logging.getLogger(__name__)
 
@@ -1,7 +1,12 @@
 import json
 from unittest.mock import MagicMock, patch
 
-from app.modules.pokemon_check.check_poke import PokemonSetChecker
+import pytest
+
+from app.modules.pokemon_check.bulk import validate_members
+from core.pokemon_check.check_poke import PokemonSetChecker
+from core.pokemon_check.parser import iter_sets, parse_set
+from core.pokemon_check.workers import check_member
 
 # --- Tests para PokemonSetChecker ---
 
@@ -141,3 +146,162 @@ def test_check_poke_file_not_found(mock_hubfile_service, test_client):
     assert response.status_code == 404
     data = json.loads(response.data)
     assert "El archivo no existe." in data["errors"]
+
+
+# --- Tests para el tokenizador compartido ---
+
+
+def test_parse_set_full_showdown_grammar():
+    content = """Mimikyu the Ghost (Mimikyu) (F) @ Life Orb
+Ability: Disguise
+Level: 50
+Shiny: Yes
+Happiness: 160
+Tera Type: Fairy
+EVs: 4 HP / 252 Attack / 252 Speed
+Adamant Nature
+IVs: 30 Sp. Atk / 31 Sp. Def
+- Swords Dance
+- Play Rough
+- Shadow Sneak
+- Drain Punch
+"""
+    parsed = parse_set(content)
+
+    assert parsed.is_valid(), parsed.errors
+    assert parsed.species == "Mimikyu"
+    assert parsed.nickname == "Mimikyu the Ghost"
+    assert parsed.gender == "F"
+    assert parsed.item == "Life Orb"
+    assert parsed.level == 50
+    assert parsed.shiny is True
+    assert parsed.happiness == 160
+    assert parsed.nature == "Adamant"
+    assert parsed.evs == {"hp": 4, "atk": 252, "spe": 252}
+    assert parsed.ivs == {"spa": 30, "spd": 31}
+    assert len(parsed.moves) == 4
+    assert not hasattr(parsed, "__dict__")
+
+
+def test_parse_set_reports_grammar_errors_in_same_pass():
+    content = "Pikachu @ Light Ball\nAbility: Static\nLevel: 120\nSilly Nature\nEVs: 4 Foo\n- Volt Tackle"
+    parsed = parse_set(content)
+
+    assert not parsed.is_valid()
+    assert "Nivel no válido: 120. Debe estar entre 1 y 100." in parsed.errors
+    assert "Naturaleza no válida: Silly" in parsed.errors
+    assert "Stat desconocido: 'Foo'" in parsed.errors
+
+
+def test_parse_set_strict_mode_raises_on_malformed_stats():
+    with pytest.raises(ValueError):
+        parse_set("Bulbasaur\nEVs: 252Atk\n- Vine Whip", strict=True)
+
+    assert parse_set("   \n\n") is None
+
+
+def test_checker_exposes_extended_fields():
+    checker = PokemonSetChecker("Garchomp @ Choice Scarf\nAbility: Rough Skin\nJolly Nature\n- Earthquake")
+    assert checker.is_valid()
+    assert checker.get_parsed_data()["nature"] == "Jolly"
+
+
+TEAM_EXPORT = """=== [gen9ou] Equipo de prueba ===
+
+Great Tusk @ Booster Energy
+Ability: Protosynthesis
+EVs: 252 Atk / 4 SpD / 252 Spe
+Jolly Nature
+- Headlong Rush
+- Ice Spinner
+
+Kingambit @ Black Glasses
+Ability: Supreme Overlord
+
+- Kowtow Cleave
+- Sucker Punch
+
+Gholdengo @ Choice Scarf
+Ability: Good as Gold
+Tera Type: Plasma
+- Make It Rain
+"""
+
+
+def test_iter_sets_splits_team_exports_lazily():
+    sets = iter_sets(iter(TEAM_EXPORT.splitlines()))
+
+    first = next(sets)
+    assert first.species == "Great Tusk"
+    assert first.moves == ["Headlong Rush", "Ice Spinner"]
+
+    # A blank line followed by moves or "Key: value" lines still belongs to the same set
+    second, third = list(sets)
+    assert second.species == "Kingambit"
+    assert second.moves == ["Kowtow Cleave", "Sucker Punch"]
+    assert third.species == "Gholdengo"
+    assert third.errors == ["Tera Tipo no válido: Plasma"]
+
+
+def test_checker_reports_errors_per_set():
+    checker = PokemonSetChecker(TEAM_EXPORT)
+
+    assert checker.set_count == 3
+    assert checker.get_parsed_data()["pokemon"] == "Great Tusk"
+    assert not checker.is_valid()
+    assert checker.get_set_errors() == [
+        {"position": 2, "pokemon": "Gholdengo", "errors": ["Tera Tipo no válido: Plasma"]}
+    ]
+    assert checker.get_errors() == ["Set 3 (Gholdengo): Tera Tipo no válido: Plasma"]
+
+
+def test_validate_members_keeps_order_across_process_pool():
+    valid = b"Garchomp\nAbility: Rough Skin\n- Earthquake\n"
+    members = [(f"set_{i}.poke", valid if i % 3 else b"Garchomp\n- Earthquake\n") for i in range(10)]
+
+    results = list(validate_members(iter(members), workers=2, batch_size=3, max_pending=2))
+
+    assert [name for name, _, _ in results] == [name for name, _ in members]
+    assert [report["valid"] for _, _, report in results] == [bool(i % 3) for i in range(10)]
+    assert results[1][2]["summary"] == {"pokemon": "Garchomp", "item": None, "ability": "Rough Skin", "sets": 1}
+
+
+def test_validate_members_reuses_one_pool_without_fork():
+    from app.modules.pokemon_check import bulk
+
+    members = [(f"set_{i}.poke", b"Garchomp\nAbility: Rough Skin\n- Earthquake\n") for i in range(4)]
+    try:
+        list(validate_members(iter(members), workers=2, batch_size=1))
+        pool = bulk._pool
+        assert pool is not None
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+
+        list(validate_members(iter(members), workers=2, batch_size=1))
+        assert bulk._pool is pool
+    finally:
+        bulk.shutdown_pool()
+    assert bulk._pool is None
+
+
+def test_pool_workers_do_not_create_the_app():
+    import multiprocessing
+    import subprocess
+    import sys
+
+    from app.modules.pokemon_check import bulk
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        with patch.object(multiprocessing.get_context("forkserver"), "set_forkserver_preload") as preload:
+            bulk._mp_context()
+        assert preload.call_args.args[0] == ["core.pokemon_check.workers"]
+    assert bulk.check_batch.__module__ == "core.pokemon_check.workers"
+
+    # What the workers import must not import `app`, whose import runs create_app
+    code = "import sys, core.pokemon_check.workers; sys.exit('app' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_check_member_rejects_non_utf8():
+    report = check_member("latin.poke", "Flabébé".encode("latin-1"))
+    assert not report["valid"]
+    assert report["summary"] is None
@@ -0,0 +1,12 @@
+import os
+
+from core.cache.lru_cache import LRUCache
+
+# The home page lists (latest and trending datasets) as dataset ids, so the GROUP BY aggregates behind them
+# run once per HOME_LISTS_TTL seconds instead of on every hit. The cards themselves are loaded fresh.
+home_lists_cache = LRUCache(maxsize=4, ttl=int(os.getenv("HOME_LISTS_TTL", "60")))
+
+
+def invalidate_home_lists():
+    """Drops the cached home page lists, e.g. when a dataset is published or unpublished."""
+    home_lists_cache.clear()
@@ -0,0 +1,37 @@
+from app import db
+
+COUNTERS = (
+    "synchronized_datasets",
+    "poke_models",
+    "dataset_views",
+    "dataset_downloads",
+    "poke_model_views",
+    "poke_model_downloads",
+)
+
+
+class SiteCounters(db.Model):
+    """
+    The site-wide totals of the home page, in a single row. Whatever creates or deletes what they count updates
+    them in its own transaction (SiteCountersRepository.add); `rosemary counters:reconcile` recounts them from
+    the tables.
+    """
+
+    __tablename__ = "site_counters"
+
+    ROW_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    synchronized_datasets = db.Column(db.Integer, nullable=False, default=0)
+    poke_models = db.Column(db.Integer, nullable=False, default=0)
+    dataset_views = db.Column(db.Integer, nullable=False, default=0)
+    dataset_downloads = db.Column(db.Integer, nullable=False, default=0)
+    poke_model_views = db.Column(db.Integer, nullable=False, default=0)
+    poke_model_downloads = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def __repr__(self):
+        return f"SiteCounters<{self.to_dict()}>"
@@ -0,0 +1,72 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app.modules.public.models import COUNTERS, SiteCounters
+from core.repositories.BaseRepository import BaseRepository
+
+
+class SiteCountersRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(SiteCounters)
+
+    def add(self, **deltas):
+        """
+        Adds the deltas to the counters in one UPDATE, which is committed with the change they count by the
+        caller. Until the row exists there is nothing to update: get() creates it from a full recount.
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        unknown = set(deltas) - set(COUNTERS)
+        if unknown:
+            raise ValueError(f"Unknown counters: {', '.join(sorted(unknown))}")
+        if deltas:
+            self.session.execute(
+                update(SiteCounters)
+                .where(SiteCounters.id == SiteCounters.ROW_ID)
+                .values({name: getattr(SiteCounters, name) + delta for name, delta in deltas.items()})
+            )
+
+    def get(self) -> SiteCounters:
+        counters = self.session.get(SiteCounters, SiteCounters.ROW_ID)
+        if counters is None:
+            try:
+                counters = self.reconcile()
+                self.session.commit()
+            except IntegrityError:
+                # Another request created the row first
+                self.session.rollback()
+                counters = self.session.get(SiteCounters, SiteCounters.ROW_ID)
+        return counters
+
+    def count_all(self) -> dict:
+        """The totals counted from the tables, one COUNT each."""
+        from app.modules.dataset.repositories import (
+            DataSetRepository,
+            DSDownloadRecordRepository,
+            DSViewRecordRepository,
+        )
+        from app.modules.hubfile.repositories import HubfileDownloadRecordRepository, HubfileViewRecordRepository
+        from app.modules.pokemodel.repositories import PokeModelRepository
+
+        return {
+            "synchronized_datasets": DataSetRepository().count_synchronized_datasets(),
+            "poke_models": PokeModelRepository().count(),
+            "dataset_views": DSViewRecordRepository().count(),
+            "dataset_downloads": DSDownloadRecordRepository().count(),
+            "poke_model_views": HubfileViewRecordRepository().count(),
+            "poke_model_downloads": HubfileDownloadRecordRepository().count(),
+        }
+
+    def reconcile(self) -> SiteCounters:
+        """Overwrites the counters with a full recount, creating the row if needed. Committed by the caller."""
+        totals = self.count_all()
+        counters = self.session.get(SiteCounters, SiteCounters.ROW_ID)
+        if counters is None:
+            counters = SiteCounters(id=SiteCounters.ROW_ID)
+            self.session.add(counters)
+        for name, total in totals.items():
+            setattr(counters, name, total)
+        counters.reconciled_at = datetime.now(timezone.utc)
+        self.session.flush()
+        return counters
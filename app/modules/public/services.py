@@ -0,0 +1,17 @@
+from app.modules.public.repositories import SiteCountersRepository
+from core.services.BaseService import BaseService
+
+
+class SiteCountersService(BaseService):
+    def __init__(self):
+        super().__init__(SiteCountersRepository())
+
+    def get_counters(self) -> dict:
+        return self.repository.get().to_dict()
+
+    def reconcile(self) -> tuple:
+        """Recounts every counter. Returns the counters before and after, so callers can report any drift."""
+        before = self.get_counters()
+        after = self.repository.reconcile().to_dict()
+        self.repository.session.commit()
+        return before, after
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.dataset.repositories import DataSetRepository, DSMetaDataRepository
+from app.modules.dataset.services import DSDownloadRecordService
+from app.modules.hubfile.repositories import HubfileDownloadRecordRepository
+from app.modules.pokemodel.repositories import PokeModelRepository
+from app.modules.public.models import SiteCounters
+from app.modules.public.repositories import SiteCountersRepository
+from app.modules.public.services import SiteCountersService
+
+
+def test_counters_row_is_created_from_the_tables(test_client):
+    with test_client.application.app_context():
+        assert db.session.get(SiteCounters, SiteCounters.ROW_ID) is None
+        assert SiteCountersService().get_counters() == SiteCountersRepository().count_all()
+        assert db.session.get(SiteCounters, SiteCounters.ROW_ID).reconciled_at is not None
+
+
+def test_counters_follow_the_changes_they_count(test_client):
+    with test_client.application.app_context():
+        repository = SiteCountersRepository()
+        user = User.query.filter_by(email="test@example.com").first()
+        meta = DSMetaData(title="Counted", description="d", publication_type=PublicationType.NONE)
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+        db.session.add(dataset)
+        db.session.commit()
+        before = SiteCountersService().get_counters()
+
+        PokeModelRepository().create(data_set_id=dataset.id)
+        PokeModelRepository().create(data_set_id=dataset.id)
+        DSMetaDataRepository().update(meta.id, dataset_doi="10.1234/counted")
+        DSMetaDataRepository().update(meta.id, dataset_doi="10.1234/counted-again")
+        for cookie in ("a", "b"):
+            DSDownloadRecordService().create(
+                dataset_id=dataset.id, download_date=datetime.now(timezone.utc), download_cookie=cookie
+            )
+        HubfileDownloadRecordRepository().record_many([1, 2, 3], None, "cookie")
+
+        db.session.expire_all()
+        after = SiteCountersService().get_counters()
+        assert after == repository.count_all()
+        assert after["poke_models"] - before["poke_models"] == 2
+        assert after["synchronized_datasets"] - before["synchronized_datasets"] == 1
+        assert after["dataset_downloads"] - before["dataset_downloads"] == 2
+        assert after["poke_model_downloads"] - before["poke_model_downloads"] == 3
+
+        # Totals stay right after deletes, unlike the highest id
+        dataset.delete()
+        db.session.expire_all()
+        counters = SiteCountersService().get_counters()
+        assert counters == repository.count_all()
+
+    response = test_client.get("/")
+    assert response.status_code == 200
+    assert f"{counters['dataset_downloads']} datasets downloaded".encode() in response.data
+
+
+def test_reconcile_fixes_drift(test_client):
+    with test_client.application.app_context():
+        service = SiteCountersService()
+        service.get_counters()
+        SiteCountersRepository().add(dataset_views=5, poke_models=-1)
+        db.session.commit()
+
+        before, after = service.reconcile()
+        assert before["dataset_views"] - after["dataset_views"] == 5
+        assert after["poke_models"] - before["poke_models"] == 1
+        db.session.expire_all()
+        assert service.get_counters() == after == SiteCountersRepository().count_all()
+
+
+def test_index_caches_the_dataset_lists_until_a_dataset_is_published(test_client):
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        meta = DSMetaData(
+            title="Freshly published", description="d", publication_type=PublicationType.NONE, tags="fresh"
+        )
+        db.session.add(DataSet(user_id=user.id, ds_meta_data=meta))
+        db.session.commit()
+        meta_id = meta.id
+
+    test_client.get("/")
+    with patch.object(DataSetRepository, "trending_by_views", side_effect=AssertionError("not cached")):
+        response = test_client.get("/")
+    assert response.status_code == 200
+    assert b"Freshly published" not in response.data
+
+    with test_client.application.app_context():
+        DSMetaDataRepository().update(meta_id, dataset_doi="10.1234/fresh")
+    response = test_client.get("/")
+    assert b"Freshly published" in response.data
@@ -1,5 +1,9 @@
 from typing import Optional
 
+from app import db
+from app.modules.dataset.models import DataSet
+from app.modules.hubfile.models import Hubfile
+from app.modules.pokemodel.models import PokeModel
 from app.modules.shopping_cart.models import ShoppingCart, ShoppingCartItem
 from core.repositories.BaseRepository import BaseRepository
 
@@ -24,3 +28,19 @@ class ShoppingCartItemRepository(BaseRepository):
         Retrieves all items associated with a given cart ID.
         """
         return self.model.query.filter_by(shopping_cart_id=cart_id).all()
+
+    def get_file_locations(self, cart_id: int) -> list:
+        """
+        (file id, name, checksum, owner user id, dataset id) of every file in the cart, in the order they were
+        added, resolved with a single joined query.
+        """
+        return (
+            db.session.query(Hubfile.id, Hubfile.name, Hubfile.checksum, DataSet.user_id, DataSet.id)
+            .select_from(ShoppingCartItem)
+            .join(Hubfile, Hubfile.id == ShoppingCartItem.file_id)
+            .join(PokeModel, PokeModel.id == Hubfile.poke_model_id)
+            .join(DataSet, DataSet.id == PokeModel.data_set_id)
+            .filter(ShoppingCartItem.shopping_cart_id == cart_id)
+            .order_by(ShoppingCartItem.id)
+            .all()
+        )
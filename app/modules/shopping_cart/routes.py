@@ -1,16 +1,21 @@
-import os
-import tempfile
-from zipfile import ZipFile
+import uuid
 
-from flask import flash, make_response, redirect, render_template, request, send_from_directory, url_for
+from flask import Response, current_app, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
 from app.modules.auth.services import AuthenticationService
-from app.modules.dataset.models import DataSet
+from app.modules.dataset.archives import archive_cache, archive_key
 from app.modules.hubfile.services import HubfileService
-from app.modules.pokemodel.models import PokeModel
 from app.modules.shopping_cart import shopping_cart_bp
 from app.modules.shopping_cart.services import ShoppingCartService
+from core.helpers.file_delivery import (
+    REVALIDATE_PRIVATE,
+    deliver_file,
+    is_first_request_of_download,
+    is_not_modified,
+    last_modified_of,
+    not_modified_response,
+)
 
 
 @shopping_cart_bp.route("/shopping_cart", methods=["GET"])
@@ -92,38 +97,44 @@ def download_cart():
     if not shopping_cart or not shopping_cart.items:
         flash("Your shopping cart is empty.", "warning")
         return redirect(url_for("shopping_cart.index"))
-        flash("Your shopping cart is empty.", "warning")
-        return redirect(url_for("shopping_cart.index"))
-
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, "poke_hub_cart.zip")
-
-    with ZipFile(zip_path, "w") as zipf:
-        for item in shopping_cart.items:
-            hubfile = item.file
-            poke_model = PokeModel.query.get(hubfile.poke_model_id)
-            if not poke_model:
-                continue
-
-            dataset = DataSet.query.get(poke_model.data_set_id)
-            if not dataset:
-                continue
-
-            file_path = os.path.join(
-                os.getenv("WORKING_DIR", ""),
-                "uploads",
-                f"user_{dataset.user_id}",
-                f"dataset_{dataset.id}",
-                hubfile.name,
-            )
-
-            if os.path.exists(file_path):
-                zipf.write(file_path, arcname=hubfile.name)
-
-    resp = make_response(
-        send_from_directory(temp_dir, "poke_hub_cart.zip", as_attachment=True, mimetype="application/zip")
-    )
 
-    # Aquí podrías añadir lógica para registrar la descarga si fuese necesario.
+    entries, file_ids = shopping_cart_service.get_archive_entries(shopping_cart)
+    key = archive_key([(arcname, checksum) for arcname, _, checksum in entries])
+    download_name = "poke_hub_cart.zip"
+
+    cached_path = archive_cache.get(key)
+    last_modified = last_modified_of(cached_path)
+    if is_not_modified(key, last_modified):
+        return not_modified_response(key, REVALIDATE_PRIVATE)
+
+    # Same delivery as dataset downloads: the first request streams the archive while it is cached
+    if cached_path is None and (request.range or current_app.config.get("FILE_DELIVERY") == "x-accel"):
+        cached_path = archive_cache.build(key, [(arcname, path) for arcname, path, _ in entries])
+    if cached_path:
+        resp = deliver_file(
+            cached_path,
+            download_name=download_name,
+            mimetype="application/zip",
+            etag=key,
+            cache_control=REVALIDATE_PRIVATE,
+        )
+    else:
+        resp = Response(
+            archive_cache.stream(key, [(arcname, path) for arcname, path, _ in entries]),
+            mimetype="application/zip",
+            headers={
+                "Content-Disposition": f"attachment; filename={download_name}",
+                "Cache-Control": REVALIDATE_PRIVATE,
+            },
+        )
+        resp.set_etag(key)
+
+    user_cookie = request.cookies.get("file_download_cookie")
+    if not user_cookie:
+        user_cookie = str(uuid.uuid4())
+        resp.set_cookie("file_download_cookie", user_cookie)
+
+    if is_first_request_of_download(key, last_modified):
+        shopping_cart_service.record_download(file_ids, current_user.id, user_cookie)
 
     return resp
@@ -1,10 +1,17 @@
+import logging
+import os
+
 from app.modules.auth.models import User
 from app.modules.hubfile.models import Hubfile
+from app.modules.hubfile.repositories import HubfileDownloadRecordRepository
 from app.modules.hubfile.services import HubfileService
 from app.modules.shopping_cart.models import ShoppingCart, ShoppingCartItem
 from app.modules.shopping_cart.repositories import ShoppingCartItemRepository, ShoppingCartRepository
+from core.configuration.configuration import uploads_root
 from core.services.BaseService import BaseService
 
+logger = logging.getLogger(__name__)
+
 
 class ShoppingCartService(BaseService):
     def __init__(self):
@@ -54,6 +61,37 @@ class ShoppingCartService(BaseService):
             self.shopping_cart_item_repository.delete(item.id)
         return True
 
+    def get_archive_entries(self, shopping_cart: ShoppingCart) -> tuple:
+        """
+        ((name in the cart ZIP, path on disk, checksum) entries, ids of the files they cover) of a cart.
+
+        Files with the same checksum are the same content, so only the first one goes into the archive. Files
+        are named as in their dataset, under a dataset_<id>/ folder when another file already took the name.
+        """
+        entries = []
+        file_ids = []
+        seen_checksums = set()
+        used_names = set()
+        for file_id, name, checksum, user_id, dataset_id in self.shopping_cart_item_repository.get_file_locations(
+            shopping_cart.id
+        ):
+            if checksum in seen_checksums:
+                file_ids.append(file_id)
+                continue
+            path = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{dataset_id}", name)
+            if not os.path.exists(path):
+                logger.warning(f"File {file_id} of dataset {dataset_id} not found: {path}")
+                continue
+            arcname = name if name not in used_names else f"dataset_{dataset_id}/{name}"
+            seen_checksums.add(checksum)
+            used_names.add(arcname)
+            entries.append((arcname, path, checksum))
+            file_ids.append(file_id)
+        return entries, file_ids
+
+    def record_download(self, file_ids, user_id: int | None, download_cookie: str) -> int:
+        return HubfileDownloadRecordRepository().record_many(file_ids, user_id, download_cookie)
+
 
 class ShoppingCartItemService(BaseService):
     def __init__(self):
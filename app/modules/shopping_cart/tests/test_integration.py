@@ -129,3 +129,130 @@ def test_clear_cart_flow(test_client, shopping_cart_integration_seed):
 
     resp = test_client.get("/shopping_cart")
     assert "integration_file.txt" not in resp.data.decode("utf-8")
+
+
+def test_download_cart_deduplicates_content_and_records_downloads(test_client, tmp_path, monkeypatch):
+    import io
+    import zipfile
+
+    from app.modules.dataset.archives import archive_cache
+    from app.modules.hubfile.models import HubfileDownloadRecord
+    from app.modules.shopping_cart.models import ShoppingCartItem
+
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(archive_cache, "root", str(tmp_path / "archives"))
+    login(test_client, "test@example.com", "test1234")
+
+    # Two copies of the same content, and a file of another dataset with a taken name but other content
+    files_by_dataset = [[("same.poke", b"Pikachu\n"), ("copy.poke", b"Pikachu\n")], [("same.poke", b"Eevee\n")]]
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        cart_id = ShoppingCartRepository().find_by_user_id(user.id).id
+        ShoppingCartItem.query.filter_by(shopping_cart_id=cart_id).delete()
+
+        file_ids = []
+        for files in files_by_dataset:
+            ds_meta = DSMetaData(title="Cart DS", description="d", publication_type=PublicationType.NONE)
+            db.session.add(ds_meta)
+            db.session.flush()
+            dataset = DataSet(user_id=user.id, ds_meta_data_id=ds_meta.id)
+            db.session.add(dataset)
+            db.session.flush()
+            fm_meta = FMMetaData(
+                poke_filename="c.poke", title="t", description="d", publication_type=PublicationType.NONE
+            )
+            db.session.add(fm_meta)
+            db.session.flush()
+            pm = PokeModel(data_set_id=dataset.id, fm_meta_data_id=fm_meta.id)
+            db.session.add(pm)
+            db.session.flush()
+
+            dataset_dir = tmp_path / "uploads" / f"user_{user.id}" / f"dataset_{dataset.id}"
+            dataset_dir.mkdir(parents=True)
+            for name, content in files:
+                (dataset_dir / name).write_bytes(content)
+                hubfile = Hubfile(name=name, checksum=f"sum-{content.decode().strip()}", size=1, poke_model_id=pm.id)
+                db.session.add(hubfile)
+                db.session.flush()
+                db.session.add(ShoppingCartItem(shopping_cart_id=cart_id, file_id=hubfile.id))
+                file_ids.append(hubfile.id)
+        other_dataset_id = dataset.id
+        db.session.commit()
+
+    resp = test_client.get("/shopping_cart/download")
+    assert resp.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        assert sorted(zf.namelist()) == sorted(["same.poke", f"dataset_{other_dataset_id}/same.poke"])
+        assert zf.read("same.poke") == b"Pikachu\n"
+        assert zf.read(f"dataset_{other_dataset_id}/same.poke") == b"Eevee\n"
+
+    with test_client.application.app_context():
+        records = HubfileDownloadRecord.query.filter(HubfileDownloadRecord.file_id.in_(file_ids)).all()
+        assert sorted(r.file_id for r in records) == sorted(file_ids)
+
+    # Same cookie, same archive: a conditional request is a 304 and adds no records
+    resp = test_client.get("/shopping_cart/download", headers={"If-None-Match": resp.get_etag()[0]})
+    assert resp.status_code == 304
+    test_client.get("/shopping_cart/download")
+    with test_client.application.app_context():
+        assert HubfileDownloadRecord.query.filter(HubfileDownloadRecord.file_id.in_(file_ids)).count() == len(file_ids)
+        ShoppingCartItem.query.filter_by(shopping_cart_id=cart_id).delete()
+        db.session.commit()
+
+
+def test_download_cart_twice_from_default_archive_cache(test_client, shopping_cart_integration_seed):
+    import hashlib
+    import os
+    import shutil
+
+    from app.modules.dataset.archives import archive_cache
+    from app.modules.shopping_cart.models import ShoppingCartItem
+    from core.configuration.configuration import uploads_root
+
+    login(test_client, "test@example.com", "test1234")
+
+    # Unique content, so the archive is not cached yet; the cache root is the configured one
+    content = f"Eevee\n# {os.urandom(8).hex()}\n".encode()
+    with test_client.application.app_context():
+        user = User.query.filter_by(email="test@example.com").first()
+        cart_id = ShoppingCartRepository().find_by_user_id(user.id).id
+        ShoppingCartItem.query.filter_by(shopping_cart_id=cart_id).delete()
+        pm = PokeModel(
+            data_set=DataSet(
+                user_id=user.id,
+                ds_meta_data=DSMetaData(title="Cart twice", description="d", publication_type=PublicationType.NONE),
+            ),
+            fm_meta_data=FMMetaData(
+                poke_filename="twice.poke", title="t", description="d", publication_type=PublicationType.NONE
+            ),
+        )
+        hubfile = Hubfile(name="twice.poke", checksum=hashlib.md5(content).hexdigest(), size=len(content))
+        pm.files.append(hubfile)
+        db.session.add(pm)
+        db.session.flush()
+        db.session.add(ShoppingCartItem(shopping_cart_id=cart_id, file_id=hubfile.id))
+        db.session.commit()
+        dataset_dir = os.path.join(uploads_root(), f"user_{user.id}", f"dataset_{pm.data_set_id}")
+    os.makedirs(dataset_dir)
+    with open(os.path.join(dataset_dir, "twice.poke"), "wb") as f:
+        f.write(content)
+
+    cached_path = None
+    try:
+        first = test_client.get("/shopping_cart/download")
+        assert first.status_code == 200
+        body = first.data
+        cached_path = archive_cache.get(first.get_etag()[0])
+        assert cached_path is not None
+
+        second = test_client.get("/shopping_cart/download")
+        assert second.status_code == 200
+        assert second.content_length == len(body)
+        assert second.data == body
+    finally:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        if cached_path:
+            os.remove(cached_path)
+        with test_client.application.app_context():
+            ShoppingCartItem.query.filter_by(shopping_cart_id=cart_id).delete()
+            db.session.commit()
@@ -10,7 +10,7 @@ from app.modules.dataset.models import DataSet
 from app.modules.fakenodo.routes import create_deposition, publish_deposition, upload_file
 from app.modules.pokemodel.models import PokeModel
 from app.modules.zenodo.repositories import ZenodoRepository
-from core.configuration.configuration import uploads_folder_name
+from core.configuration.configuration import uploads_root
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
@@ -52,7 +52,7 @@ class ZenodoService(BaseService):
 
         user_id = user.id
 
-        file_path = os.path.join(uploads_folder_name(), f"user_{str(user_id)}", f"dataset_{dataset.id}/", poke_filename)
+        file_path = os.path.join(uploads_root(), f"user_{str(user_id)}", f"dataset_{dataset.id}/", poke_filename)
         files = {"file": open(file_path, "rb")}
 
         # publish_url = f"{self.ZENODO_API_URL}/{deposition_id}/files"
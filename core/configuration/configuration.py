@@ -9,6 +9,14 @@ def uploads_folder_name():
     return os.getenv("UPLOADS_DIR", "uploads")
 
 
+def uploads_root():
+    """
+    Folder every stored file path is resolved against, made absolute: a relative path would be resolved against
+    the process cwd by some callers and against the app's root_path by send_file.
+    """
+    return os.path.abspath(os.path.join(os.getenv("WORKING_DIR", ""), uploads_folder_name()))
+
+
 def get_app_version():
     version_file_path = os.path.join(os.getenv("WORKING_DIR", ""), ".version")
     try:
@@ -38,3 +46,10 @@ class Config:
     MAIL_USERNAME = os.getenv("MAIL_USERNAME")
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = ("UVLHub", os.getenv("MAIL_DEFAULT_SENDER"))
+
+    # "flask" sends stored files from the worker; "x-accel" only authorizes and records the download and
+    # lets nginx send the file from the internal location X_ACCEL_PREFIX, which maps to X_ACCEL_ROOT. Only the
+    # uploads folder is mapped, so nothing else under WORKING_DIR (.env, sources) can be handed to nginx.
+    FILE_DELIVERY = os.getenv("FILE_DELIVERY", "flask")
+    X_ACCEL_ROOT = os.getenv("X_ACCEL_ROOT", uploads_root())
+    X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/_protected/")
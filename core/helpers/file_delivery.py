@@ -0,0 +1,95 @@
+import mimetypes
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from flask import Response, abort, current_app, request, send_file
+from werkzeug.http import is_resource_modified
+
+# Downloads are recorded by the app, so clients may keep a copy but must revalidate it on every use;
+# an unchanged file then costs a 304 instead of the whole body
+REVALIDATE_PUBLIC = "public, no-cache"
+REVALIDATE_PRIVATE = "private, no-cache"
+
+
+def x_accel_uri(path: str) -> str | None:
+    """Internal nginx URI of a file under X_ACCEL_ROOT, or None when the file is outside it."""
+    root = os.path.realpath(current_app.config["X_ACCEL_ROOT"])
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([root, real_path]) != root:
+        return None
+    prefix = current_app.config["X_ACCEL_PREFIX"].rstrip("/")
+    return f"{prefix}/{quote(os.path.relpath(real_path, root).replace(os.sep, '/'))}"
+
+
+def last_modified_of(path: str | None) -> datetime | None:
+    """The Last-Modified a delivered file is sent with (its mtime), or None when there is no such file."""
+    try:
+        return datetime.fromtimestamp(os.stat(path).st_mtime, tz=timezone.utc)
+    except (OSError, TypeError):
+        return None
+
+
+def is_not_modified(etag: str | None, last_modified=None) -> bool:
+    """Whether the request's If-None-Match / If-Modified-Since say the client already has this version."""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def not_modified_response(etag: str, cache_control: str = REVALIDATE_PUBLIC) -> Response:
+    resp = Response(status=304)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = cache_control
+    return resp
+
+
+def is_first_request_of_download(etag: str | None = None, last_modified=None) -> bool:
+    """
+    False for Range requests that resume a download and for conditional requests (If-None-Match or
+    If-Modified-Since against `etag` / `last_modified`) answered with a 304, so they aren't counted as downloads.
+    """
+    if (etag or last_modified) and is_not_modified(etag, last_modified):
+        return False
+    return request.range is None or not request.range.ranges or request.range.ranges[0][0] in (0, None)
+
+
+def deliver_file(
+    path: str,
+    download_name: str | None = None,
+    as_attachment: bool = True,
+    mimetype=None,
+    etag: str | None = None,
+    cache_control: str | None = None,
+):
+    """
+    Response that sends a stored file, with If-None-Match / If-Modified-Since and Range support. With
+    FILE_DELIVERY = "x-accel" the body is left to nginx through an X-Accel-Redirect header; headers set on the
+    response (cookies, Content-Disposition, ETag, Cache-Control) are kept by nginx, which also serves ranges.
+
+    `etag` should be a strong validator of the content (its checksum); by default Flask derives one from the
+    file's mtime and size.
+    """
+    if not os.path.isfile(path):
+        abort(404)
+
+    download_name = download_name or os.path.basename(path)
+    mimetype = mimetype or mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+
+    uri = x_accel_uri(path) if current_app.config.get("FILE_DELIVERY") == "x-accel" else None
+    if uri is None:
+        resp = send_file(
+            path, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name, etag=etag or True
+        )
+        resp.accept_ranges = "bytes"
+    else:
+        # nginx sends the file's mtime as Last-Modified, so If-Modified-Since is checked against it too
+        if etag and is_not_modified(etag, last_modified_of(path)):
+            return not_modified_response(etag, cache_control or REVALIDATE_PUBLIC)
+        resp = Response(mimetype=mimetype)
+        resp.headers["X-Accel-Redirect"] = uri
+        resp.headers.set("Content-Disposition", "attachment" if as_attachment else "inline", filename=download_name)
+        if etag:
+            resp.set_etag(etag)
+
+    if cache_control:
+        resp.headers["Cache-Control"] = cache_control
+    return resp
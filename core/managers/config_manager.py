@@ -37,6 +37,11 @@ class Config:
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = "uploads"
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH_MB", "200")) * 1024 * 1024
+    POKE_UPLOAD_MAX_SIZE = int(os.getenv("POKE_UPLOAD_MAX_MB", "10")) * 1024 * 1024
+    # Chunked ZIP uploads are not bound by MAX_CONTENT_LENGTH, which only limits each chunk
+    ZIP_UPLOAD_MAX_SIZE = int(os.getenv("ZIP_UPLOAD_MAX_MB", "2048")) * 1024 * 1024
+    # Chunked uploads that receive nothing for this long are abandoned and their staged bytes removed
+    ZIP_UPLOAD_EXPIRY = int(os.getenv("ZIP_UPLOAD_EXPIRY_HOURS", "24")) * 60 * 60
 
 
 class DevelopmentConfig(Config):
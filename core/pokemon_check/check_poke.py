@@ -0,0 +1,95 @@
+from core.pokemon_check.parser import (  # noqa: F401
+    MAX_EVS,
+    MAX_MOVES,
+    VALID_STATS,
+    VALID_TERA_TYPES,
+    SetTokenizer,
+    iter_sets,
+    parse_set,
+)
+
+
+class PokemonSetChecker:
+
+    MAX_EVS = MAX_EVS
+    MAX_MOVES = MAX_MOVES
+
+    def __init__(self, text_content=None, keep_sets: bool = False):
+        # Texto completo o iterable de líneas (p. ej. un fichero abierto). Sin contenido, el checker es
+        # incremental: se alimenta con feed_line() y se cierra con finish()
+        self.text = text_content
+        # Con keep_sets se guardan los sets parseados, (posición, datos) de los que tienen especie, para
+        # almacenarlos sin volver a parsear el archivo
+        self.keep_sets = keep_sets
+        self.sets = []
+        self.parsed_data = {
+            "pokemon": None,
+            "item": None,
+            "ability": None,
+            "tera_type": None,
+            "evs": {},
+            "ivs": {},
+            "moves": [],
+        }
+        self.errors = []
+        self.set_count = 0
+        # Solo se guardan los sets con errores, el resto se descarta en cuanto se valida
+        self.set_errors = []
+        self._tokenizer = SetTokenizer(validate=True)
+        if text_content is not None:
+            self._parse()
+
+    def _parse(self):
+        """Parsea y valida cada set del archivo en una sola pasada con el tokenizador compartido."""
+        lines = self.text.splitlines() if isinstance(self.text, str) else self.text
+        for line in lines:
+            self.feed_line(line)
+        self.finish()
+
+    def _add_set(self, parsed):
+        if self.set_count == 0:
+            self.parsed_data = parsed.to_dict()
+        if self.keep_sets and parsed.species:
+            self.sets.append((self.set_count, parsed.to_dict()))
+        if parsed.errors:
+            self.set_errors.append({"position": self.set_count, "pokemon": parsed.species, "errors": parsed.errors})
+        self.set_count += 1
+
+    def feed_line(self, line: str):
+        """Procesa una línea; los errores de un set están disponibles en cuanto empieza el siguiente."""
+        parsed = self._tokenizer.feed(line)
+        if parsed is not None:
+            self._add_set(parsed)
+
+    def finish(self):
+        """Cierra el último set y construye la lista de errores."""
+        parsed = self._tokenizer.close()
+        if parsed is not None:
+            self._add_set(parsed)
+
+        if self.set_count == 0:
+            self.errors = ["El archivo está vacío."]
+        elif self.set_count == 1:
+            self.errors = self.set_errors[0]["errors"] if self.set_errors else []
+        else:
+            self.errors = [
+                f"Set {result['position'] + 1} ({result['pokemon']}): {error}"
+                for result in self.set_errors
+                for error in result["errors"]
+            ]
+
+    def is_valid(self) -> bool:
+        """Devuelve True si no se encontraron errores, False en caso contrario."""
+        return len(self.errors) == 0
+
+    def get_parsed_data(self) -> dict:
+        """Devuelve los datos parseados como un diccionario."""
+        return self.parsed_data
+
+    def get_errors(self) -> list:
+        """Devuelve la lista de errores de validación."""
+        return self.errors
+
+    def get_set_errors(self) -> list:
+        """Devuelve los errores agrupados por set: posición, Pokémon y errores de cada set inválido."""
+        return self.set_errors
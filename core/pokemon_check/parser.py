@@ -0,0 +1,356 @@
+import re
+
+VALID_TERA_TYPES = {
+    "normal",
+    "fire",
+    "water",
+    "grass",
+    "electric",
+    "ice",
+    "fighting",
+    "poison",
+    "ground",
+    "flying",
+    "psychic",
+    "bug",
+    "rock",
+    "ghost",
+    "dragon",
+    "dark",
+    "steel",
+    "fairy",
+    "stellar",
+}
+VALID_STATS = {"hp", "atk", "def", "spa", "spd", "spe"}
+VALID_NATURES = {
+    "adamant",
+    "bashful",
+    "bold",
+    "brave",
+    "calm",
+    "careful",
+    "docile",
+    "gentle",
+    "hardy",
+    "hasty",
+    "impish",
+    "jolly",
+    "lax",
+    "lonely",
+    "mild",
+    "modest",
+    "naive",
+    "naughty",
+    "quiet",
+    "quirky",
+    "rash",
+    "relaxed",
+    "sassy",
+    "serious",
+    "timid",
+}
+VALID_GENDERS = {"m", "f", "n"}
+
+# Nombres que aparecen en exportaciones de Showdown y de otras herramientas, normalizados a la clave corta
+STAT_ALIASES = {
+    "hp": "hp",
+    "atk": "atk",
+    "attack": "atk",
+    "def": "def",
+    "defense": "def",
+    "spa": "spa",
+    "spatk": "spa",
+    "sp. atk": "spa",
+    "sp atk": "spa",
+    "special attack": "spa",
+    "spd": "spd",
+    "spdef": "spd",
+    "sp. def": "spd",
+    "sp def": "spd",
+    "special defense": "spd",
+    "spe": "spe",
+    "speed": "spe",
+}
+STAT_DISPLAY_NAMES = {"hp": "HP", "atk": "Atk", "def": "Def", "spa": "SpA", "spd": "SpD", "spe": "Spe"}
+
+MAX_EVS = 510
+MAX_STAT_EVS = 252
+MAX_IVS = 31
+MAX_MOVES = 4
+
+_HEADER_RE = re.compile(r"^(?P<body>.*?)(?:\s*@\s*(?P<item>.*))?$")
+_GENDER_RE = re.compile(r"^(?P<body>.*?)\s*\((?P<gender>[MFmf])\)$")
+_NICKNAME_RE = re.compile(r"^(?P<nickname>.*?)\s*\((?P<species>[^()]+)\)$")
+_NATURE_RE = re.compile(r"^(?P<nature>[A-Za-z]+)\s+Nature$", re.IGNORECASE)
+
+
+class ParsedSet:
+    """Registro compacto con el contenido de un set de Showdown."""
+
+    __slots__ = (
+        "species",
+        "nickname",
+        "gender",
+        "item",
+        "ability",
+        "tera_type",
+        "nature",
+        "level",
+        "shiny",
+        "happiness",
+        "evs",
+        "ivs",
+        "moves",
+        "errors",
+    )
+
+    def __init__(self):
+        self.species = None
+        self.nickname = None
+        self.gender = None
+        self.item = None
+        self.ability = None
+        self.tera_type = None
+        self.nature = None
+        self.level = None
+        self.shiny = False
+        self.happiness = None
+        self.evs = {}
+        self.ivs = {}
+        self.moves = []
+        self.errors = []
+
+    def __repr__(self):
+        return f"ParsedSet<{self.species}>"
+
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> dict:
+        """Devuelve el set con el formato de PokemonSetChecker.get_parsed_data()."""
+        return {
+            "pokemon": self.species,
+            "nickname": self.nickname,
+            "gender": self.gender,
+            "item": self.item,
+            "ability": self.ability,
+            "tera_type": self.tera_type,
+            "nature": self.nature,
+            "level": self.level,
+            "shiny": self.shiny,
+            "happiness": self.happiness,
+            "evs": dict(self.evs),
+            "ivs": dict(self.ivs),
+            "moves": list(self.moves),
+        }
+
+
+def _parse_header(line: str, parsed: ParsedSet):
+    header = _HEADER_RE.match(line)
+    body = header.group("body").strip()
+    if header.group("item"):
+        parsed.item = header.group("item").strip()
+
+    # El mote y el género solo aparecen entre paréntesis; evitamos las regex en el caso habitual
+    if body.endswith(")"):
+        gender = _GENDER_RE.match(body)
+        if gender:
+            body = gender.group("body")
+            parsed.gender = gender.group("gender").upper()
+
+        nickname = _NICKNAME_RE.match(body)
+        if nickname and nickname.group("nickname"):
+            parsed.nickname = nickname.group("nickname").strip()
+            body = nickname.group("species")
+
+    parsed.species = body.strip()
+
+
+def _parse_stats(value: str, parsed: ParsedSet, strict: bool, max_value: int, label: str) -> dict:
+    stats = {}
+    for part in value.split("/"):
+        part = part.strip()
+        if not part:
+            continue
+
+        raw_value, _, stat_name = part.partition(" ")
+        stat_name = stat_name.strip()
+        if not stat_name or not raw_value.lstrip("-").isdigit():
+            if strict:
+                raise ValueError(f"Formato de {label} inválido: '{part}'")
+            parsed.errors.append(f"Formato de {label} inválido: '{part}'")
+            continue
+
+        stat = STAT_ALIASES.get(stat_name.lower())
+        if stat is None:
+            parsed.errors.append(f"Stat desconocido: '{stat_name}'")
+            continue
+
+        stat_value = int(raw_value)
+        if not (0 <= stat_value <= max_value):
+            parsed.errors.append(
+                f"Valor de {label} inválido para {stat.upper()}: {stat_value}. Debe estar entre 0 y {max_value}."
+            )
+        stats[stat] = stat_value
+    return stats
+
+
+def _parse_int(value: str, parsed: ParsedSet, label: str, low: int, high: int):
+    try:
+        number = int(value)
+    except ValueError:
+        parsed.errors.append(f"{label} no válido: {value}")
+        return None
+    if not (low <= number <= high):
+        parsed.errors.append(f"{label} no válido: {number}. Debe estar entre {low} y {high}.")
+    return number
+
+
+def _finish(parsed: ParsedSet, validate: bool) -> ParsedSet:
+    """Comprueba las reglas que dependen del set completo."""
+    if not validate:
+        return parsed
+
+    if not parsed.species:
+        parsed.errors.append("No se ha especificado un Pokémon.")
+    if not parsed.ability:
+        parsed.errors.append("No se ha especificado una Habilidad.")
+    if not parsed.moves:
+        parsed.errors.append("No se ha especificado ningún movimiento.")
+    if len(parsed.moves) > MAX_MOVES:
+        parsed.errors.append(f"Se especificaron {len(parsed.moves)} movimientos. El máximo es {MAX_MOVES}.")
+
+    total_evs = sum(parsed.evs.values())
+    if total_evs > MAX_EVS:
+        parsed.errors.append(f"La suma total de EVs ({total_evs}) supera el máximo de {MAX_EVS}.")
+    return parsed
+
+
+# Claves que puede tener una línea "Clave: valor" dentro de un set
+_SET_KEYS = {"ability", "tera type", "evs", "ivs", "level", "happiness", "shiny", "gender", "nature"}
+
+
+def _starts_new_set(line: str) -> bool:
+    """Tras una línea en blanco, indica si `line` es la cabecera de otro set y no la continuación del actual."""
+    if line[0] == "-":
+        return False
+    key, separator, _ = line.partition(":")
+    if separator and key.strip().lower() in _SET_KEYS:
+        return False
+    return not (line[-1] == "e" and _NATURE_RE.match(line))
+
+
+class SetTokenizer:
+    """
+    Versión incremental del tokenizador: recibe las líneas de una en una con `feed` y devuelve cada set
+    en cuanto se cierra. Sirve para validar un archivo mientras se recibe, sin tenerlo entero en memoria.
+    """
+
+    __slots__ = ("validate", "strict", "_parsed", "_after_blank")
+
+    def __init__(self, validate: bool = True, strict: bool = False):
+        self.validate = validate
+        self.strict = strict
+        self._parsed = None
+        self._after_blank = False
+
+    def feed(self, raw_line: str) -> ParsedSet | None:
+        """Procesa una línea; devuelve el set anterior si esta línea lo cierra."""
+        line = raw_line.strip()
+        if not line:
+            self._after_blank = True
+            return None
+
+        parsed = self._parsed
+        if line.startswith("==="):
+            self._parsed = None
+            return _finish(parsed, self.validate) if parsed is not None else None
+
+        # Una línea en blanco dentro de un set no lo cierra; solo lo hace si le sigue otra cabecera
+        if parsed is None or (self._after_blank and _starts_new_set(line)):
+            self._parsed = ParsedSet()
+            _parse_header(line, self._parsed)
+            self._after_blank = False
+            return _finish(parsed, self.validate) if parsed is not None else None
+        self._after_blank = False
+
+        if line[0] == "-":
+            parsed.moves.append(line[1:].strip())
+            return None
+
+        validate = self.validate
+        key, separator, value = line.partition(":")
+        if separator:
+            key = key.strip().lower()
+            value = value.strip()
+
+            if key == "ability":
+                parsed.ability = value
+            elif key == "tera type":
+                parsed.tera_type = value
+                if validate and value and value.lower() not in VALID_TERA_TYPES:
+                    parsed.errors.append(f"Tera Tipo no válido: {value}")
+            elif key == "evs":
+                parsed.evs = _parse_stats(value, parsed, self.strict, MAX_STAT_EVS, "EV")
+            elif key == "ivs":
+                parsed.ivs = _parse_stats(value, parsed, self.strict, MAX_IVS, "IV")
+            elif key == "level":
+                parsed.level = _parse_int(value, parsed, "Nivel", 1, 100)
+            elif key == "happiness":
+                parsed.happiness = _parse_int(value, parsed, "Felicidad", 0, 255)
+            elif key == "shiny":
+                parsed.shiny = value.lower() == "yes"
+            elif key == "gender":
+                parsed.gender = value.upper()
+                if validate and value.lower() not in VALID_GENDERS:
+                    parsed.errors.append(f"Género no válido: {value}")
+            elif key == "nature":
+                parsed.nature = value
+                if validate and value.lower() not in VALID_NATURES:
+                    parsed.errors.append(f"Naturaleza no válida: {value}")
+            return None
+
+        nature = _NATURE_RE.match(line) if line[-1] == "e" else None
+        if nature:
+            parsed.nature = nature.group("nature")
+            if validate and parsed.nature.lower() not in VALID_NATURES:
+                parsed.errors.append(f"Naturaleza no válida: {parsed.nature}")
+        return None
+
+    def close(self) -> ParsedSet | None:
+        """Cierra y devuelve el último set, si lo hay."""
+        parsed, self._parsed = self._parsed, None
+        self._after_blank = False
+        return _finish(parsed, self.validate) if parsed is not None else None
+
+
+def iter_sets(lines, validate: bool = True, strict: bool = False):
+    """
+    Tokeniza uno o varios sets de Showdown en una sola pasada, devolviéndolos de uno en uno.
+
+    `lines` puede ser un texto o cualquier iterable de líneas (por ejemplo un fichero abierto), así que
+    un export de miles de sets no se carga entero en memoria. Los sets se separan con líneas en blanco;
+    las cabeceras de equipo del teambuilder ("=== [gen9ou] Equipo ===") también cierran el set actual.
+    Con `validate` se añaden a `errors` los fallos de las reglas de negocio; con `strict` un stat mal
+    formado lanza ValueError.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    tokenizer = SetTokenizer(validate=validate, strict=strict)
+    feed = tokenizer.feed
+    for raw_line in lines:
+        parsed = feed(raw_line)
+        if parsed is not None:
+            yield parsed
+
+    parsed = tokenizer.close()
+    if parsed is not None:
+        yield parsed
+
+
+def parse_set(lines, validate: bool = True, strict: bool = False) -> ParsedSet | None:
+    """
+    Devuelve el primer set de `lines` (ver iter_sets), o None si no hay ninguna línea con contenido.
+    """
+    return next(iter_sets(lines, validate=validate, strict=strict), None)
@@ -0,0 +1,34 @@
+from core.pokemon_check.check_poke import PokemonSetChecker
+
+# Lo que ejecutan los workers del pool de validación masiva. Nada de aquí importa el paquete `app`, cuyo
+# import crea la aplicación: el forkserver precarga este módulo y los workers no arrancan otra aplicación
+
+
+def check_member(name: str, data: bytes) -> dict:
+    """Valida el contenido de un archivo .poke y devuelve su entrada del informe."""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"file": name, "valid": False, "errors": ["El archivo no está codificado en UTF-8."], "summary": None}
+
+    checker = PokemonSetChecker(text, keep_sets=True)
+    parsed_data = checker.get_parsed_data()
+    report = {
+        "file": name,
+        "valid": checker.is_valid(),
+        "errors": checker.get_errors(),
+        "summary": {
+            "pokemon": parsed_data.get("pokemon"),
+            "item": parsed_data.get("item"),
+            "ability": parsed_data.get("ability"),
+            "sets": checker.set_count,
+        },
+    }
+    if checker.is_valid():
+        # Solo para guardarlos junto al archivo; no forma parte del informe que recibe el cliente
+        report["parsed_sets"] = checker.sets
+    return report
+
+
+def check_batch(batch: list) -> list:
+    return [check_member(name, data) for name, data in batch]
@@ -18,14 +18,18 @@ class GenericResource(Resource):
         self.model_name = model.__name__
         self.serializer = serializer
 
+    def get_query(self):
+        """Query the GET endpoints read from; resources override it to eager-load what they serialize."""
+        return self.model.query
+
     def get(self, id=None):
         if id:
-            item = self.model.query.get(id)
+            item = self.get_query().get(id)
             if not item:
                 return {"message": f"{self.model_name} not found"}, 404
             return self.serializer.serialize(item), 200
         else:
-            items = self.model.query.all()
+            items = self.get_query().all()
             return {"items": [self.serializer.serialize(i) for i in items]}, 200
 
     def post(self):
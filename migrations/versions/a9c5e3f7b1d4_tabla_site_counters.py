@@ -0,0 +1,48 @@
+"""tabla site_counters
+
+Revision ID: a9c5e3f7b1d4
+Revises: f3b8d1a6c2e5
+Create Date: 2026-10-18 19:20:31.508442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c5e3f7b1d4'
+down_revision = 'f3b8d1a6c2e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('site_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('synchronized_datasets', sa.Integer(), nullable=False),
+    sa.Column('poke_models', sa.Integer(), nullable=False),
+    sa.Column('dataset_views', sa.Integer(), nullable=False),
+    sa.Column('dataset_downloads', sa.Integer(), nullable=False),
+    sa.Column('poke_model_views', sa.Integer(), nullable=False),
+    sa.Column('poke_model_downloads', sa.Integer(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # The single row starts from the real totals; the services keep it up to date from now on
+    op.get_bind().execute(sa.text(
+        "INSERT INTO site_counters (id, synchronized_datasets, poke_models, dataset_views, dataset_downloads, "
+        "poke_model_views, poke_model_downloads, reconciled_at) SELECT 1, "
+        "(SELECT COUNT(*) FROM data_set JOIN ds_meta_data ON ds_meta_data.id = data_set.ds_meta_data_id "
+        "WHERE ds_meta_data.dataset_doi IS NOT NULL), "
+        "(SELECT COUNT(*) FROM poke_model), "
+        "(SELECT COUNT(*) FROM ds_view_record), "
+        "(SELECT COUNT(*) FROM ds_download_record), "
+        "(SELECT COUNT(*) FROM file_view_record), "
+        "(SELECT COUNT(*) FROM file_download_record), "
+        "CURRENT_TIMESTAMP"
+    ))
+
+
+def downgrade():
+    op.drop_table('site_counters')
@@ -0,0 +1,34 @@
+"""origen de importación en file
+
+Revision ID: b6d1f4a8c3e7
+Revises: a9c5e3f7b1d4
+Create Date: 2026-10-18 21:05:47.318296
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d1f4a8c3e7'
+down_revision = 'a9c5e3f7b1d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source_repo', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('source_branch', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('source_path', sa.String(length=1024), nullable=True))
+        batch_op.add_column(sa.Column('source_crc32', sa.BigInteger(), nullable=True))
+        batch_op.create_index('ix_file_source', ['source_repo', 'source_branch'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_index('ix_file_source')
+        batch_op.drop_column('source_crc32')
+        batch_op.drop_column('source_path')
+        batch_op.drop_column('source_branch')
+        batch_op.drop_column('source_repo')
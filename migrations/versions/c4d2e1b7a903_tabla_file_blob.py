@@ -0,0 +1,41 @@
+"""tabla file_blob
+
+Revision ID: c4d2e1b7a903
+Revises: b3c1f0a9d2e4
+Create Date: 2026-10-18 09:12:44.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d2e1b7a903'
+down_revision = 'b3c1f0a9d2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('file_blob',
+    sa.Column('checksum', sa.String(length=120), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('checksum')
+    )
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_file_checksum'), ['checksum'], unique=False)
+
+    # Existing files start with their current reference counts; `rosemary blobs:sync` moves their content
+    # into the blob store
+    op.execute(
+        "INSERT INTO file_blob (checksum, size, ref_count) "
+        "SELECT checksum, MAX(size), COUNT(*) FROM file GROUP BY checksum"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_checksum'))
+
+    op.drop_table('file_blob')
@@ -0,0 +1,42 @@
+"""ruta de almacenamiento en file
+
+Revision ID: e7a4c2d9f1b6
+Revises: c4d2e1b7a903
+Create Date: 2026-10-18 16:40:12.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a4c2d9f1b6'
+down_revision = 'c4d2e1b7a903'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('storage_path', sa.String(length=255), nullable=True))
+        batch_op.create_index(batch_op.f('ix_file_storage_path'), ['storage_path'], unique=False)
+
+    # Existing files get the path their dataset gives them; `rosemary files:check` verifies them later on
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT file.id, file.name, data_set.user_id, data_set.id FROM file "
+        "JOIN poke_model ON poke_model.id = file.poke_model_id "
+        "JOIN data_set ON data_set.id = poke_model.data_set_id"
+    )).fetchall()
+    paths = [
+        {"id": file_id, "storage_path": f"user_{user_id}/dataset_{dataset_id}/{name}"}
+        for file_id, name, user_id, dataset_id in rows
+    ]
+    for start in range(0, len(paths), 1000):
+        bind.execute(sa.text("UPDATE file SET storage_path = :storage_path WHERE id = :id"), paths[start:start + 1000])
+
+
+def downgrade():
+    with op.batch_alter_table('file', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_storage_path'))
+        batch_op.drop_column('storage_path')
@@ -0,0 +1,124 @@
+"""tabla tag y asociaciones con ds_meta_data y fm_meta_data
+
+Revision ID: f3b8d1a6c2e5
+Revises: e7a4c2d9f1b6
+Create Date: 2026-10-18 18:05:47.611302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1a6c2e5'
+down_revision = 'e7a4c2d9f1b6'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _tag_names(raw):
+    # Same rules as Tag.names_from(): stripped, no empty names, no repeats ignoring case
+    names = {}
+    for name in (raw or "").split(","):
+        name = name.strip()
+        if name:
+            names.setdefault(name.lower(), name)
+    return list(names.values())
+
+
+def _execute_batched(bind, statement, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(sa.text(statement), rows[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('dataset_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tag_dataset_count'), ['dataset_count'], unique=False)
+
+    op.create_table('ds_meta_data_tag',
+    sa.Column('ds_meta_data_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ds_meta_data_id'], ['ds_meta_data.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ),
+    sa.PrimaryKeyConstraint('ds_meta_data_id', 'tag_id')
+    )
+    with op.batch_alter_table('ds_meta_data_tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ds_meta_data_tag_tag_id'), ['tag_id'], unique=False)
+
+    op.create_table('fm_meta_data_tag',
+    sa.Column('fm_meta_data_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['fm_meta_data_id'], ['fm_meta_data.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ),
+    sa.PrimaryKeyConstraint('fm_meta_data_id', 'tag_id')
+    )
+    with op.batch_alter_table('fm_meta_data_tag', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_fm_meta_data_tag_tag_id'), ['tag_id'], unique=False)
+
+    # Existing comma-separated tags are split into the new tables; the strings stay as they are
+    bind = op.get_bind()
+    metadata_tags = {
+        table: [(metadata_id, _tag_names(tags)) for metadata_id, tags in bind.execute(sa.text(
+            f"SELECT id, tags FROM {table} WHERE tags IS NOT NULL"
+        )).fetchall()]
+        for table in ('ds_meta_data', 'fm_meta_data')
+    }
+
+    names = {}
+    for rows in metadata_tags.values():
+        for _, tag_names in rows:
+            for name in tag_names:
+                names.setdefault(name.lower(), name)
+    _execute_batched(
+        bind, "INSERT INTO tag (name, dataset_count) VALUES (:name, 0)", [{"name": name} for name in names.values()]
+    )
+    tag_ids = {name.lower(): tag_id for tag_id, name in bind.execute(sa.text("SELECT id, name FROM tag")).fetchall()}
+
+    for table, rows in metadata_tags.items():
+        links = [
+            {"metadata_id": metadata_id, "tag_id": tag_ids[name.lower()]}
+            for metadata_id, tag_names in rows
+            for name in tag_names
+        ]
+        _execute_batched(
+            bind, f"INSERT INTO {table}_tag ({table}_id, tag_id) VALUES (:metadata_id, :tag_id)", links
+        )
+
+    # A dataset carries a tag through its own metadata or through any of its models
+    counts = bind.execute(sa.text(
+        "SELECT tag_id, COUNT(*) FROM ("
+        "SELECT ds_meta_data_tag.tag_id AS tag_id, data_set.id AS data_set_id FROM ds_meta_data_tag "
+        "JOIN data_set ON data_set.ds_meta_data_id = ds_meta_data_tag.ds_meta_data_id "
+        "UNION "
+        "SELECT fm_meta_data_tag.tag_id, poke_model.data_set_id FROM fm_meta_data_tag "
+        "JOIN poke_model ON poke_model.fm_meta_data_id = fm_meta_data_tag.fm_meta_data_id"
+        ") AS tagged GROUP BY tag_id"
+    )).fetchall()
+    _execute_batched(
+        bind,
+        "UPDATE tag SET dataset_count = :dataset_count WHERE id = :id",
+        [{"id": tag_id, "dataset_count": count} for tag_id, count in counts],
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('fm_meta_data_tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_fm_meta_data_tag_tag_id'))
+    op.drop_table('fm_meta_data_tag')
+
+    with op.batch_alter_table('ds_meta_data_tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ds_meta_data_tag_tag_id'))
+    op.drop_table('ds_meta_data_tag')
+
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tag_dataset_count'))
+    op.drop_table('tag')
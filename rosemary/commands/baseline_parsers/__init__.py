@@ -0,0 +1,5 @@
+"""
+Verbatim copies of the .poke parsers as they were before the shared tokenizer (baseline commit 05be8b0):
+pokemon_check/check_poke.py, and parse_poke with its Pokemon class from pokemodel/models.py. They are only
+imported by parser:benchmark, as the reference it measures against; do not edit them.
+"""
@@ -0,0 +1,64 @@
+import re
+
+
+class Pokemon:
+    name: str
+    item: str
+    ability: str
+    tera_type: str
+    evs: dict[str, int]
+    ivs: dict[str, int]
+    moves: list[str]
+
+
+def parse_poke(file_path):
+
+    with open(file_path, "r") as f:
+        lines = f.read().strip().splitlines()
+        name = lines[0].split("@")[0].strip()
+        item = lines[0].split("@")[1].strip() if "@" in lines[0] else ""
+        moves = []
+        ability = ""
+        tera_type = ""
+        evs = {}
+        ivs = {}
+
+        for line in lines[1:]:
+            if not line:
+                continue
+
+            kv_match = re.match(r"^\s*([^:]+):\s*(.*)$", line, re.IGNORECASE)
+            if kv_match:
+                key = kv_match.group(1).strip().lower()
+                value = kv_match.group(2).strip()
+
+                if key == "ability":
+                    ability = value
+                elif key == "tera type":
+                    tera_type = value
+                elif key == "evs":
+                    ev_parts = value.split("/")
+                    for ev in ev_parts:
+                        val, stat = ev.strip().split()
+                        evs[stat] = int(val)
+                elif key == "ivs":
+                    iv_parts = value.split("/")
+                    for iv in iv_parts:
+                        val, stat = iv.strip().split()
+                        ivs[stat] = int(val)
+                continue
+
+            move_match = re.match(r"^\s*-\s+(.*)$", line)
+            if move_match:
+                moves.append(move_match.group(1).strip())
+                continue
+
+        pokemon = Pokemon()
+        pokemon.name = name
+        pokemon.item = item
+        pokemon.ability = ability
+        pokemon.tera_type = tera_type
+        pokemon.evs = evs
+        pokemon.ivs = ivs
+        pokemon.moves = moves
+    return pokemon
@@ -0,0 +1,69 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from core.configuration.configuration import uploads_root
+
+
+@click.command(
+    "blobs:sync",
+    help="Recomputes blob reference counts from the file table, moves stored files into the blob store "
+    "and deletes blobs no file uses.",
+)
+@click.option("--dedupe", is_flag=True, help="Also replace dataset copies of an already stored blob with links.")
+@with_appcontext
+def blobs_sync(dedupe):
+    from app import db
+    from app.modules.hubfile.blobs import blob_store
+    from app.modules.hubfile.models import HubfileBlob
+    from app.modules.hubfile.repositories import HubfileBlobRepository, HubfileRepository
+
+    # 1) Reference counts
+    counts = HubfileBlobRepository().reference_counts()
+    stored = {blob.checksum: blob for blob in HubfileBlob.query.all()}
+    fixed = 0
+    for checksum, (count, size) in counts.items():
+        blob = stored.pop(checksum, None)
+        if blob is None:
+            db.session.add(HubfileBlob(checksum=checksum, size=size, ref_count=count))
+            fixed += 1
+        elif blob.ref_count != count:
+            blob.ref_count = count
+            fixed += 1
+    for blob in stored.values():
+        db.session.delete(blob)
+        fixed += 1
+    db.session.commit()
+
+    # 2) Content
+    ingested, linked, missing = 0, 0, 0
+    for _, checksum, name, user_id, dataset_id in HubfileRepository().iter_with_locations():
+        path = os.path.join(uploads_root(), f"user_{user_id}", f"dataset_{dataset_id}", name)
+        if not os.path.exists(path):
+            if blob_store.materialize(checksum, path):
+                linked += 1
+            else:
+                missing += 1
+        elif not blob_store.exists(checksum):
+            blob_store.ingest(checksum, path)
+            ingested += 1
+        elif dedupe and not os.path.samefile(path, blob_store.path(checksum)) and blob_store.share(checksum, path):
+            linked += 1
+
+    # 3) Orphan blobs
+    removed = 0
+    for checksum in list(blob_store.iter_checksums()):
+        if checksum not in counts:
+            blob_store.delete(checksum)
+            removed += 1
+
+    click.echo(
+        click.style(
+            f"Blob store synced: {fixed} reference counts fixed, {ingested} files ingested, {linked} linked, "
+            f"{removed} orphan blobs removed.",
+            fg="green",
+        )
+    )
+    if missing:
+        click.echo(click.style(f"[WARN] {missing} files have no content on disk nor in the blob store.", fg="yellow"))
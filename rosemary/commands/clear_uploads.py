@@ -3,7 +3,7 @@ import shutil
 
 import click
 
-from core.configuration.configuration import uploads_folder_name
+from core.configuration.configuration import uploads_root
 
 
 @click.command(
@@ -11,7 +11,7 @@ from core.configuration.configuration import uploads_folder_name
     help="Clears the contents of the 'uploads' directory without removing the folder.",
 )
 def clear_uploads():
-    uploads_dir = os.path.join(os.getenv("WORKING_DIR", ""), uploads_folder_name())
+    uploads_dir = uploads_root()
 
     # Verify if the 'uploads' folder exists
     if os.path.exists(uploads_dir) and os.path.isdir(uploads_dir):
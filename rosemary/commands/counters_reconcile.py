@@ -0,0 +1,33 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command(
+    "counters:reconcile",
+    help="Recounts the site-wide counters of the home page from the tables. Meant to run periodically (e.g. cron).",
+)
+@click.option("--check", is_flag=True, help="Only report the drift, without writing the recount.")
+@with_appcontext
+def counters_reconcile(check):
+    from app import db
+    from app.modules.public.repositories import SiteCountersRepository
+    from app.modules.public.services import SiteCountersService
+
+    if check:
+        before = SiteCountersService().get_counters()
+        after = SiteCountersRepository().count_all()
+        db.session.rollback()
+    else:
+        before, after = SiteCountersService().reconcile()
+
+    drift = {name: after[name] - before[name] for name in after if after[name] != before[name]}
+    if not drift:
+        click.echo(click.style("Every counter matches the tables.", fg="green"))
+        return
+    for name, delta in drift.items():
+        message = f"[WARN] {name}: {before[name]} counted, {after[name]} in the tables ({delta:+d})."
+        click.echo(click.style(message, fg="yellow"))
+    if check:
+        click.echo(click.style("Run without --check to fix them.", fg="yellow"))
+    else:
+        click.echo(click.style(f"{len(drift)} counters fixed.", fg="green"))
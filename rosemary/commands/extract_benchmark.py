@@ -0,0 +1,86 @@
+import io
+import os
+import shutil
+import tempfile
+import time
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import click
+from flask.cli import with_appcontext
+
+SAMPLE_SET = """Pikachu @ Light Ball
+Ability: Static
+Tera Type: Electric
+EVs: 252 Atk / 4 SpD / 252 Spe
+Jolly Nature
+- Volt Tackle
+- Iron Tail
+- Knock Off
+- Fake Out
+"""
+
+
+# Reference copy of the extraction loop that probed the disk for every candidate name, kept only so the
+# benchmark can compare against it.
+def _legacy_extract(zf: ZipFile, dest_dir: str) -> tuple:
+    saved = []
+    probes = 0
+    for member in zf.infolist():
+        if member.is_dir() or not member.filename.lower().endswith(".poke"):
+            continue
+        filename = os.path.basename(member.filename)
+        base, ext = os.path.splitext(filename)
+        candidate = filename
+        dest_path = os.path.join(dest_dir, candidate)
+        i = 1
+        probes += 1
+        while os.path.exists(dest_path):
+            candidate = f"{base} ({i}){ext}"
+            dest_path = os.path.join(dest_dir, candidate)
+            i += 1
+            probes += 1
+        with zf.open(member, "r") as src, open(dest_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        saved.append(candidate)
+    return saved, probes
+
+
+def _synthetic_archive(members: int) -> bytes:
+    """Every member is a set.poke in its own folder, the worst case for name deduplication."""
+    buf = io.BytesIO()
+    with ZipFile(buf, "w", compression=ZIP_DEFLATED) as zf:
+        for i in range(members):
+            zf.writestr(f"team_{i:05d}/set.poke", SAMPLE_SET)
+    return buf.getvalue()
+
+
+@click.command(
+    "extract:benchmark",
+    help="Times ZIP extraction of a synthetic archive full of duplicate names, legacy loop against the allocator.",
+)
+@click.option("--members", default=2000, show_default=True, help="Number of set.poke members in the archive.")
+@with_appcontext
+def extract_benchmark(members):
+    from app.modules.dataset.services import DataSetService
+
+    archive = _synthetic_archive(members)
+    click.echo(click.style(f"Synthetic archive: {members} x set.poke, {len(archive):,} bytes", fg="cyan"))
+
+    with tempfile.TemporaryDirectory() as legacy_dir, tempfile.TemporaryDirectory() as new_dir:
+        start = time.perf_counter()
+        with ZipFile(io.BytesIO(archive)) as zf:
+            legacy_saved, probes = _legacy_extract(zf, legacy_dir)
+        legacy_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ZipFile(io.BytesIO(archive)) as zf:
+            saved, _ = DataSetService()._extract_pokes_from_zip(zf, dest_dir=new_dir, subdir=None)
+        elapsed = time.perf_counter() - start
+
+    if sorted(saved) != sorted(legacy_saved):
+        click.echo(click.style("The two extractions produced different file names!", fg="red"))
+        return
+
+    click.echo(f"{'legacy (exists() loop)':<28} {legacy_elapsed:>8.3f} s  {probes:>12,} stat calls")
+    click.echo(f"{'name allocator + pool':<28} {elapsed:>8.3f} s  {1:>12,} listdir")
+    click.echo(click.style(f"Speed-up: {legacy_elapsed / elapsed:.1f}x", fg="green"))
@@ -0,0 +1,47 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+from core.configuration.configuration import uploads_root
+
+
+@click.command(
+    "files:check",
+    help="Checks the storage path stored on every file against its dataset and reports files missing on disk.",
+)
+@click.option("--fix", is_flag=True, help="Rewrite missing or stale storage paths.")
+@with_appcontext
+def files_check(fix):
+    from app import db
+    from app.modules.hubfile.models import Hubfile
+    from app.modules.hubfile.repositories import HubfileRepository
+
+    repository = HubfileRepository()
+    uploads_dir = uploads_root()
+    stale, unset, missing = {}, 0, []
+    for file_id, storage_path, name, user_id, dataset_id in repository.iter_storage_paths():
+        expected = Hubfile.storage_path_for(user_id, dataset_id, name)
+        if storage_path != expected:
+            stale[file_id] = expected
+            unset += storage_path is None
+        if not os.path.exists(os.path.join(uploads_dir, expected)):
+            missing.append(file_id)
+
+    if not stale:
+        click.echo(click.style("Every file has the right storage path.", fg="green"))
+    elif fix:
+        repository.set_storage_paths(stale)
+        db.session.commit()
+        click.echo(click.style(f"Storage path rewritten for {len(stale)} files ({unset} had none).", fg="green"))
+    else:
+        click.echo(
+            click.style(
+                f"[WARN] {len(stale)} files have a missing or stale storage path ({unset} have none). "
+                "Run with --fix to rewrite them.",
+                fg="yellow",
+            )
+        )
+    if missing:
+        shown = ", ".join(str(file_id) for file_id in missing[:20])
+        click.echo(click.style(f"[WARN] {len(missing)} files are not on disk (ids {shown}).", fg="yellow"))
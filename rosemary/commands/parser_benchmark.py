@@ -0,0 +1,60 @@
+import glob
+import os
+import tempfile
+import time
+
+import click
+
+
+def _time(fn, items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    return time.perf_counter() - start
+
+
+@click.command(
+    "parser:benchmark",
+    help="Measures .poke parsing throughput (sets per second) of the shared tokenizer against the baseline parsers.",
+)
+@click.option("--rounds", default=200, show_default=True, help="How many times every sample set is parsed.")
+def parser_benchmark(rounds):
+    from app.modules.pokemodel.models import parse_poke
+    from core.pokemon_check.check_poke import PokemonSetChecker
+    from core.pokemon_check.parser import parse_set
+    from rosemary.commands.baseline_parsers.check_poke import PokemonSetChecker as BaselineChecker
+    from rosemary.commands.baseline_parsers.parse_poke import parse_poke as baseline_parse_poke
+
+    examples_dir = os.path.join(os.getenv("WORKING_DIR", ""), "app/modules/dataset/poke_examples")
+    paths = sorted(glob.glob(os.path.join(examples_dir, "*.poke")))
+    if not paths:
+        click.echo(click.style(f"No .poke examples found in {examples_dir}", fg="red"))
+        return
+
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+
+    # Work on normalised copies so both file-based parsers read exactly the same bytes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = []
+        for i, text in enumerate(texts):
+            file_path = os.path.join(tmp_dir, f"set_{i}.poke")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            files.append(file_path)
+
+        results = [
+            ("baseline parse_poke", _time(baseline_parse_poke, files, rounds)),
+            ("parse_poke", _time(parse_poke, files, rounds)),
+            ("baseline PokemonSetChecker", _time(BaselineChecker, texts, rounds)),
+            ("PokemonSetChecker", _time(PokemonSetChecker, texts, rounds)),
+            ("parse_set (in memory)", _time(parse_set, texts, rounds)),
+        ]
+
+    total_sets = len(texts) * rounds
+    click.echo(click.style(f"Parsed {total_sets} sets per parser ({len(texts)} samples x {rounds} rounds)", fg="cyan"))
+    for name, elapsed in results:
+        click.echo(f"{name:<28} {total_sets / elapsed:>12,.0f} sets/s")
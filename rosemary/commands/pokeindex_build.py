@@ -0,0 +1,18 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command(
+    "pokeindex:build",
+    help="Rebuilds the species/move/ability/item/tera type inverted index from the poke_set table and saves it.",
+)
+@click.option("--path", default=None, help="Where to write the index (defaults to POKE_INDEX_PATH).")
+@with_appcontext
+def pokeindex_build(path):
+    from app.modules.pokemodel.inverted_index import poke_index
+
+    poke_index.build()
+    poke_index.save(path)
+    click.echo(
+        click.style(f"Inverted index built: {len(poke_index)} models saved to {path or poke_index.path}.", fg="green")
+    )
@@ -0,0 +1,49 @@
+import os
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command(
+    "pokesets:backfill",
+    help="Parses the .poke files of existing poke models and stores their sets in the poke_set table.",
+)
+@click.option("--batch-size", default=200, show_default=True, help="Number of poke models committed per batch.")
+@with_appcontext
+def pokesets_backfill(batch_size):
+    from app import db
+    from app.modules.dataset.services import DataSetService
+    from app.modules.pokemodel.repositories import PokeSetRepository
+
+    dataset_service = DataSetService()
+    poke_set_repository = PokeSetRepository()
+
+    pending = poke_set_repository.get_poke_models_without_sets()
+    if not pending:
+        click.echo(click.style("Every poke model already has its sets stored.", fg="green"))
+        return
+
+    click.echo(click.style(f"Backfilling sets for {len(pending)} poke models...", fg="cyan"))
+    stored, skipped = 0, 0
+
+    for i, poke_model in enumerate(pending, start=1):
+        if not poke_model.files:
+            skipped += 1
+            continue
+
+        file_path = poke_model.files[0].get_path()
+        if not os.path.exists(file_path):
+            click.echo(click.style(f"[WARN] File not found for {poke_model}: {file_path}", fg="yellow"))
+            skipped += 1
+            continue
+
+        if dataset_service.store_poke_sets(poke_model, file_path):
+            stored += 1
+        else:
+            skipped += 1
+
+        if i % batch_size == 0:
+            db.session.commit()
+
+    db.session.commit()
+    click.echo(click.style(f"Backfill completed: {stored} poke models stored, {skipped} skipped.", fg="green"))
@@ -0,0 +1,22 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command(
+    "pokestats:build",
+    help="Rebuilds the columnar EV/IV statistics from the poke_set table and saves the .npz snapshot.",
+)
+@click.option("--path", default=None, help="Where to write the snapshot (defaults to POKE_STATS_PATH).")
+@with_appcontext
+def pokestats_build(path):
+    from app.modules.pokemodel.stats import poke_stats
+
+    poke_stats.build()
+    poke_stats.save(path)
+    click.echo(
+        click.style(
+            f"EV/IV statistics built: {len(poke_stats)} sets, {len(poke_stats.species)} species "
+            f"saved to {path or poke_stats.path}.",
+            fg="green",
+        )
+    )
@@ -0,0 +1,27 @@
+import os
+
+import click
+
+from core.configuration.configuration import uploads_root
+
+
+@click.command(
+    "uploads:expire",
+    help="Removes the chunked uploads nobody appended to for a while, of every user (e.g. cron).",
+)
+@click.option("--hours", type=int, default=None, help="Inactivity before an upload expires (ZIP_UPLOAD_EXPIRY_HOURS).")
+def uploads_expire(hours):
+    from app.modules.dataset.uploads import ResumableUpload
+
+    if hours is None:
+        hours = int(os.getenv("ZIP_UPLOAD_EXPIRY_HOURS", "24"))
+    resumable_root = os.path.join(uploads_root(), "resumable")
+    if not os.path.isdir(resumable_root):
+        click.echo(click.style("There are no chunked uploads.", fg="yellow"))
+        return
+
+    expired = 0
+    for entry in os.scandir(resumable_root):
+        if entry.is_dir():
+            expired += len(ResumableUpload.expire_stale(entry.path, hours * 60 * 60))
+    click.echo(click.style(f"{expired} abandoned uploads removed.", fg="green"))